@@ -0,0 +1,4 @@
+import sys
+from agent.cli import main
+
+sys.exit(main())
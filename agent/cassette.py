@@ -0,0 +1,259 @@
+"""
+Record / replay of external I/O.
+
+    CASSETTE_MODE=record CASSETTE_PATH=cassettes/acme.jsonl python -m agent -q Pricing --vendors Acme
+    CASSETTE_MODE=replay CASSETTE_PATH=cassettes/acme.jsonl python -m agent -q Pricing --vendors Acme
+
+(or `python -m agent --record-cassette FILE` / `--replay-cassette FILE`).
+
+In record mode every outbound call — page fetches, YouTube search and
+transcripts, Drive/Docs reads and uploads, OpenAI chat calls and report
+emails — is appended to the cassette as one JSON line with its response (or
+error) and how long it took. In replay mode the same calls are served from the
+cassette, nothing touches the network, and a call that was never recorded
+raises CassetteMiss (callers that handle errors degrade as they would offline).
+
+Calls are matched on a hash of their inputs. LLM calls whose prompt differs
+from the recording (e.g. the diff engine's previous-snapshot date) fall back to
+the recorded responses for the same node and vendor, in order.
+
+CASSETTE_LATENCY shapes replay timing: "none" (default) returns at once,
+"recorded" sleeps as long as the original call took, a number scales the
+recorded time (e.g. "0.5"), and a JSON object sets fixed seconds per call kind,
+e.g. '{"http.get": 0.3, "llm": 6}'.
+"""
+import copy
+import functools
+import hashlib
+import inspect
+import json
+import os
+import threading
+import time
+from config.settings import CASSETTE_MODE, CASSETTE_PATH, CASSETTE_LATENCY
+
+OFF, RECORD, REPLAY = "off", "record", "replay"
+
+_config = {"mode": CASSETTE_MODE, "path": CASSETTE_PATH, "latency": CASSETTE_LATENCY}
+_lock = threading.Lock()
+_tape = None   # replay: {key: [entries]}, {fallback: [entries]}, and per-key positions
+
+
+class CassetteMiss(Exception):
+    """A replayed call has no recording."""
+
+
+class RecordedError(Exception):
+    """A call that failed while recording fails on replay, with the same message."""
+
+
+def configure(mode: str = None, path: str = None, latency: str = None):
+    """Override the settings (before the first external call), e.g. from CLI flags."""
+    global _tape
+    for name, value in (("mode", mode), ("path", path), ("latency", latency)):
+        if value is not None:
+            _config[name] = value
+    _tape = None
+    from agent.llm import get_llm
+    get_llm.cache_clear()
+
+
+def mode() -> str:
+    return _config["mode"]
+
+
+def call_key(kind: str, *parts) -> str:
+    payload = json.dumps([kind, *parts], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# ── Tape ───────────────────────────────────────────────────────────────────────
+
+def _write(kind, key, fallback, response, seconds, error: Exception = None):
+    path = _config["path"]
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    line = json.dumps({"kind": kind, "key": key, "fallback": fallback, "response": response,
+                       "error": str(error) or type(error).__name__ if error else None,
+                       "error_type": type(error).__name__ if error else None,
+                       "seconds": round(seconds, 4)}, default=str)
+    with _lock:
+        with open(path, "a") as f:
+            f.write(line + "\n")
+
+
+def _load():
+    global _tape
+    with _lock:
+        if _tape is None:
+            by_key, by_fallback = {}, {}
+            with open(_config["path"]) as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        by_key.setdefault(entry["key"], []).append(entry)
+                        if entry.get("fallback"):
+                            by_fallback.setdefault(entry["fallback"], []).append(entry)
+            _tape = {"key": by_key, "fallback": by_fallback, "position": {}}
+    return _tape
+
+
+def _next(table: str, key: str):
+    """The next recording under key — repeated calls get successive recordings, then the last again."""
+    tape = _load()
+    entries = tape[table].get(key)
+    if not entries:
+        return None
+    with _lock:
+        position = tape["position"].get((table, key), 0)
+        tape["position"][(table, key)] = position + 1
+    return entries[min(position, len(entries) - 1)]
+
+
+def _latency(kind: str, recorded: float) -> float:
+    profile = (_config["latency"] or "none").strip()
+    if profile == "none":
+        return 0.0
+    if profile == "recorded":
+        return recorded
+    if profile.startswith("{"):
+        return float(json.loads(profile).get(kind, 0.0))
+    return recorded * float(profile)
+
+
+def _replay(kind: str, key: str, fallback: str = None):
+    entry = _next("key", key) or (fallback and _next("fallback", fallback))
+    if entry is None:
+        raise CassetteMiss(f"No recorded {kind} call matches (cassette {_config['path']})")
+    delay = _latency(kind, entry.get("seconds") or 0.0)
+    if delay:
+        time.sleep(delay)
+    return entry
+
+
+def recorded(kind: str, *arg_names: str, on_miss=None):
+    """
+    Decorator for a function that performs one external call: records its
+    return value (keyed on the named arguments) or serves it on replay. The
+    return value must be JSON-serializable. With on_miss set, a replay miss
+    returns that value instead of raising CassetteMiss.
+    """
+    def decorator(fn):
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            current = _config["mode"]
+            if current == OFF:
+                return fn(*args, **kwargs)
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = call_key(kind, *(bound.arguments.get(n) for n in arg_names))
+
+            if current == REPLAY:
+                try:
+                    entry = _replay(kind, key)
+                except CassetteMiss:
+                    if on_miss is not None:
+                        return copy.deepcopy(on_miss)
+                    raise
+                if entry.get("error"):
+                    raise RecordedError(entry["error"])
+                return copy.deepcopy(entry["response"])   # callers may mutate what they get
+
+            started = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                _write(kind, key, None, None, time.perf_counter() - started, e)
+                raise
+            _write(kind, key, None, result, time.perf_counter() - started)
+            return result
+        return wrapper
+    return decorator
+
+
+# ── LLM ────────────────────────────────────────────────────────────────────────
+
+def _message_key(model: str, messages) -> str:
+    return call_key("llm", model, [(m.type, m.content) for m in messages])
+
+
+def _fallback_key(metadata: dict) -> str:
+    metadata = metadata or {}
+    return call_key("llm-fallback", metadata.get("langgraph_node", ""), metadata.get("vendor_name", ""))
+
+
+def llm_recorder(model: str):
+    """Callback handler that appends every chat completion of a ChatOpenAI client to the cassette."""
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    class CassetteRecorder(BaseCallbackHandler):
+        def __init__(self):
+            self.pending = {}
+
+        def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+            self.pending[run_id] = (_message_key(model, messages[0]), _fallback_key(metadata), time.perf_counter())
+
+        def on_llm_end(self, response, *, run_id, **kwargs):
+            key, fallback, started = self.pending.pop(run_id, (None, None, 0))
+            if key is None:
+                return
+            message = response.generations[0][0].message
+            _write("llm", key, fallback,
+                   {"content": message.content, "usage_metadata": getattr(message, "usage_metadata", None)},
+                   time.perf_counter() - started)
+
+        def on_llm_error(self, error, *, run_id, **kwargs):
+            key, fallback, started = self.pending.pop(run_id, (None, None, 0))
+            if key is not None:
+                _write("llm", key, fallback, None, time.perf_counter() - started, error)
+
+    return CassetteRecorder()
+
+
+STREAM_CHUNK_CHARS = 24   # replayed completions stream in pieces of this size
+
+
+def replay_chat_model(model: str):
+    """A chat model that answers from the cassette, streaming like the real one."""
+    from langchain_core.callbacks import BaseCallbackHandler
+    from langchain_core.language_models.chat_models import BaseChatModel
+    from langchain_core.messages import AIMessage, AIMessageChunk
+    from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+    call_metadata = threading.local()
+
+    class MetadataTap(BaseCallbackHandler):
+        # Implicit streaming (LangGraph's "messages" mode) calls _stream without
+        # a run manager, so the call's metadata is taken from its start event.
+        def on_chat_model_start(self, serialized, messages, *, metadata=None, **kwargs):
+            call_metadata.value = metadata
+
+    class CassetteChatModel(BaseChatModel):
+        model_name: str = model
+
+        @property
+        def _llm_type(self) -> str:
+            return "cassette"
+
+        def _lookup(self, messages):
+            metadata = getattr(call_metadata, "value", None)
+            entry = _replay("llm", _message_key(self.model_name, messages), _fallback_key(metadata))
+            if entry.get("error"):
+                raise RecordedError(entry["error"])
+            return entry["response"]
+
+        def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+            response = self._lookup(messages)
+            message = AIMessage(content=response["content"], usage_metadata=response.get("usage_metadata"))
+            return ChatResult(generations=[ChatGeneration(message=message)])
+
+        def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+            response = self._lookup(messages)
+            content = response["content"] if isinstance(response["content"], str) else json.dumps(response["content"])
+            for i in range(0, len(content), STREAM_CHUNK_CHARS):
+                yield ChatGenerationChunk(message=AIMessageChunk(content=content[i:i + STREAM_CHUNK_CHARS]))
+            if response.get("usage_metadata"):
+                yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=response["usage_metadata"]))
+
+    return CassetteChatModel(callbacks=[MetadataTap()])
@@ -0,0 +1,73 @@
+import sqlite3
+from contextvars import ContextVar
+from functools import lru_cache
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from langgraph.checkpoint.sqlite import SqliteSaver
+from config.settings import CHECKPOINT_DB_PATH
+from db.database import save_raw_source, get_raw_content, CHECKPOINT_SOURCE
+
+# Strings longer than this (scraped pages, transcripts, base64 images, syntheses)
+# are written to the raw source store and checkpointed as a hash reference.
+OFFLOAD_MIN_CHARS = 2048
+REF_KEY = "__raw_ref__"
+
+# Run whose checkpoint is being written — set around put()/put_writes()
+_current_run_id: ContextVar[str] = ContextVar("checkpoint_run_id", default="")
+
+
+class OffloadingSerializer(JsonPlusSerializer):
+    """
+    Checkpoint serializer that keeps heavy payloads out of the checkpoint DB.
+    Large strings are stored once in the content-addressed raw store and
+    replaced by {"__raw_ref__": sha256}; they are resolved again on load.
+    """
+
+    def dumps_typed(self, obj):
+        return super().dumps_typed(self._offload(obj))
+
+    def loads_typed(self, data):
+        return self._resolve(super().loads_typed(data))
+
+    def _offload(self, obj):
+        if isinstance(obj, str) and len(obj) >= OFFLOAD_MIN_CHARS:
+            digest = save_raw_source(_current_run_id.get(), None, CHECKPOINT_SOURCE, None, obj, dedupe=True)
+            return {REF_KEY: digest}
+        if isinstance(obj, dict):
+            return {k: self._offload(v) for k, v in obj.items()}
+        if isinstance(obj, list):
+            return [self._offload(v) for v in obj]
+        return obj
+
+    def _resolve(self, obj):
+        if isinstance(obj, dict):
+            if len(obj) == 1 and REF_KEY in obj:
+                return get_raw_content(obj[REF_KEY]) or ""
+            return {k: self._resolve(v) for k, v in obj.items()}
+        if isinstance(obj, list):
+            return [self._resolve(v) for v in obj]
+        return obj
+
+
+class RunCheckpointer(SqliteSaver):
+    """SqliteSaver that tells the serializer which run it is writing for."""
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        token = _current_run_id.set(config["configurable"]["thread_id"])
+        try:
+            return super().put(config, checkpoint, metadata, new_versions)
+        finally:
+            _current_run_id.reset(token)
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        token = _current_run_id.set(config["configurable"]["thread_id"])
+        try:
+            return super().put_writes(config, writes, task_id, task_path)
+        finally:
+            _current_run_id.reset(token)
+
+
+@lru_cache(maxsize=None)
+def get_checkpointer() -> RunCheckpointer:
+    """Process-wide checkpointer backed by CHECKPOINT_DB_PATH (thread-safe)."""
+    conn = sqlite3.connect(CHECKPOINT_DB_PATH, check_same_thread=False)
+    return RunCheckpointer(conn, serde=OffloadingSerializer())
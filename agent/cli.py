@@ -0,0 +1,334 @@
+"""
+Headless runner — drive the pipeline from cron / CI without the Streamlit UI.
+
+    python -m agent --query "Pricing changes" --vendors Acme Globex [--publish] [--email a@x.com]
+    python -m agent -q Pricing -q "Developer experience" -q Safety     # scrape once, one report per query
+    python -m agent --batch runs.yaml
+    python -m agent --resume <run_id>
+    python -m agent -q Pricing --replay-cassette cassettes/acme.jsonl   # offline, see agent/cassette.py
+    python -m agent -q Pricing --deadline 600    # degrade as time runs short, partial report after 10 min
+
+Progress is written to stdout as JSON lines, one event per line:
+    {"event": "run_started", "queries": [...], "vendors": [...], "publish": ...}
+    {"event": "query_started", "run_id": ..., "query": ..., "query_index": ...}   (multi-query runs)
+    {"event": "step", "run_id": ..., "node": ..., "step": 3, "total": 6, "errors": [...]}
+    {"event": "run_finished", "run_id": ..., "status": ..., "report_id": ..., "stopped": ..., ...}
+    {"event": "email", "run_id": ..., "success": ..., "error": ...}
+    {"event": "batch_finished", "runs": ..., "exit_code": ...}
+
+Batch files list runs, with optional defaults applied to each:
+    defaults:
+      publish: false
+      email: [team@example.com]
+      deadline: 900                              # seconds per run (default RUN_DEADLINE_SECONDS)
+    runs:
+      - query: Pricing changes
+        vendors: [Acme, Globex]
+      - query: General competitive overview      # vendors omitted → all competitors
+      - queries: [Pricing, Developer experience]  # sources fetched once, one report per query
+
+Exit codes (a batch exits with the worst code of its runs):
+    0  every run completed cleanly
+    1  a run failed
+    2  bad arguments or batch file
+    3  completed, but with vendor errors, a partial report (deadline / cancel) or a failed email
+    130  interrupted (Ctrl-C / SIGTERM) — resume with --resume <run_id>
+"""
+import argparse
+import json
+import signal
+import sys
+import time
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+EXIT_PARTIAL = 3
+EXIT_INTERRUPTED = 130
+
+# Worst first — a batch reports the most severe outcome of its runs
+_SEVERITY = [EXIT_INTERRUPTED, EXIT_FAILED, EXIT_USAGE, EXIT_PARTIAL, EXIT_OK]
+
+
+class UsageError(Exception):
+    pass
+
+
+def emit(event: str, **fields):
+    """Write one JSON-lines progress event to stdout."""
+    sys.stdout.write(json.dumps({"event": event, **fields}, default=str) + "\n")
+    sys.stdout.flush()
+
+
+def worst_exit_code(codes) -> int:
+    codes = list(codes)
+    for code in _SEVERITY:
+        if code in codes:
+            return code
+    return EXIT_OK
+
+
+# ── Run specs ──────────────────────────────────────────────────────────────────
+
+def _as_list(value) -> list[str]:
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [value]
+    return [str(v) for v in value]
+
+
+def _normalize_spec(raw: dict, defaults: dict, known_vendors: list[str]) -> dict:
+    if not isinstance(raw, dict):
+        raise UsageError(f"Each run must be a mapping, got: {raw!r}")
+    merged = {**defaults, **raw}
+
+    own = raw if ("query" in raw or "queries" in raw) else merged   # a run's own queries replace the defaults
+    queries = [q.strip() for q in _as_list(own.get("queries")) + _as_list(own.get("query")) if q.strip()]
+    if not queries:
+        raise UsageError(f"Run is missing a query: {raw!r}")
+
+    vendors = _as_list(merged.get("vendors")) or list(known_vendors)
+    unknown = [v for v in vendors if v not in known_vendors]
+    if unknown:
+        raise UsageError(f"Unknown vendor(s): {', '.join(unknown)} — add them on the Configure page first")
+    if not vendors:
+        raise UsageError("No competitors configured")
+
+    return {
+        "queries": list(dict.fromkeys(queries)),
+        "vendors": vendors,
+        "publish": bool(merged.get("publish", False)),
+        "email": _as_list(merged.get("email")),
+        "deadline": int(merged["deadline"]) if merged.get("deadline") is not None else None,
+    }
+
+
+def load_batch(path: str, known_vendors: list[str], cli_defaults: dict | None = None) -> list[dict]:
+    """
+    Parse a YAML batch file into a list of run specs. cli_defaults (flags given
+    alongside --batch) apply underneath the file's own defaults.
+    """
+    import yaml
+
+    try:
+        with open(path) as f:
+            doc = yaml.safe_load(f)
+    except (OSError, yaml.YAMLError) as e:
+        raise UsageError(f"Could not read batch file {path}: {e}")
+
+    if isinstance(doc, list):
+        defaults, runs = {}, doc
+    elif isinstance(doc, dict):
+        defaults, runs = doc.get("defaults") or {}, doc.get("runs")
+    else:
+        defaults, runs = {}, None
+    if not runs or not isinstance(runs, list):
+        raise UsageError(f"Batch file {path} has no runs")
+    defaults = {**(cli_defaults or {}), **defaults}
+
+    return [_normalize_spec(raw, defaults, known_vendors) for raw in runs]
+
+
+# ── Execution ──────────────────────────────────────────────────────────────────
+
+def execute(stream, email: list[str] | None = None, index: int | None = None) -> int:
+    """
+    Consume a stream_agent()/resume_stream()/stream_batch() generator, emitting
+    progress events. Returns the worst exit code of the runs in the stream.
+    """
+    from agent.graph import PIPELINE_STEPS, STEP_LABELS
+
+    batch = {"index": index} if index is not None else {}
+    codes = []
+    run_id = None
+    errors = []
+    start = time.time()
+
+    try:
+        for node_name, update in stream:
+            if node_name == "__start__":
+                run_id, errors, start = update["run_id"], [], time.time()
+                if "batch_index" in update:
+                    emit("query_started", run_id=run_id, query=update["research_query"],
+                         query_index=update["batch_index"], **batch)
+                continue
+            if node_name == "__end__":
+                codes.append(_finish(run_id, update, errors, start, email, batch))
+                continue
+
+            errors.extend(update.get("errors") or [])
+            emit(
+                "step",
+                run_id=run_id,
+                node=node_name,
+                label=STEP_LABELS.get(node_name, ("", node_name))[1],
+                step=PIPELINE_STEPS.index(node_name) + 1 if node_name in PIPELINE_STEPS else None,
+                total=len(PIPELINE_STEPS),
+                errors=update.get("errors") or [],
+                **batch,
+            )
+    except KeyboardInterrupt:
+        stream.close()   # marks the run interrupted
+        emit("run_finished", run_id=run_id, status="interrupted", errors=errors,
+             duration_s=round(time.time() - start, 1), **batch)
+        raise
+    except Exception as e:
+        emit("run_finished", run_id=run_id, status="failed", error=str(e), errors=errors,
+             duration_s=round(time.time() - start, 1), **batch)
+        codes.append(EXIT_FAILED)
+
+    return worst_exit_code(codes)
+
+
+def _finish(run_id, final_state, errors, start, email, batch) -> int:
+    """Emit run_finished (and email the report if asked). Returns the run's exit code."""
+    from db.database import get_report_by_run_id
+
+    final_state = final_state or {}
+    report = get_report_by_run_id(run_id) or {}
+    errors = final_state.get("errors") or errors
+    partial = bool(errors or final_state.get("partial_vendors"))
+    code = EXIT_PARTIAL if partial else EXIT_OK
+    emit(
+        "run_finished",
+        run_id=run_id,
+        status="partial" if partial else "completed",
+        report_id=report.get("id"),
+        stopped=final_state.get("stopped") or None,
+        gdrive_link=final_state.get("gdrive_link", ""),
+        errors=errors,
+        duration_s=round(time.time() - start, 1),
+        **batch,
+    )
+
+    if email:
+        from agent.tools.email_tool import send_report_email
+        link = final_state.get("gdrive_link", "")
+        outcome = send_report_email(
+            recipients=email,
+            report_markdown=final_state.get("final_report_markdown", ""),
+            gdrive_link="" if link == "__local_only__" else link,
+        )
+        emit("email", run_id=run_id, recipients=len(email), success=outcome["success"],
+             error=outcome.get("error"), **batch)
+        if not outcome["success"]:
+            code = worst_exit_code([code, EXIT_PARTIAL])
+
+    return code
+
+
+def run_specs(specs: list[dict]) -> int:
+    from agent.graph import stream_agent, stream_batch
+
+    codes = []
+    batch = len(specs) > 1
+    try:
+        for i, spec in enumerate(specs):
+            index = i if batch else None
+            emit("run_started", queries=spec["queries"], vendors=spec["vendors"], publish=spec["publish"],
+                 **({"index": index} if batch else {}))
+            if len(spec["queries"]) > 1:
+                stream = stream_batch(spec["vendors"], spec["queries"], save_to_drive=spec["publish"],
+                                      deadline_seconds=spec["deadline"])
+            else:
+                stream = stream_agent(spec["vendors"], spec["queries"][0], save_to_drive=spec["publish"],
+                                      deadline_seconds=spec["deadline"])
+            codes.append(execute(stream, spec["email"], index))
+    except KeyboardInterrupt:
+        codes.append(EXIT_INTERRUPTED)
+
+    code = worst_exit_code(codes)
+    if batch:
+        emit("batch_finished", runs=len(codes), exit_code=code)
+    return code
+
+
+def _raise_interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m agent",
+        description="Run competitive-intelligence evaluations headlessly, streaming JSON-lines progress.",
+    )
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--query", "-q", action="append",
+                        help="research query; repeat to run several queries over one shared scrape")
+    source.add_argument("--batch", "-b", metavar="FILE", help="YAML file listing many runs")
+    source.add_argument("--resume", metavar="RUN_ID", help="continue a failed or interrupted run")
+    parser.add_argument("--vendors", "-v", nargs="+", metavar="NAME",
+                        help="competitors to evaluate (default: all configured)")
+    parser.add_argument("--publish", action="store_true", help="upload the report to Google Drive")
+    parser.add_argument("--email", action="append", default=[], metavar="ADDRESS",
+                        help="email the report to this address (repeatable)")
+    parser.add_argument("--deadline", type=int, metavar="SECONDS",
+                        help="time budget per run (0 = none; default RUN_DEADLINE_SECONDS)")
+    cassette = parser.add_mutually_exclusive_group()
+    cassette.add_argument("--record-cassette", metavar="FILE", help="record all external calls to FILE")
+    cassette.add_argument("--replay-cassette", metavar="FILE",
+                          help="serve all external calls from FILE, offline")
+    parser.add_argument("--latency", metavar="PROFILE",
+                        help="replay timing: none, recorded, a multiplier, or JSON seconds per call kind")
+    return parser
+
+
+def main(argv=None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    from db.database import init_db
+    from config.settings import METRICS_TEXTFILE
+    init_db()
+    signal.signal(signal.SIGTERM, _raise_interrupt)
+    if args.record_cassette or args.replay_cassette or args.latency:
+        from agent import cassette
+        cassette.configure(
+            mode=cassette.RECORD if args.record_cassette else cassette.REPLAY if args.replay_cassette else None,
+            path=args.record_cassette or args.replay_cassette,
+            latency=args.latency,
+        )
+
+    try:
+        return _dispatch(parser, args)
+    finally:
+        if METRICS_TEXTFILE:   # one-shot runs leave their samples for the textfile collector
+            from agent.metrics import write_textfile
+            write_textfile()
+
+
+def _dispatch(parser, args) -> int:
+    from db.database import get_all_competitors, get_run
+
+    if args.resume:
+        from agent.graph import resume_stream
+        run = get_run(args.resume)
+        if not run:
+            parser.error(f"unknown run '{args.resume}'")
+        emit("run_started", run_id=args.resume, query=run["research_query"], vendors=run["vendors"],
+             publish=bool(run["save_to_drive"]), resumed=True)
+        try:
+            return execute(resume_stream(args.resume), args.email)
+        except KeyboardInterrupt:
+            return EXIT_INTERRUPTED
+
+    known_vendors = [c["vendor_name"] for c in get_all_competitors()]
+    try:
+        if args.batch:
+            cli_defaults = {k: v for k, v in
+                            {"vendors": args.vendors, "publish": args.publish, "email": args.email}.items() if v}
+            if args.deadline is not None:
+                cli_defaults["deadline"] = args.deadline
+            specs = load_batch(args.batch, known_vendors, cli_defaults)
+        else:
+            specs = [_normalize_spec(
+                {"query": args.query, "vendors": args.vendors, "publish": args.publish, "email": args.email,
+                 "deadline": args.deadline},
+                {}, known_vendors,
+            )]
+    except UsageError as e:
+        emit("error", message=str(e))
+        return EXIT_USAGE
+
+    return run_specs(specs)
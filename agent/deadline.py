@@ -0,0 +1,173 @@
+"""
+Run deadlines and cancellation.
+
+Every run executes under a RunControl (see run_control()), which any node or
+tool reaches through current_control(). It carries
+
+  - the run's deadline: deadline_seconds from the start of the run, or of a
+    resumed leg of it (RUN_DEADLINE_SECONDS unless the run was started with
+    its own, e.g. from the Evaluate page or `--deadline`)
+  - its cancel token: request_cancel() (the Evaluate page's Stop button) flags
+    the run's row, and the control polls that flag at most every CANCEL_POLL_SECONDS
+
+Nodes check the control between vendors and degrade as time runs short. With
+less than DEADLINE_DEGRADE_FRACTION of the budget left, YouTube is skipped,
+scrapbook images go to the model at "low" detail and source excerpts are cut to
+DEADLINE_PROMPT_SCALE of their usual length. Once the run is cancelled or past
+its deadline, no new vendor work starts. Vendors that lost anything are listed
+in the state's partial_vendors, and report_writer still writes the report from
+what completed.
+
+External calls go through call(), which gives up on them as soon as the run is
+cancelled or out of time by raising RunStopped. The abandoned call finishes on
+its own thread, bounded by its timeout, and its result is dropped.
+"""
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from agent.profiling import run_profiled
+from config.settings import CANCEL_POLL_SECONDS, DEADLINE_DEGRADE_FRACTION
+from db.database import is_cancel_requested
+
+CANCELLED, DEADLINE = "cancelled", "deadline"
+STOP_LABELS = {CANCELLED: "run cancelled", DEADLINE: "run deadline reached"}
+
+CALL_POLL_SECONDS = 0.2   # how often a waiting call() checks the cancel token and the clock
+MIN_CALL_TIMEOUT = 1.0    # timeout() never goes below this, so a call at the deadline can still fail cleanly
+
+
+class RunStopped(BaseException):
+    """
+    Raised out of an external call when its run is cancelled or past its
+    deadline. A BaseException, like asyncio.CancelledError, so the tools'
+    blanket `except Exception` handlers don't turn it into an error string.
+    """
+    def __init__(self, reason: str):
+        super().__init__(STOP_LABELS.get(reason, reason))
+        self.reason = reason
+
+
+class RunControl:
+    def __init__(self, run_id: str = "", deadline_seconds: float = 0):
+        self.run_id = run_id
+        self.budget = deadline_seconds or 0
+        self.started = time.monotonic()
+        self._cancelled = False
+        self._polled_at = float("-inf")
+
+    def remaining(self) -> float | None:
+        """Seconds left before the deadline (negative once past it), or None without one."""
+        if not self.budget:
+            return None
+        return self.budget - (time.monotonic() - self.started)
+
+    def cancelled(self) -> bool:
+        if not self._cancelled and self.run_id:
+            now = time.monotonic()
+            if now - self._polled_at >= CANCEL_POLL_SECONDS:
+                self._polled_at = now
+                self._cancelled = is_cancel_requested(self.run_id)
+        return self._cancelled
+
+    def stop_reason(self) -> str:
+        """CANCELLED, DEADLINE, or "" while the run may go on."""
+        if self.cancelled():
+            return CANCELLED
+        remaining = self.remaining()
+        if remaining is not None and remaining <= 0:
+            return DEADLINE
+        return ""
+
+    def degraded(self) -> bool:
+        """Whether time is short enough to cut corners (see the module docstring)."""
+        remaining = self.remaining()
+        return remaining is not None and remaining < self.budget * DEADLINE_DEGRADE_FRACTION
+
+    def check(self):
+        reason = self.stop_reason()
+        if reason:
+            raise RunStopped(reason)
+
+    def timeout(self, seconds: float) -> float:
+        """seconds, cut down to the time left before the deadline."""
+        remaining = self.remaining()
+        if remaining is None:
+            return seconds
+        return max(min(seconds, remaining), MIN_CALL_TIMEOUT)
+
+    def sleep(self, seconds: float):
+        """time.sleep(seconds), cut short with RunStopped once the run is cancelled or out of time."""
+        end = time.monotonic() + seconds
+        while True:
+            self.check()
+            left = end - time.monotonic()
+            if left <= 0:
+                return
+            time.sleep(min(left, CALL_POLL_SECONDS))
+
+    def call(self, fn, *args, **kwargs):
+        """
+        fn(*args, **kwargs), abandoned with RunStopped as soon as the run is
+        cancelled or out of time. Runs on a helper thread in a copy of the
+        caller's context, so spans, LangChain callbacks and a profiled node
+        (run_profiled) still see the run.
+        """
+        self.check()
+        if not self.run_id:   # outside a run there is nothing to watch
+            return fn(*args, **kwargs)
+
+        context = contextvars.copy_context()
+        outcome, done = {}, threading.Event()
+
+        def target():
+            try:
+                outcome["result"] = context.run(run_profiled, fn, *args, **kwargs)
+            except BaseException as e:
+                outcome["error"] = e
+            finally:
+                done.set()
+
+        threading.Thread(target=target, name=f"call-{self.run_id[:8]}", daemon=True).start()
+        while not done.wait(CALL_POLL_SECONDS):
+            self.check()
+        if "error" in outcome:
+            raise outcome["error"]
+        return outcome["result"]
+
+
+NO_CONTROL = RunControl()   # outside a run: never cancelled, no deadline
+
+_current: ContextVar = ContextVar("run_control", default=None)
+
+
+def current_control() -> RunControl:
+    return _current.get() or NO_CONTROL
+
+
+@contextmanager
+def run_control(run_id: str, deadline_seconds: float = 0):
+    """Make a RunControl for the run current for the nodes and tools it calls."""
+    control = RunControl(run_id, deadline_seconds)
+    token = _current.set(control)
+    try:
+        yield control
+    finally:
+        try:
+            _current.reset(token)
+        except ValueError:   # a stream generator closed from another context
+            pass
+
+
+def partial_vendor(vendor_name: str, node: str, note: str) -> dict:
+    """A partial_vendors entry: what a node left out for a vendor, and why."""
+    return {"vendor_name": vendor_name, "node": node, "note": note}
+
+
+def partial_notes(partial_vendors: list[dict]) -> dict[str, str]:
+    """{vendor: "note; note"} — what was left out per vendor, in pipeline order."""
+    notes = {}
+    for entry in partial_vendors:
+        notes.setdefault(entry["vendor_name"], []).append(entry["note"])
+    return {vendor_name: "; ".join(vendor_notes) for vendor_name, vendor_notes in notes.items()}
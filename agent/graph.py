@@ -1,4 +1,6 @@
-from langgraph.graph import StateGraph, END
+import time
+import uuid
+from functools import lru_cache
 from agent.state import AgentState
 from agent.nodes.web_scraper import web_scraper_node
 from agent.nodes.youtube_scraper import youtube_scraper_node
@@ -6,6 +8,19 @@ from agent.nodes.gdoc_reader import gdoc_reader_node
 from agent.nodes.synthesizer import synthesizer_node
 from agent.nodes.diff_engine import diff_engine_node
 from agent.nodes.report_writer import report_writer_node
+from agent.nodes.source_replay import source_replay_node
+from agent.deadline import run_control
+from agent.profiling import profiled_node
+from agent.singleflight import run_flights
+from agent.tracing import trace_run, traced_node
+from db.database import (
+    get_run_manifest, get_report_by_run_id,
+    create_run, update_run_status, get_run, clear_run_scratch,
+    save_run_event, save_run_result, save_run_previews,
+)
+from config.settings import PREVIEW_FLUSH_SECONDS, PROFILING_ENABLED, RUN_DEADLINE_SECONDS
+
+PREVIEW_CHARS = 300   # per-vendor synthesis preview kept in run_events
 
 
 # Ordered node names — used by UI to compute exact progress %
@@ -26,60 +41,302 @@ STEP_LABELS = {
     "synthesizer":     ("🧠", "GPT-4o synthesizing intelligence per vendor"),
     "diff_engine":     ("🔄", "Computing delta vs previous run"),
     "report_writer":   ("📝", "Compiling and archiving final report"),
+    "source_replay":   ("💾", "Loading stored raw sources from a past run"),
 }
 
 
-def build_graph() -> StateGraph:
+def run_config(run_id: str) -> dict:
+    """LangGraph config for a run — the run ID doubles as the checkpoint thread ID."""
+    return {"configurable": {"thread_id": run_id}}
+
+
+def _node(node_name: str, fn):
+    """A node as the graph runs it: traced, and profiled when its run asks for it."""
+    return traced_node(node_name, profiled_node(node_name, fn))
+
+
+def build_graph(replay: bool = False, checkpointer=None):
+    """
+    Compile the pipeline. With replay=True the three ingestion nodes are
+    replaced by source_replay, which loads a past run's raw sources from the store.
+    Prefer get_compiled_graph(), which compiles once per process.
+    """
+    from langgraph.graph import StateGraph, END
+
     graph = StateGraph(AgentState)
-    graph.add_node("web_scraper",    web_scraper_node)
-    graph.add_node("youtube_scraper", youtube_scraper_node)
-    graph.add_node("gdoc_reader",    gdoc_reader_node)
-    graph.add_node("synthesizer",    synthesizer_node)
-    graph.add_node("diff_engine",    diff_engine_node)
-    graph.add_node("report_writer",  report_writer_node)
-
-    graph.set_entry_point("web_scraper")
-    graph.add_edge("web_scraper",     "youtube_scraper")
-    graph.add_edge("youtube_scraper", "gdoc_reader")
-    graph.add_edge("gdoc_reader",     "synthesizer")
+    graph.add_node("synthesizer",    _node("synthesizer", synthesizer_node))
+    graph.add_node("diff_engine",    _node("diff_engine", diff_engine_node))
+    graph.add_node("report_writer",  _node("report_writer", report_writer_node))
+
+    if replay:
+        graph.add_node("source_replay", _node("source_replay", source_replay_node))
+        graph.set_entry_point("source_replay")
+        graph.add_edge("source_replay", "synthesizer")
+    else:
+        graph.add_node("web_scraper",    _node("web_scraper", web_scraper_node))
+        graph.add_node("youtube_scraper", _node("youtube_scraper", youtube_scraper_node))
+        graph.add_node("gdoc_reader",    _node("gdoc_reader", gdoc_reader_node))
+
+        graph.set_entry_point("web_scraper")
+        graph.add_edge("web_scraper",     "youtube_scraper")
+        graph.add_edge("youtube_scraper", "gdoc_reader")
+        graph.add_edge("gdoc_reader",     "synthesizer")
+
     graph.add_edge("synthesizer",     "diff_engine")
     graph.add_edge("diff_engine",     "report_writer")
     graph.add_edge("report_writer",   END)
 
-    return graph.compile()
+    return graph.compile(checkpointer=checkpointer)
+
+
+@lru_cache(maxsize=None)
+def get_compiled_graph(replay: bool = False):
+    """
+    Compiled graph, memoized per process. Compiled graphs are stateless and safe
+    to share; per-run state lives in the SQLite checkpointer, keyed by run ID.
+    """
+    from agent.checkpoint import get_checkpointer
+    return build_graph(replay=replay, checkpointer=get_checkpointer())
 
 
-def run_agent(vendors: list[str], research_query: str, save_to_drive: bool = False) -> AgentState:
+def run_agent(vendors: list[str], research_query: str, save_to_drive: bool = False,
+              profile: bool = False, deadline_seconds: int = None) -> AgentState:
     """Invoke the full pipeline (blocking). Returns final state."""
-    app = build_graph()
-    initial_state = _make_initial_state(vendors, research_query, save_to_drive)
-    return app.invoke(initial_state)
+    initial_state = _start_run(vendors, research_query, save_to_drive, profile=profile,
+                               deadline_seconds=deadline_seconds)
+    return _invoke_run(get_compiled_graph(), initial_state, initial_state["run_id"])
+
+
+def stream_agent(vendors: list[str], research_query: str, save_to_drive: bool = False, run_id: str = None,
+                 stream_tokens: bool = False, profile: bool = False, deadline_seconds: int = None):
+    """
+    Stream the pipeline node-by-node as lightweight progress events.
+
+    Yields ("__start__", {"run_id": ...}) first, then (node_name, update) after
+    each node completes, where update holds only what that node changed
+    (e.g. the new syntheses), not the whole state. The final yield is
+    ("__end__", final_state) with the full reduced state.
+    Pass the run ID to resume_stream() if the run fails or is interrupted.
+    run_id may be given to use an ID handed out in advance (see agent.worker.submit_run).
+
+    With stream_tokens=True, LLM output is also yielded as it is generated:
+    ("__token__", {"node": ..., "vendor_name": ..., "text": <new chunk>}).
+    Either way the text streamed so far is kept in run_previews for other processes.
+
+    With profile=True (or PROFILING_ENABLED) every node is profiled, see agent/profiling.py.
+
+    deadline_seconds (default RUN_DEADLINE_SECONDS, 0 = none) bounds the run: as it
+    runs short the pipeline degrades, and past it the report is written from what
+    completed. The same happens when request_cancel() is called. See agent/deadline.py.
+    """
+    initial_state = _start_run(vendors, research_query, save_to_drive, run_id=run_id, profile=profile,
+                               deadline_seconds=deadline_seconds)
+    yield from _stream_run(get_compiled_graph(), initial_state, initial_state["run_id"], stream_tokens)
 
 
-def stream_agent(vendors: list[str], research_query: str, save_to_drive: bool = False):
+def resume_stream(run_id: str, stream_tokens: bool = False):
     """
-    Stream the pipeline node-by-node.
-    Yields (node_name, partial_state) after each node completes.
-    Final yield will have node_name == '__end__' and full final state.
+    Continue a failed or interrupted run from its last checkpoint.
+    Completed nodes are not re-run, and inside the interrupted node vendors that
+    already finished are served from run_vendor_results. Same yields as stream_agent.
+    The resumed leg gets the run's full deadline again.
     """
-    app = build_graph()
-    initial_state = _make_initial_state(vendors, research_query, save_to_drive)
+    run = get_run(run_id)
+    if not run:
+        raise ValueError(f"Unknown run '{run_id}'")
+
+    app = get_compiled_graph(replay=bool(run.get("replay_run_id")))
+    snapshot = app.get_state(run_config(run_id))
+    if not snapshot.values:
+        raise ValueError(f"No checkpoint stored for run '{run_id}' — start a new run instead.")
+
+    yield from _stream_run(app, None, run_id, stream_tokens)
 
-    final_state = initial_state
-    for event in app.stream(initial_state, stream_mode="updates"):
-        for node_name, node_output in event.items():
-            # Merge partial output into running state
-            final_state = {**final_state, **node_output}
-            yield node_name, final_state
 
+def resume_agent(run_id: str) -> AgentState:
+    """Blocking variant of resume_stream(). Returns final state."""
+    final_state = None
+    for node_name, state in resume_stream(run_id):
+        final_state = state
+    return final_state
+
+
+def replay_agent(run_id: str, research_query: str = None, save_to_drive: bool = False) -> AgentState:
+    """
+    Re-run synthesis → diff → report for a past run using only its stored raw
+    sources (no scraping, no YouTube/Drive calls). Defaults to the original
+    research query. Returns final state.
+    """
+    manifest = get_run_manifest(run_id)
+    vendors = list(dict.fromkeys(entry["vendor_name"] for entry in manifest if entry["vendor_name"]))
+    if research_query is None:
+        original = get_report_by_run_id(run_id)
+        research_query = (original or {}).get("research_query") or "General competitive overview"
+
+    initial_state = _start_run(vendors, research_query, save_to_drive, replay_run_id=run_id)
+    return _invoke_run(get_compiled_graph(replay=True), initial_state, initial_state["run_id"])
+
+
+def stream_batch(vendors: list[str], research_queries: list[str], save_to_drive: bool = False,
+                 stream_tokens: bool = False, deadline_seconds: int = None):
+    """
+    Scrape once, synthesize many. The first query runs the full pipeline; every
+    other query replays that run's raw sources (source_replay → synthesizer →
+    diff_engine → report_writer), so scraping, transcripts and scrapbook reads
+    happen once per vendor. Each query gets its own run and report.
+
+    Yields each run's events in turn, exactly as stream_agent does. The
+    "__start__" payload also carries batch_id, batch_index and research_query.
+    Diffs compare against snapshots from before the batch, not against sibling queries.
+    Each run gets its own deadline_seconds.
+    """
+    batch_id = uuid.uuid4().hex
+    ingest_run_id = None
+    for index, research_query in enumerate(research_queries):
+        if ingest_run_id is None:
+            initial_state = _start_run(vendors, research_query, save_to_drive, batch_id=batch_id,
+                                       deadline_seconds=deadline_seconds)
+            app = get_compiled_graph()
+            ingest_run_id = initial_state["run_id"]
+        else:
+            initial_state = _start_run(vendors, research_query, save_to_drive,
+                                       replay_run_id=ingest_run_id, batch_id=batch_id,
+                                       deadline_seconds=deadline_seconds)
+            app = get_compiled_graph(replay=True)
+
+        for node_name, update in _stream_run(app, initial_state, initial_state["run_id"], stream_tokens):
+            if node_name == "__start__":
+                update = {**update, "batch_id": batch_id, "batch_index": index, "research_query": research_query}
+            yield node_name, update
+
+
+def batch_agent(vendors: list[str], research_queries: list[str], save_to_drive: bool = False) -> list[AgentState]:
+    """Blocking variant of stream_batch(). Returns each query's final state, in order."""
+    return [state for node_name, state in stream_batch(vendors, research_queries, save_to_drive)
+            if node_name == "__end__"]
+
+
+# ── Run lifecycle ──────────────────────────────────────────────────────────────
+
+def _start_run(vendors, research_query, save_to_drive, replay_run_id="", batch_id="", run_id=None,
+               profile=False, deadline_seconds=None) -> AgentState:
+    initial_state = _make_initial_state(vendors, research_query, save_to_drive, run_id)
+    initial_state["replay_run_id"] = replay_run_id
+    initial_state["batch_id"] = batch_id
+    initial_state["profile"] = profile or PROFILING_ENABLED
+    initial_state["deadline_seconds"] = RUN_DEADLINE_SECONDS if deadline_seconds is None else deadline_seconds
+    create_run(initial_state["run_id"], research_query, vendors, save_to_drive, replay_run_id, batch_id)
+    return initial_state
+
+
+def _invoke_run(app, graph_input, run_id) -> AgentState:
+    update_run_status(run_id, "running")
+    try:
+        with trace_run(run_id) as root, run_control(run_id, graph_input.get("deadline_seconds") or 0), \
+                run_flights():
+            result = app.invoke(graph_input, run_config(run_id))
+            root.set(stopped=result.get("stopped") or None)
+    except Exception as e:
+        update_run_status(run_id, "failed", str(e))
+        raise
+    _finish_run(app, run_id)
+    return result
+
+
+def _stream_run(app, graph_input, run_id, stream_tokens=False):
+    """
+    Drive app.stream() for a run, keeping the runs table status in sync and
+    logging each node to run_events so other processes can follow progress.
+    LLM tokens (LangGraph "messages" mode) are accumulated per (node, vendor) and
+    written to run_previews at most every PREVIEW_FLUSH_SECONDS, and at each node end.
+    The run is traced to TRACE_DIR/<run_id>.jsonl (see agent/tracing.py), its
+    deadline and cancel token are in force throughout (see agent/deadline.py),
+    and duplicate fetches within it are coalesced (see agent/singleflight.py).
+    """
+    update_run_status(run_id, "running")
+    config = run_config(run_id)
+    started = time.time()
+    outcome = "interrupted"   # stays so if the consumer stops iterating (e.g. Streamlit rerun)
+    previews, dirty, flushed_at = {}, set(), 0.0
+    try:
+        yield "__start__", {"run_id": run_id}
+        deadline_seconds = (graph_input or app.get_state(config).values).get("deadline_seconds") or 0
+        with trace_run(run_id, resumed=graph_input is None) as root, run_control(run_id, deadline_seconds), \
+                run_flights():
+            for mode, payload in app.stream(graph_input, config, stream_mode=["updates", "messages"]):
+                if mode == "messages":
+                    chunk, metadata = payload
+                    text = _chunk_text(chunk)
+                    if not text:
+                        continue
+                    key = (metadata.get("langgraph_node", ""), metadata.get("vendor_name", ""))
+                    previews[key] = previews.get(key, "") + text
+                    dirty.add(key)
+                    if time.monotonic() - flushed_at >= PREVIEW_FLUSH_SECONDS:
+                        save_run_previews(run_id, {k: previews[k] for k in dirty})
+                        dirty, flushed_at = set(), time.monotonic()
+                    if stream_tokens:
+                        yield "__token__", {"node": key[0], "vendor_name": key[1], "text": text}
+                    continue
+
+                save_run_previews(run_id, {k: previews[k] for k in dirty})
+                dirty = set()
+                for node_name, node_output in payload.items():
+                    save_run_event(run_id, node_name, _event_summary(node_output or {}))
+                    yield node_name, node_output or {}
+            final_state = app.get_state(config).values
+            root.set(stopped=final_state.get("stopped") or None)
+        final_state["analysis_duration_seconds"] = round(time.time() - started, 1)
+        save_run_result(run_id, {k: v for k, v in final_state.items() if k != "raw_data"})
+        outcome = "completed"
+    except Exception as e:
+        outcome = "failed"
+        update_run_status(run_id, "failed", str(e))
+        raise
+    finally:
+        if outcome == "interrupted":
+            update_run_status(run_id, "interrupted")
+
+    _finish_run(app, run_id)
     yield "__end__", final_state
 
 
-def _make_initial_state(vendors, research_query, save_to_drive) -> AgentState:
+def _chunk_text(chunk) -> str:
+    """Plain text of a streamed message chunk (content may be a list of parts)."""
+    content = getattr(chunk, "content", "")
+    if isinstance(content, str):
+        return content
+    return "".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in content)
+
+
+def _event_summary(update: dict) -> dict:
+    """The small part of a node update worth logging: new errors and a synthesis preview."""
+    summary = {"errors": update.get("errors") or []}
+    if update.get("syntheses"):
+        summary["preview"] = [
+            {"vendor_name": s["vendor_name"], "recent_launches": (s.get("recent_launches") or "")[:PREVIEW_CHARS]}
+            for s in update["syntheses"]
+        ]
+    return summary
+
+
+def _finish_run(app, run_id):
+    """Mark a run completed and drop its checkpoints / scratch results."""
+    update_run_status(run_id, "completed")
+    app.checkpointer.delete_thread(run_id)
+    clear_run_scratch(run_id)
+
+
+def _make_initial_state(vendors, research_query, save_to_drive, run_id=None) -> AgentState:
     return {
         "vendors": vendors,
         "research_query": research_query,
         "save_to_drive": save_to_drive,
+        "run_id": run_id or uuid.uuid4().hex,
+        "replay_run_id": "",
+        "batch_id": "",
+        "profile": False,
+        "deadline_seconds": 0,
         "raw_data": [],
         "syntheses": [],
         "diffs": [],
@@ -88,5 +345,7 @@ def _make_initial_state(vendors, research_query, save_to_drive) -> AgentState:
         "analysis_duration_seconds": 0.0,
         "drive_duration_seconds": 0.0,
         "errors": [],
+        "partial_vendors": [],
+        "stopped": "",
         "current_step": "starting",
     }
@@ -0,0 +1,111 @@
+import base64
+import math
+import struct
+from functools import lru_cache
+from config.settings import OPENAI_API_KEY, OPENAI_MODEL, MODEL_PRICES
+from db.database import save_run_usage
+
+# High-detail image tokens when the dimensions can't be read (a 1024×1024 image)
+DEFAULT_IMAGE_TOKENS = 765
+LOW_DETAIL_IMAGE_TOKENS = 85   # flat, whatever the size
+
+
+@lru_cache(maxsize=None)
+def get_llm(temperature: float = 0.2, model: str = OPENAI_MODEL):
+    """
+    Shared ChatOpenAI client, created on first use and reused per (model, temperature).
+    langchain_openai is imported here rather than at module load so that
+    importing the graph (or a UI page) doesn't pay for it.
+    stream_usage keeps token counts on responses that were streamed (see _stream_run).
+    With a cassette (agent/cassette.py) calls are recorded, or answered from it offline.
+    """
+    from agent import cassette
+    if cassette.mode() == cassette.REPLAY:
+        return cassette.replay_chat_model(model)
+    from langchain_openai import ChatOpenAI
+    callbacks = [cassette.llm_recorder(model)] if cassette.mode() == cassette.RECORD else None
+    return ChatOpenAI(model=model, api_key=OPENAI_API_KEY, temperature=temperature, stream_usage=True,
+                      callbacks=callbacks)
+
+
+def token_usage(response) -> dict:
+    """Input / output / cached-input token counts reported on an LLM response (None if the model gave none)."""
+    usage = getattr(response, "usage_metadata", None) or {}
+    details = usage.get("input_token_details") or {}
+    return {
+        "input_tokens": usage.get("input_tokens"),
+        "output_tokens": usage.get("output_tokens"),
+        "cached_tokens": details.get("cache_read"),
+    }
+
+
+def llm_cost(model: str, input_tokens: int, output_tokens: int, cached_tokens: int = 0) -> float | None:
+    """USD cost of one call from MODEL_PRICES, or None if the model has no price."""
+    prices = MODEL_PRICES.get(model)
+    if not prices:
+        return None
+    input_price, cached_price, output_price = prices
+    cached_tokens = cached_tokens or 0
+    return round(
+        ((input_tokens - cached_tokens) * input_price + cached_tokens * cached_price
+         + output_tokens * output_price) / 1_000_000,
+        6,
+    )
+
+
+def _image_size(data: bytes) -> tuple[int, int] | None:
+    """(width, height) of a PNG or JPEG, read from its header."""
+    if data[:8] == b"\x89PNG\r\n\x1a\n" and len(data) >= 24:
+        return struct.unpack(">II", data[16:24])
+    if data[:2] == b"\xff\xd8":
+        i = 2
+        while i + 9 < len(data):
+            if data[i] != 0xFF:
+                i += 1
+                continue
+            marker = data[i + 1]
+            length = struct.unpack(">H", data[i + 2:i + 4])[0]
+            if marker in (0xC0, 0xC1, 0xC2):   # start of frame
+                height, width = struct.unpack(">HH", data[i + 5:i + 9])
+                return width, height
+            i += 2 + length
+    return None
+
+
+def estimate_image_tokens(image_b64: str) -> int:
+    """
+    Input tokens for one detail="high" image, per OpenAI's tiling rule: fit in
+    2048×2048, scale the short side to 768, then 170 per 512px tile plus 85.
+    """
+    try:
+        size = _image_size(base64.b64decode(image_b64))
+    except (ValueError, struct.error):
+        size = None
+    if not size or not all(size):
+        return DEFAULT_IMAGE_TOKENS
+    width, height = size
+    scale = min(1.0, 2048 / max(width, height))
+    width, height = width * scale, height * scale
+    scale = min(1.0, 768 / min(width, height))
+    width, height = width * scale, height * scale
+    return 85 + 170 * math.ceil(width / 512) * math.ceil(height / 512)
+
+
+def record_usage(run_id: str, node: str, vendor_name: str, response, model: str = OPENAI_MODEL,
+                 images: list[str] = None, sources: dict = None, image_detail: str = "high") -> dict:
+    """
+    Price an LLM response and store it in run_usage. images are the base64 images
+    sent with the prompt at image_detail (their tokens are estimated — the API folds
+    them into input tokens); sources maps source kind → prompt characters.
+    Returns the usage, for tracing.
+    """
+    usage = token_usage(response)
+    if usage["input_tokens"] is None:
+        return usage
+    if image_detail == "low":
+        usage["image_tokens"] = LOW_DETAIL_IMAGE_TOKENS * len(images or [])
+    else:
+        usage["image_tokens"] = sum(estimate_image_tokens(image) for image in images or [])
+    usage["cost_usd"] = llm_cost(model, usage["input_tokens"], usage["output_tokens"] or 0, usage["cached_tokens"])
+    save_run_usage(run_id, node, vendor_name, model, usage, sources)
+    return usage
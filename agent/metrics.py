@@ -0,0 +1,220 @@
+"""
+Prometheus metrics.
+
+An in-process registry of counters and histograms, exposed in the Prometheus
+text format on http://<host>:METRICS_PORT/metrics and/or written every
+METRICS_TEXTFILE_SECONDS to METRICS_TEXTFILE for node_exporter's textfile
+collector. Both run on daemon threads; recording a sample is an in-memory
+update under a lock, so the pipeline never waits on an exporter.
+
+Most samples come from finished tracing spans (see observe_span), so anything
+traced in agent/tracing.py is measured without extra hooks.
+"""
+import logging
+import os
+import threading
+import time
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+from config.settings import METRICS_PORT, METRICS_TEXTFILE, METRICS_TEXTFILE_SECONDS
+
+log = logging.getLogger("metrics")
+
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+_lock = threading.Lock()
+_registry = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra="") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)] + ([extra] if extra else [])
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labelnames=()):
+        self.name, self.help, self.labelnames = name, help_text, tuple(labelnames)
+        self._values = {}
+        _registry.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name, self.help, self.labelnames = name, help_text, tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}   # labels → [per-bucket counts..., sum, count]
+        _registry.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with _lock:
+            series = self._values.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, series in sorted(self._values.items()):
+            for bound, count in zip(self.buckets, series):
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {count}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {series[-1]}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {series[-2]}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {series[-1]}")
+        return lines
+
+
+# ── Metrics ────────────────────────────────────────────────────────────────────
+
+RUNS = Counter("compintel_runs_total", "Pipeline runs by outcome (partial ones as cancelled / deadline).",
+               ["status"])
+RUN_SECONDS = Histogram("compintel_run_seconds", "Wall time of a run (or a resumed leg of one).")
+NODE_SECONDS = Histogram("compintel_node_seconds", "Wall time per graph node execution.", ["node"])
+VENDOR_CACHE = Counter("compintel_vendor_cache_total",
+                       "Per-vendor node results served from a resumed run's cache vs computed.",
+                       ["node", "result"])
+SCRAPE_SECONDS = Histogram("compintel_scrape_seconds", "Page fetch latency.", ["domain"])
+HTTP_RESPONSES = Counter("compintel_http_responses_total", "Page fetches by status class.",
+                         ["domain", "status_class"])
+LLM_SECONDS = Histogram("compintel_llm_seconds", "LLM call latency.", ["node", "model"])
+LLM_TOKENS = Counter("compintel_llm_tokens_total", "LLM tokens by kind (input, cached, image, output).",
+                     ["node", "model", "kind"])
+LLM_COST = Counter("compintel_llm_cost_usd_total", "Priced LLM spend in USD.", ["node", "model"])
+API_CALLS = Counter("compintel_api_calls_total", "Google Drive / Docs / YouTube calls.", ["api", "status"])
+API_SECONDS = Histogram("compintel_api_seconds", "Google Drive / Docs / YouTube call latency.", ["api"])
+YOUTUBE_QUOTA = Counter("compintel_youtube_quota_units_total", "YouTube Data API quota units spent.")
+JOBS = Counter("compintel_jobs_total", "Queue jobs by outcome (completed, failed, retried).",
+               ["status"])
+
+API_SPANS = ("drive.", "docs.", "youtube.")
+
+
+def _status_class(attributes: dict, failed: bool) -> str:
+    code = attributes.get("status_code")
+    if code:
+        return f"{int(code) // 100}xx"
+    if attributes.get("circuit_open"):
+        return "circuit_open"
+    if attributes.get("robots_disallowed"):
+        return "robots_disallowed"
+    return "error" if failed else "unknown"
+
+
+def observe_span(record: dict):
+    """Turn a finished tracing span into metric samples."""
+    name, attrs = record["name"], record["attributes"]
+    seconds = (record["end_time_unix_nano"] - record["start_time_unix_nano"]) / 1e9
+    failed = record["status"]["code"] == "ERROR"
+
+    if name == "run":
+        RUNS.inc(status="interrupted" if attrs.get("interrupted") else "failed" if failed
+                 else attrs.get("stopped") or "completed")   # stopped: cancelled / deadline (partial report)
+        RUN_SECONDS.observe(seconds)
+    elif name == "node":
+        NODE_SECONDS.observe(seconds, node=attrs.get("node"))
+        if "cache_hits" in attrs:
+            VENDOR_CACHE.inc(attrs["cache_hits"], node=attrs.get("node"), result="hit")
+            VENDOR_CACHE.inc(max(attrs.get("vendors", 0) - attrs["cache_hits"], 0), node=attrs.get("node"),
+                             result="miss")
+        elif attrs.get("node") in ("synthesizer", "diff_engine"):
+            VENDOR_CACHE.inc(attrs.get("vendors", 0), node=attrs.get("node"), result="miss")
+    elif name == "vendor" and "cache_hit" in attrs:
+        VENDOR_CACHE.inc(node=attrs.get("node"), result="hit" if attrs["cache_hit"] else "miss")
+    elif name == "http.scrape":
+        domain = urlparse(attrs.get("url", "")).netloc
+        SCRAPE_SECONDS.observe(seconds, domain=domain)
+        HTTP_RESPONSES.inc(domain=domain, status_class=_status_class(attrs, failed))
+    elif name == "llm":
+        labels = {"node": attrs.get("node"), "model": attrs.get("model")}
+        LLM_SECONDS.observe(seconds, **labels)
+        for kind in ("input", "cached", "image", "output"):
+            if attrs.get(f"{kind}_tokens"):
+                LLM_TOKENS.inc(attrs[f"{kind}_tokens"], kind=kind, **labels)
+        if attrs.get("cost_usd"):
+            LLM_COST.inc(attrs["cost_usd"], **labels)
+    elif name.startswith(API_SPANS):
+        API_CALLS.inc(api=name, status="error" if failed else "ok")
+        API_SECONDS.observe(seconds, api=name)
+
+
+def render() -> str:
+    with _lock:
+        lines = [line for metric in _registry for line in metric.render()]
+    return "\n".join(lines) + "\n"
+
+
+# ── Exporters ──────────────────────────────────────────────────────────────────
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def write_textfile(path: str = METRICS_TEXTFILE):
+    """Atomically replace the textfile-collector file with the current samples."""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        f.write(render())
+    os.replace(tmp, path)
+
+
+def _textfile_loop(path, interval):
+    while True:
+        try:
+            write_textfile(path)
+        except OSError as e:
+            log.warning("Could not write metrics to %s: %s", path, e)
+        time.sleep(interval)
+
+
+@lru_cache(maxsize=None)
+def start_exporters(port: int = METRICS_PORT, textfile: str = METRICS_TEXTFILE) -> bool:
+    """
+    Start the /metrics endpoint and/or the textfile writer configured in
+    settings, once per process. A port already taken (another worker on the
+    same host) is logged and skipped. Returns True if anything was started.
+    """
+    started = False
+    if port:
+        try:
+            server = ThreadingHTTPServer(("", port), _Handler)
+            threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+            started = True
+        except OSError as e:
+            log.warning("Metrics endpoint not started on port %d: %s", port, e)
+    if textfile:
+        threading.Thread(target=_textfile_loop, args=(textfile, METRICS_TEXTFILE_SECONDS),
+                         name="metrics-textfile", daemon=True).start()
+        started = True
+    return started
@@ -1,10 +1,13 @@
-from langchain_openai import ChatOpenAI
 from langchain_core.messages import HumanMessage, SystemMessage
 from agent.state import AgentState, DiffResult
-from db.database import get_last_report_for_vendor
-from config.settings import OPENAI_API_KEY, OPENAI_MODEL
+from agent.deadline import RunStopped, STOP_LABELS, current_control, partial_vendor
+from db.database import get_last_report_for_vendor, get_vendor_result, save_vendor_result
+from agent.llm import get_llm, record_usage
+from agent.report_fragments import store_fragment
+from agent.tracing import span, current_span
+from config.settings import OPENAI_MODEL
 
-llm = ChatOpenAI(model=OPENAI_MODEL, api_key=OPENAI_API_KEY, temperature=0.1)
+TEMPERATURE = 0.1
 
 DIFF_SYSTEM = """You are a competitive intelligence analyst. Your job is to compare 
 two intelligence snapshots for the same competitor and identify only what is genuinely 
@@ -34,56 +37,90 @@ def diff_engine_node(state: AgentState) -> AgentState:
     """
     Compare new syntheses against previous stored snapshots.
     Highlights only what is new/changed since last run.
+    Each vendor's report fragment is rendered as soon as its diff is ready.
     """
     syntheses = state.get("syntheses", [])
     diffs: list[DiffResult] = []
-    errors = state.get("errors", [])
+    errors = []
+    partial = []
 
     for synthesis in syntheses:
-        vendor_name = synthesis["vendor_name"]
-        current_synthesis = synthesis["raw_synthesis"]
-
-        last = get_last_report_for_vendor(vendor_name)
-
-        if not last:
-            # First run for this vendor
-            diffs.append({
-                "vendor_name": vendor_name,
-                "delta_summary": "📋 First run for this vendor — no previous snapshot to compare against.",
-                "is_first_run": True,
-            })
-            continue
-
-        try:
-            prompt = DIFF_PROMPT.format(
-                vendor_name=vendor_name,
-                prev_date=last.get("created_at", "unknown date"),
-                previous=last.get("new_snapshot", "")[:3000],
-                current=current_synthesis[:3000],
-            )
-
-            response = llm.invoke([
-                SystemMessage(content=DIFF_SYSTEM),
-                HumanMessage(content=prompt),
-            ])
-
-            diffs.append({
-                "vendor_name": vendor_name,
-                "delta_summary": response.content,
-                "is_first_run": False,
-            })
-
-        except Exception as e:
-            errors.append(f"Diff failed for {vendor_name}: {str(e)}")
-            diffs.append({
-                "vendor_name": vendor_name,
-                "delta_summary": "[Diff computation failed]",
-                "is_first_run": False,
-            })
+        diff = _diff_vendor(state, synthesis, errors, partial)
+        diffs.append(diff)
+        store_fragment(synthesis, diff)
 
     return {
-        **state,
         "diffs": diffs,
         "errors": errors,
+        "partial_vendors": partial,
         "current_step": "diff_complete",
     }
+
+
+def _diff_vendor(state: AgentState, synthesis, errors: list[str], partial: list[dict]) -> DiffResult:
+    vendor_name = synthesis["vendor_name"]
+    current_synthesis = synthesis["raw_synthesis"]
+    run_id = state.get("run_id", "")
+
+    cached = get_vendor_result(run_id, "diff_engine", vendor_name)
+    if cached:
+        current_span().incr("cache_hits")
+        return cached
+
+    last = get_last_report_for_vendor(vendor_name, exclude_batch_id=state.get("batch_id"))
+
+    if not last:
+        # First run for this vendor
+        return {
+            "vendor_name": vendor_name,
+            "delta_summary": "📋 First run for this vendor — no previous snapshot to compare against.",
+            "is_first_run": True,
+        }
+
+    control = current_control()
+    stop = control.stop_reason()
+    if stop:
+        partial.append(partial_vendor(vendor_name, "diff_engine", f"not compared — {STOP_LABELS[stop]}"))
+        return {
+            "vendor_name": vendor_name,
+            "delta_summary": f"[Diff skipped — {STOP_LABELS[stop]}]",
+            "is_first_run": False,
+        }
+
+    try:
+        prompt = DIFF_PROMPT.format(
+            vendor_name=vendor_name,
+            prev_date=last.get("created_at", "unknown date"),
+            previous=last.get("new_snapshot", "")[:3000],
+            current=current_synthesis[:3000],
+        )
+
+        with span("llm", vendor=vendor_name, model=OPENAI_MODEL, prompt_chars=len(prompt)) as s:
+            response = control.call(get_llm(TEMPERATURE).invoke, [
+                SystemMessage(content=DIFF_SYSTEM),
+                HumanMessage(content=prompt),
+            ], config={"metadata": {"vendor_name": vendor_name}})
+            s.set(**record_usage(run_id, "diff_engine", vendor_name, response))
+
+        diff = {
+            "vendor_name": vendor_name,
+            "delta_summary": response.content,
+            "is_first_run": False,
+        }
+        save_vendor_result(run_id, "diff_engine", vendor_name, diff)
+        return diff
+
+    except RunStopped as e:
+        partial.append(partial_vendor(vendor_name, "diff_engine", f"comparison stopped — {e}"))
+        return {
+            "vendor_name": vendor_name,
+            "delta_summary": f"[Diff skipped — {e}]",
+            "is_first_run": False,
+        }
+    except Exception as e:
+        errors.append(f"Diff failed for {vendor_name}: {str(e)}")
+        return {
+            "vendor_name": vendor_name,
+            "delta_summary": "[Diff computation failed]",
+            "is_first_run": False,
+        }
@@ -1,5 +1,8 @@
+from agent.deadline import RunStopped, STOP_LABELS, current_control, partial_vendor
 from agent.state import AgentState
 from agent.tools.gdrive_tool import get_scrapbook_section
+from agent.tracing import span
+from db.database import save_raw_source, get_vendor_result, save_vendor_result
 
 
 def gdoc_reader_node(state: AgentState) -> AgentState:
@@ -10,25 +13,40 @@ def gdoc_reader_node(state: AgentState) -> AgentState:
     Updates scrapbook_content and scrapbook_images in raw_data.
     """
     vendors = state["vendors"]
-    raw_data = {d["vendor_name"]: d for d in state.get("raw_data", [])}
-    errors = state.get("errors", [])
+    raw_data = []
+    partial = []
+    run_id = state.get("run_id", "")
+    control = current_control()
 
     for vendor_name in vendors:
-        result = get_scrapbook_section(vendor_name)
+        result = get_vendor_result(run_id, "gdoc_reader", vendor_name)
+        stop = control.stop_reason() if result is None else ""
+        if stop:
+            partial.append(partial_vendor(vendor_name, "gdoc_reader", f"scrapbook not read — {STOP_LABELS[stop]}"))
+            continue
+
+        with span("vendor", vendor=vendor_name, cache_hit=result is not None) as s:
+            if result is None:
+                try:
+                    result = get_scrapbook_section(vendor_name)
+                except RunStopped as e:
+                    partial.append(partial_vendor(vendor_name, "gdoc_reader", f"scrapbook stopped — {e}"))
+                    continue
+                if result.get("text") or result.get("images"):
+                    save_raw_source(run_id, vendor_name, "scrapbook", f"scrapbook:{vendor_name}", result.get("text", ""))
+                for i, image_b64 in enumerate(result.get("images", [])):
+                    save_raw_source(run_id, vendor_name, "scrapbook_image", f"scrapbook:{vendor_name}#image-{i}", image_b64)
+                save_vendor_result(run_id, "gdoc_reader", vendor_name, result)
+            s.set(images=len(result.get("images", [])))
+
         scrapbook_text = result.get("text", "")
         scrapbook_images = result.get("images", [])
 
-        if vendor_name in raw_data:
-            raw_data[vendor_name]["scrapbook_content"] = scrapbook_text
-            raw_data[vendor_name]["scrapbook_images"] = scrapbook_images
-        else:
-            raw_data[vendor_name] = {
-                "vendor_name": vendor_name,
-                "web_content": "",
-                "youtube_content": "",
-                "scrapbook_content": scrapbook_text,
-                "scrapbook_images": scrapbook_images,
-            }
+        raw_data.append({
+            "vendor_name": vendor_name,
+            "scrapbook_content": scrapbook_text,
+            "scrapbook_images": scrapbook_images,
+        })
 
         if scrapbook_images:
             img_count = len(scrapbook_images)
@@ -37,8 +55,7 @@ def gdoc_reader_node(state: AgentState) -> AgentState:
             # In a future version this could be a proper log channel
 
     return {
-        **state,
-        "raw_data": list(raw_data.values()),
-        "errors": errors,
+        "raw_data": raw_data,
+        "partial_vendors": partial,
         "current_step": "gdoc_reading_complete",
     }
@@ -1,8 +1,10 @@
 import time
 from datetime import datetime
 from agent.state import AgentState
+from agent.deadline import CANCELLED, STOP_LABELS, current_control, partial_notes
 from agent.tools.gdrive_tool import upload_report_to_drive
-from db.database import save_report, save_diff_log
+from agent.report_fragments import get_fragments
+from db.database import confirm_crawl_visits, save_report, save_diff_log
 
 
 def report_writer_node(state: AgentState) -> AgentState:
@@ -10,6 +12,8 @@ def report_writer_node(state: AgentState) -> AgentState:
     Format the final markdown report.
     Conditionally saves to SQLite + uploads to Google Drive based on save_to_drive flag.
     Tracks timing for analysis and drive upload separately.
+    Always runs, also for a cancelled or timed-out run: the report then covers what
+    completed and lists what was left out (a cancelled run is not uploaded to Drive).
     """
     syntheses = state.get("syntheses", [])
     diffs = state.get("diffs", [])
@@ -17,6 +21,10 @@ def report_writer_node(state: AgentState) -> AgentState:
     vendors = state.get("vendors", [])
     errors = state.get("errors", [])
     save_to_drive = state.get("save_to_drive", False)
+    partial = state.get("partial_vendors", [])
+    stopped = current_control().stop_reason() if partial else ""   # nothing left out = not partial
+    if stopped == CANCELLED:
+        save_to_drive = False
 
     diff_lookup = {d["vendor_name"]: d for d in diffs}
 
@@ -31,55 +39,35 @@ def report_writer_node(state: AgentState) -> AgentState:
         f"**Research Focus:** {research_query}  ",
         f"**Vendors Analyzed:** {', '.join(vendors)}",
         "",
+    ]
+    if stopped or partial:
+        reason = STOP_LABELS[stopped] if stopped else "run deadline near"
+        lines += [f"> ⚠️ **Partial report** ({reason}) — see Partial Results below.", ""]
+    lines += [
         "---",
         "",
         "## 🔔 What's New Since Last Run",
         "",
     ]
 
-    if diffs:
-        for diff in diffs:
-            lines.append(f"### {diff['vendor_name']}")
-            lines.append(diff["delta_summary"])
-            lines.append("")
+    # Per-vendor sections were rendered as each diff completed (agent/report_fragments.py)
+    fragments = get_fragments(syntheses, diff_lookup)
+
+    whats_new = [f["whats_new"] for f in fragments if f["whats_new"] is not None]
+    if whats_new:
+        lines += whats_new
     else:
         lines.append("_This is the first run. No previous snapshot to compare against._")
         lines.append("")
 
     lines += ["---", "", "## 📊 Full Intelligence by Vendor", ""]
+    lines += [f["intelligence"] for f in fragments]
 
-    for synthesis in syntheses:
-        vendor = synthesis["vendor_name"]
-        lines += [
-            f"## {vendor}",
-            "",
-            "### 🚀 Recent Feature Launches & Updates",
-            synthesis.get("recent_launches", "_No data_"),
-            "",
-            "### 🎯 Use Cases & Target Segments",
-            synthesis.get("use_cases", "_No data_"),
-            "",
-            "### ⚙️ Technical Architecture & Protocol Support",
-            synthesis.get("technical_details", "_No data_"),
-            "",
-            "### 🖥️ User Interface & UX",
-            synthesis.get("ui_ux", "_No data_"),
-            "",
-            "### 💰 Pricing & Packaging",
-            synthesis.get("pricing_signals", "_No data_"),
-            "",
-            "### 🧭 Strategic Direction",
-            synthesis.get("strategic_direction", "_No data_"),
-            "",
-            "### ⚔️ Gaps vs Your Product",
-            synthesis.get("gap_vs_your_product", "_No data_"),
-            "",
-            "### 👁️ Key Watch Points",
-            synthesis.get("watch_points", "_No data_"),
-            "",
-            "---",
-            "",
-        ]
+    if partial:
+        lines += ["## ⏱️ Partial Results", ""]
+        for vendor_name, notes in partial_notes(partial).items():
+            lines.append(f"- **{vendor_name}** — {notes}")
+        lines.append("")
 
     if errors:
         lines += ["## ⚠️ Errors During This Run", ""]
@@ -100,6 +88,7 @@ def report_writer_node(state: AgentState) -> AgentState:
             vendors_covered=vendors,
             report_markdown=report_markdown,
             gdrive_link="",
+            run_id=state.get("run_id"),
         )
 
         for synthesis in syntheses:
@@ -108,7 +97,6 @@ def report_writer_node(state: AgentState) -> AgentState:
             save_diff_log(
                 report_id=report_id,
                 vendor_name=vendor_name,
-                previous_snapshot=diff.get("delta_summary", ""),
                 new_snapshot=synthesis["raw_synthesis"],
                 delta_summary=diff.get("delta_summary", ""),
             )
@@ -126,6 +114,7 @@ def report_writer_node(state: AgentState) -> AgentState:
             vendors_covered=vendors,
             report_markdown=report_markdown,
             gdrive_link="__local_only__",
+            run_id=state.get("run_id"),
         )
         for synthesis in syntheses:
             vendor_name = synthesis["vendor_name"]
@@ -133,16 +122,17 @@ def report_writer_node(state: AgentState) -> AgentState:
             save_diff_log(
                 report_id=report_id,
                 vendor_name=vendor_name,
-                previous_snapshot=diff.get("delta_summary", ""),
                 new_snapshot=synthesis["raw_synthesis"],
                 delta_summary=diff.get("delta_summary", ""),
             )
 
+    # Crawled pages count as seen only now that a report carries them (agent/tools/crawler.py)
+    confirm_crawl_visits(state.get("run_id", ""), [url for s in syntheses for url in s.get("crawled_urls", [])])
+
     return {
-        **state,
         "final_report_markdown": report_markdown,
         "gdrive_link": gdrive_link,
         "drive_duration_seconds": drive_duration,
-        "errors": errors,
+        "stopped": stopped,
         "current_step": "report_complete",
     }
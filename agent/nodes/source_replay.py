@@ -0,0 +1,70 @@
+from agent.state import AgentState
+from agent.tools.scraper_tool import join_sources
+from db.database import get_run_manifest, get_raw_content, save_raw_source, CHECKPOINT_SOURCE
+
+MARKETING_SOURCES = ("website", "blog")
+TECHNICAL_SOURCES = ("docs", "changelog")
+CRAWLED_SOURCES = ("blog_page", "docs_page", "changelog_page")   # pages crawled under those landing pages
+
+
+def source_replay_node(state: AgentState) -> AgentState:
+    """
+    Rebuild raw_data for a past run from the raw source store instead of
+    scraping, so a run can be re-synthesized offline.
+    Replaces web_scraper → youtube_scraper → gdoc_reader in the replay graph.
+    """
+    replay_run_id = state["replay_run_id"]
+    run_id = state.get("run_id", "")
+    errors = []
+
+    manifest = get_run_manifest(replay_run_id)
+    if not manifest:
+        errors.append(f"No raw sources stored for run '{replay_run_id}' — nothing to replay.")
+
+    raw_data = {}
+    pages = {}  # (vendor, "web" | "docs" | "crawled") -> {url: content}
+
+    for entry in manifest:
+        vendor_name = entry["vendor_name"]
+        if entry["source"] == CHECKPOINT_SOURCE:
+            continue
+        if state["vendors"] and vendor_name not in state["vendors"]:
+            continue
+
+        content = get_raw_content(entry["hash"]) or ""
+        # Record the same sources under the new run so the replay is itself replayable
+        save_raw_source(run_id, vendor_name, entry["source"], entry["url"], content,
+                        placeholder=bool(entry["placeholder"]))
+
+        item = raw_data.setdefault(vendor_name, {
+            "vendor_name": vendor_name,
+            "web_content": "",
+            "docs_content": "",
+            "crawled_content": "",
+            "youtube_content": "",
+            "scrapbook_content": "",
+            "scrapbook_images": [],
+        })
+
+        source = entry["source"]
+        if source in MARKETING_SOURCES:
+            pages.setdefault((vendor_name, "web"), {})[entry["url"]] = content
+        elif source in TECHNICAL_SOURCES:
+            pages.setdefault((vendor_name, "docs"), {})[entry["url"]] = content
+        elif source in CRAWLED_SOURCES:
+            pages.setdefault((vendor_name, "crawled"), {})[entry["url"]] = content
+        elif source == "youtube":
+            item["youtube_content"] = content
+        elif source == "scrapbook":
+            item["scrapbook_content"] = content
+        elif source == "scrapbook_image":
+            item["scrapbook_images"].append(content)
+
+    for (vendor_name, kind), vendor_pages in pages.items():
+        raw_data[vendor_name][f"{kind}_content"] = join_sources(vendor_pages)
+
+    return {
+        "raw_data": list(raw_data.values()),
+        "errors": errors,
+        "current_step": "source_replay_complete",
+    }
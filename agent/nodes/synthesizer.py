@@ -1,9 +1,18 @@
-from langchain_openai import ChatOpenAI
+import re
 from langchain_core.messages import HumanMessage, SystemMessage
 from agent.state import AgentState, CompetitorSynthesis
-from config.settings import OPENAI_API_KEY, OPENAI_MODEL
+from agent.deadline import RunStopped, STOP_LABELS, current_control, partial_vendor
+from agent.llm import get_llm, record_usage
+from agent.tracing import span, current_span
+from config.settings import OPENAI_MODEL, DEADLINE_PROMPT_SCALE
+from db.database import get_vendor_result, save_vendor_result
 
-llm = ChatOpenAI(model=OPENAI_MODEL, api_key=OPENAI_API_KEY, temperature=0.2)
+TEMPERATURE = 0.2
+SOURCE_MARKER = re.compile(r"^--- Source: (.+) ---$", re.M)   # join_sources() page header
+
+# Characters of each source kind put in the prompt (times DEADLINE_PROMPT_SCALE when short of time)
+# Crawled pages get their own budget, so a long landing page can't crowd new articles out
+SOURCE_CHARS = {"web": 4000, "docs": 4000, "crawled": 4000, "youtube": 3000, "scrapbook": 2000}
 
 SYSTEM_PROMPT = """You are a senior competitive intelligence analyst for a B2B SaaS product team.
 Your job is to produce a deep, technically detailed competitive analysis — not surface-level summaries.
@@ -27,6 +36,9 @@ Research Focus: {research_query}
 === PRODUCT DOCUMENTATION & CHANGELOG ===
 {docs_content}
 
+=== NEW BLOG POSTS, DOC PAGES & RELEASE NOTES (since the last run) ===
+{crawled_content}
+
 === YOUTUBE VIDEO TRANSCRIPTS ===
 {youtube_content}
 
@@ -89,7 +101,7 @@ Top 3-5 specific things to monitor about this vendor in the next quarter, with r
 """
 
 
-def _build_multimodal_message(prompt_text: str, images_base64: list[str]) -> HumanMessage:
+def _build_multimodal_message(prompt_text: str, images_base64: list[str], detail: str = "high") -> HumanMessage:
     """Build a HumanMessage with text + images for GPT-4o vision input."""
     if not images_base64:
         return HumanMessage(content=prompt_text)
@@ -100,28 +112,57 @@ def _build_multimodal_message(prompt_text: str, images_base64: list[str]) -> Hum
             "type": "image_url",
             "image_url": {
                 "url": f"data:image/png;base64,{b64}",
-                "detail": "high",
+                "detail": detail,
             },
         })
     return HumanMessage(content=content_blocks)
 
 
+def _prompted_pages(content: str, excerpt_chars: int) -> list[str]:
+    """
+    URLs of the join_sources() pages in content that fit in its first
+    excerpt_chars characters. A page cut short only counts when it comes first:
+    one longer than the whole budget could never fit, and would otherwise be
+    sent again on every run.
+    """
+    markers = list(SOURCE_MARKER.finditer(content))
+    urls = []
+    for i, marker in enumerate(markers):
+        end = markers[i + 1].start() - 2 if i + 1 < len(markers) else len(content)   # "\n\n" between pages
+        if end <= excerpt_chars or (i == 0 and marker.end() < excerpt_chars):
+            urls.append(marker.group(1))
+    return urls
+
+
 def synthesizer_node(state: AgentState) -> AgentState:
     """
     Call GPT-4o to synthesize raw data (text + images) into deep structured intelligence per vendor.
+    Short of time, images go at low detail and source excerpts shrink (see agent/deadline.py).
     """
     raw_data = state.get("raw_data", [])
     research_query = state.get("research_query", "General competitive overview")
     syntheses: list[CompetitorSynthesis] = []
-    errors = state.get("errors", [])
+    errors = []
+    partial = []
+    run_id = state.get("run_id", "")
+    control = current_control()
 
     for item in raw_data:
         vendor_name = item["vendor_name"]
+
+        # Already synthesized before this run was interrupted
+        cached = get_vendor_result(run_id, "synthesizer", vendor_name)
+        if cached:
+            current_span().incr("cache_hits")
+            syntheses.append(cached)
+            continue
+
         scrapbook_images = item.get("scrapbook_images", [])
 
         total_content = (
             item.get("web_content", "") +
             item.get("docs_content", "") +
+            item.get("crawled_content", "") +
             item.get("youtube_content", "") +
             item.get("scrapbook_content", "")
         )
@@ -131,6 +172,18 @@ def synthesizer_node(state: AgentState) -> AgentState:
             errors.append(f"No content retrieved for {vendor_name} — skipping synthesis.")
             continue
 
+        stop = control.stop_reason()
+        if stop:
+            partial.append(partial_vendor(vendor_name, "synthesizer", f"not synthesized — {STOP_LABELS[stop]}"))
+            continue
+
+        degraded = control.degraded()
+        scale = DEADLINE_PROMPT_SCALE if degraded else 1.0
+        detail = "low" if degraded else "high"
+        if degraded:
+            partial.append(partial_vendor(vendor_name, "synthesizer",
+                                          "shortened sources and low-detail images — run deadline near"))
+
         try:
             image_note = (
                 f"\n=== SCRAPBOOK IMAGES ===\n"
@@ -139,22 +192,32 @@ def synthesizer_node(state: AgentState) -> AgentState:
                 if has_images else ""
             )
 
+            sources = {
+                kind: item.get(f"{kind}_content", "Not available")[:int(chars * scale)]
+                for kind, chars in SOURCE_CHARS.items()
+            }
             prompt = SYNTHESIS_PROMPT.format(
                 vendor_name=vendor_name,
                 research_query=research_query,
-                web_content=item.get("web_content", "Not available")[:4000],
-                docs_content=item.get("docs_content", "Not available")[:4000],
-                youtube_content=item.get("youtube_content", "Not available")[:3000],
-                scrapbook_content=item.get("scrapbook_content", "Not available")[:2000],
+                web_content=sources["web"],
+                docs_content=sources["docs"],
+                crawled_content=sources["crawled"],
+                youtube_content=sources["youtube"],
+                scrapbook_content=sources["scrapbook"],
                 image_note=image_note,
             )
 
-            human_msg = _build_multimodal_message(prompt, scrapbook_images)
+            human_msg = _build_multimodal_message(prompt, scrapbook_images, detail)
 
-            response = llm.invoke([
-                SystemMessage(content=SYSTEM_PROMPT),
-                human_msg,
-            ])
+            with span("llm", vendor=vendor_name, model=OPENAI_MODEL, images=len(scrapbook_images),
+                      prompt_chars=len(prompt), degraded=degraded or None) as s:
+                response = control.call(get_llm(TEMPERATURE).invoke, [
+                    SystemMessage(content=SYSTEM_PROMPT),
+                    human_msg,
+                ], config={"metadata": {"vendor_name": vendor_name}})
+                s.set(**record_usage(run_id, "synthesizer", vendor_name, response, images=scrapbook_images,
+                                     sources={kind: len(text) for kind, text in sources.items()},
+                                     image_detail=detail))
 
             raw_synthesis = response.content
 
@@ -169,21 +232,21 @@ def synthesizer_node(state: AgentState) -> AgentState:
                 "gap_vs_your_product": _extract_section(raw_synthesis, "Gaps vs Your Product"),
                 "watch_points": _extract_section(raw_synthesis, "Key Watch Points"),
                 "raw_synthesis": raw_synthesis,
+                # Only these count as seen once the report is saved; the rest stay new for the next run
+                "crawled_urls": _prompted_pages(item.get("crawled_content", ""), int(SOURCE_CHARS["crawled"] * scale)),
             }
             syntheses.append(synthesis)
+            save_vendor_result(run_id, "synthesizer", vendor_name, synthesis)
 
-            if has_images:
-                errors.append(
-                    f"✅ {vendor_name}: synthesized with {len(scrapbook_images)} scrapbook image(s)"
-                )
-
+        except RunStopped as e:
+            partial.append(partial_vendor(vendor_name, "synthesizer", f"synthesis stopped — {e}"))
         except Exception as e:
             errors.append(f"Synthesis failed for {vendor_name}: {str(e)}")
 
     return {
-        **state,
         "syntheses": syntheses,
         "errors": errors,
+        "partial_vendors": partial,
         "current_step": "synthesis_complete",
     }
 
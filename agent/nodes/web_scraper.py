@@ -1,57 +1,115 @@
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from agent.deadline import RunStopped, STOP_LABELS, current_control, partial_vendor
+from agent.profiling import run_profiled
 from agent.state import AgentState
-from agent.tools.scraper_tool import scrape_multiple
-from db.database import get_competitor_by_name
+from agent.tools.crawler import crawl_source
+from agent.tools.scraper_tool import scrape_page, join_sources
+from agent.tracing import span
+from config.settings import CRAWL_LIMITS, SCRAPE_CONCURRENCY
+from db.database import get_competitor_by_name, save_raw_source, get_vendor_result, save_vendor_result
 
 
 def web_scraper_node(state: AgentState) -> AgentState:
     """
     Fetch and scrape website, blog, docs, and changelog content for each vendor.
-    Splits content into web_content (marketing) and docs_content (technical).
+    Splits landing pages into web_content (marketing) and docs_content
+    (technical); the new pages crawled under them go to crawled_content.
+    Up to SCRAPE_CONCURRENCY vendors are scraped at once; per-host limits
+    apply underneath (agent/tools/politeness.py).
     """
     vendors = state["vendors"]
-    raw_data = state.get("raw_data", [])
-    errors = state.get("errors", [])
-
-    existing = {d["vendor_name"]: d for d in raw_data}
-
-    for vendor_name in vendors:
-        competitor = get_competitor_by_name(vendor_name)
-        if not competitor:
-            errors.append(f"Vendor '{vendor_name}' not found in database.")
-            continue
-
-        # ── Marketing content (website + blog) ────────────────────────────────
-        marketing_urls = [
-            competitor.get("website_url", ""),
-            competitor.get("blog_url", ""),
-        ]
-        marketing_urls = [u for u in marketing_urls if u]
-        web_content = scrape_multiple(marketing_urls) if marketing_urls else ""
-
-        # ── Technical content (docs + changelog) ──────────────────────────────
-        technical_urls = [
-            competitor.get("docs_url", ""),
-            competitor.get("changelog_url", ""),
-        ]
-        technical_urls = [u for u in technical_urls if u]
-        docs_content = scrape_multiple(technical_urls) if technical_urls else ""
-
-        if vendor_name in existing:
-            existing[vendor_name]["web_content"] = web_content
-            existing[vendor_name]["docs_content"] = docs_content
-        else:
-            existing[vendor_name] = {
-                "vendor_name": vendor_name,
-                "web_content": web_content,
-                "docs_content": docs_content,
-                "youtube_content": "",
-                "scrapbook_content": "",
-                "scrapbook_images": [],
-            }
+    errors = []
+    run_id = state.get("run_id", "")
+    raw_data = []
+    partial = []
+
+    # Each vendor runs in its own copy of the context, so its spans, run control and profile follow it
+    with ThreadPoolExecutor(max_workers=max(SCRAPE_CONCURRENCY, 1), thread_name_prefix="scrape") as pool:
+        futures = [pool.submit(contextvars.copy_context().run, run_profiled, _scrape_vendor, run_id, vendor_name)
+                   for vendor_name in vendors]
+        for future in futures:
+            outcome = future.result()
+            if "error" in outcome:
+                errors.append(outcome["error"])
+            elif "partial" in outcome:
+                partial.append(outcome["partial"])
+            else:
+                raw_data.append(outcome["raw"])
 
     return {
-        **state,
-        "raw_data": list(existing.values()),
+        "raw_data": raw_data,
         "errors": errors,
+        "partial_vendors": partial,
         "current_step": "web_scraping_complete",
     }
+
+
+def _scrape_vendor(run_id: str, vendor_name: str) -> dict:
+    """One vendor's raw_data entry as {"raw": ...}, or {"error": ...} / {"partial": ...}."""
+    competitor = get_competitor_by_name(vendor_name)
+    if not competitor:
+        return {"error": f"Vendor '{vendor_name}' not found in database."}
+
+    cached = get_vendor_result(run_id, "web_scraper", vendor_name)
+    stop = "" if cached else current_control().stop_reason()
+    if stop:
+        return {"partial": partial_vendor(vendor_name, "web_scraper", f"not scraped — {STOP_LABELS[stop]}")}
+
+    with span("vendor", vendor=vendor_name, cache_hit=bool(cached)):
+        if cached:
+            web_content, docs_content = cached["web_content"], cached["docs_content"]
+            crawled_content = cached.get("crawled_content", "")
+        else:
+            try:
+                # ── Marketing content (website + blog) ────────────────────
+                marketing, marketing_crawled = _scrape_sources(run_id, vendor_name, competitor, ["website", "blog"])
+                web_content = join_sources(marketing) if marketing else ""
+
+                # ── Technical content (docs + changelog) ──────────────────
+                technical, technical_crawled = _scrape_sources(run_id, vendor_name, competitor,
+                                                               ["docs", "changelog"])
+                docs_content = join_sources(technical) if technical else ""
+
+                # ── New articles, doc pages and release notes ─────────────
+                crawled = {**marketing_crawled, **technical_crawled}
+                crawled_content = join_sources(crawled) if crawled else ""
+            except RunStopped as e:
+                return {"partial": partial_vendor(vendor_name, "web_scraper", f"scraping stopped — {e}")}
+
+            save_vendor_result(run_id, "web_scraper", vendor_name, {
+                "web_content": web_content, "docs_content": docs_content, "crawled_content": crawled_content,
+            })
+
+    return {"raw": {
+        "vendor_name": vendor_name,
+        "web_content": web_content,
+        "docs_content": docs_content,
+        "crawled_content": crawled_content,
+    }}
+
+
+def _scrape_sources(run_id: str, vendor_name: str, competitor: dict,
+                    sources: list[str]) -> tuple[dict[str, str], dict[str, str]]:
+    """
+    Scrape the competitor's configured URLs for the given source kinds
+    ("website", "blog", "docs", "changelog") and persist each page to the raw store.
+    Kinds in CRAWL_LIMITS are also crawled for the new or changed pages under
+    their landing page (see agent/tools/crawler.py); those are stored as
+    "<kind>_page". Landing pages that could not be fetched are stored flagged as
+    placeholders. Returns ({url: text} of landing pages, {url: text} of crawled pages).
+    """
+    urls = {competitor.get(f"{source}_url") or "": source for source in sources}
+    urls.pop("", None)
+    pages, crawled = {}, {}
+    for url, source in urls.items():
+        if source in CRAWL_LIMITS:
+            landing, found = crawl_source(url, source)
+        else:
+            landing, found = scrape_page(url), {}
+        pages[url] = landing["text"]
+        save_raw_source(run_id, vendor_name, source, url, pages[url], placeholder=landing["placeholder"])
+        for page_url, content in found.items():
+            save_raw_source(run_id, vendor_name, f"{source}_page", page_url, content)
+        crawled.update(found)
+    return pages, crawled
@@ -1,16 +1,21 @@
+from agent.deadline import RunStopped, STOP_LABELS, current_control, partial_vendor
 from agent.state import AgentState
 from agent.tools.youtube_tool import fetch_channel_transcripts
-from db.database import get_competitor_by_name
+from agent.tracing import span
+from db.database import get_competitor_by_name, save_raw_source, get_vendor_result, save_vendor_result
 
 
 def youtube_scraper_node(state: AgentState) -> AgentState:
     """
     Fetch YouTube transcripts for each vendor's channel.
     Updates youtube_content in raw_data.
+    Skipped once the run is short of time (see agent/deadline.py).
     """
     vendors = state["vendors"]
-    raw_data = {d["vendor_name"]: d for d in state.get("raw_data", [])}
-    errors = state.get("errors", [])
+    raw_data = []
+    partial = []
+    run_id = state.get("run_id", "")
+    control = current_control()
 
     for vendor_name in vendors:
         competitor = get_competitor_by_name(vendor_name)
@@ -18,21 +23,32 @@ def youtube_scraper_node(state: AgentState) -> AgentState:
             continue
 
         channel = competitor.get("youtube_channel", "")
-        youtube_content = fetch_channel_transcripts(channel, max_videos=5) if channel else ""
+        cached = get_vendor_result(run_id, "youtube_scraper", vendor_name)
+        stop = control.stop_reason() if channel and not cached else ""
+        if stop or (channel and not cached and control.degraded()):
+            reason = STOP_LABELS[stop] if stop else "run deadline near"
+            partial.append(partial_vendor(vendor_name, "youtube_scraper", f"YouTube skipped — {reason}"))
+            raw_data.append({"vendor_name": vendor_name, "youtube_content": ""})
+            continue
+
+        with span("vendor", vendor=vendor_name, cache_hit=bool(cached), channel=channel or None):
+            if cached:
+                youtube_content = cached["youtube_content"]
+            else:
+                try:
+                    youtube_content = fetch_channel_transcripts(channel, max_videos=5) if channel else ""
+                except RunStopped as e:
+                    partial.append(partial_vendor(vendor_name, "youtube_scraper", f"YouTube stopped — {e}"))
+                    raw_data.append({"vendor_name": vendor_name, "youtube_content": ""})
+                    continue
+                if channel:
+                    save_raw_source(run_id, vendor_name, "youtube", channel, youtube_content)
+                save_vendor_result(run_id, "youtube_scraper", vendor_name, {"youtube_content": youtube_content})
 
-        if vendor_name in raw_data:
-            raw_data[vendor_name]["youtube_content"] = youtube_content
-        else:
-            raw_data[vendor_name] = {
-                "vendor_name": vendor_name,
-                "web_content": "",
-                "youtube_content": youtube_content,
-                "scrapbook_content": "",
-            }
+        raw_data.append({"vendor_name": vendor_name, "youtube_content": youtube_content})
 
     return {
-        **state,
-        "raw_data": list(raw_data.values()),
-        "errors": errors,
+        "raw_data": raw_data,
+        "partial_vendors": partial,
         "current_step": "youtube_scraping_complete",
     }
@@ -0,0 +1,197 @@
+"""
+Opt-in per-node profiling.
+
+A run started with profile=True (the Evaluate page's "Profile this run", or
+every run with PROFILING_ENABLED) executes each graph node under cProfile and
+tracemalloc. Per node this writes
+
+    PROFILE_DIR/<run_id>/<node>.prof          cProfile stats (pstats, snakeviz, ...)
+    PROFILE_DIR/<run_id>/<node>.alloc.txt     top allocation sites while the node ran
+
+and stores a summary — wall time, peak traced memory, the PROFILE_TOP_N
+functions by own time and allocation sites by size — in run_profiles, where
+the History page shows it. With PROFILE_TOOLS the summary also lists time spent
+in each tool function (scraping, YouTube, Drive/Docs, email).
+
+cProfile only sees the thread it runs on, and a node's external calls run on
+helper threads (RunControl.call, the scraping and crawling pools). Those go
+through run_profiled(), which profiles each helper thread on its own and
+merges it into the node's profile, so LLM, HTTP and Drive work shows up under
+the node. Merged times add up across threads: a function's total_s can exceed
+the node's wall time. Where the interpreter allows only one active profiler
+(sys.monitoring, Python 3.12+), helper threads run unprofiled and the summary's
+unprofiled_threads says how many were missed; their time is still in the trace.
+The same goes for a node itself when another run's node holds the profiler:
+it runs unprofiled and its summary has node_profiled false (wall time and
+allocations are still recorded).
+tracemalloc is process-wide, so when two profiled runs overlap in one process
+their allocation sites mix.
+"""
+import cProfile
+import functools
+import logging
+import os
+import pstats
+import sysconfig
+import threading
+import time
+import tracemalloc
+from contextvars import ContextVar
+from config.settings import PROFILE_DIR, PROFILE_TOP_N, PROFILE_TOOLS
+from db.database import save_run_profile
+
+log = logging.getLogger("profiling")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STDLIB = sysconfig.get_paths()["stdlib"]
+TOOL_DIRS = (os.path.join(ROOT, "agent", "tools"), os.path.join(ROOT, "mailer"))
+
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_users = 0   # tracemalloc is started by the first profiled node and stopped by the last
+
+# While a node is profiled: its helper threads' outcome, {"profiles": [cProfile.Profile], "unprofiled": int}
+_threads: ContextVar = ContextVar("profiled_threads", default=None)
+
+
+def profile_dir(run_id: str) -> str:
+    return os.path.join(PROFILE_DIR, run_id)
+
+
+def _short(filename: str) -> str:
+    if "site-packages" in filename:
+        return filename.rsplit("site-packages/", 1)[-1]
+    for prefix in (ROOT, STDLIB):
+        if filename.startswith(prefix):
+            return os.path.relpath(filename, prefix)
+    return filename
+
+
+def _label(key) -> str:
+    filename, line, name = key
+    return name if filename == "~" else f"{_short(filename)}:{line}({name})"   # "~" = builtins
+
+
+def _hotspots(stats: pstats.Stats, top_n: int) -> list[dict]:
+    rows = sorted(stats.stats.items(), key=lambda kv: -kv[1][2])[:top_n]
+    return [{"function": _label(key), "calls": nc, "self_s": round(tt, 4), "total_s": round(ct, 4)}
+            for key, (cc, nc, tt, ct, callers) in rows]
+
+
+def _tool_times(stats: pstats.Stats) -> list[dict]:
+    rows = [(key, value) for key, value in stats.stats.items() if key[0].startswith(TOOL_DIRS)]
+    rows.sort(key=lambda kv: -kv[1][3])
+    return [{"function": _label(key), "calls": nc, "total_s": round(ct, 4)}
+            for key, (cc, nc, tt, ct, callers) in rows]
+
+
+def _allocations(diffs, top_n: int) -> list[dict]:
+    diffs = [d for d in diffs if d.size_diff > 0][:top_n]
+    return [{"site": f"{_short(d.traceback[0].filename)}:{d.traceback[0].lineno}",
+             "kib": round(d.size_diff / 1024, 1), "blocks": d.count_diff} for d in diffs]
+
+
+def _start_tracemalloc():
+    global _tracemalloc_users
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        _tracemalloc_users += 1
+        tracemalloc.reset_peak()
+
+
+def _stop_tracemalloc():
+    global _tracemalloc_users
+    with _tracemalloc_lock:
+        _tracemalloc_users -= 1
+        if _tracemalloc_users == 0:
+            tracemalloc.stop()
+
+
+def run_profiled(fn, *args, **kwargs):
+    """
+    fn(*args, **kwargs) on a helper thread, profiled into the node that started
+    it when that node is profiled. Call it in a copy of the node's context.
+    """
+    threads = _threads.get()
+    if threads is None:
+        return fn(*args, **kwargs)
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:   # another profiler is active and the interpreter allows only one
+        threads["unprofiled"] += 1
+        return fn(*args, **kwargs)
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        profiler.disable()
+        threads["profiles"].append(profiler)
+
+
+def profile_node(run_id: str, node_name: str, fn, *args):
+    """Run fn(*args) under cProfile + tracemalloc, save the profile and return fn's result."""
+    _start_tracemalloc()
+    before = tracemalloc.take_snapshot()
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:   # another profiler is active and the interpreter allows only one
+        profiler = None
+    threads = {"profiles": [], "unprofiled": 0}
+    token = _threads.set(threads)
+    start = time.perf_counter()
+    try:
+        return fn(*args)
+    finally:
+        seconds = time.perf_counter() - start
+        if profiler is not None:
+            profiler.disable()
+        _threads.reset(token)
+        after = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        _stop_tracemalloc()
+        try:
+            _save(run_id, node_name, profiler, threads, before, after, seconds, peak)
+        except Exception as e:   # profiling must never fail a run
+            log.warning("Could not save the %s profile of run %s: %s", node_name, run_id, e)
+
+
+def _save(run_id, node_name, profiler, threads, before, after, seconds, peak):
+    directory = profile_dir(run_id)
+    os.makedirs(directory, exist_ok=True)
+    stats = pstats.Stats()
+    helpers = list(threads["profiles"])   # calls abandoned with RunStopped may still be running: left out
+    for p in ([profiler] if profiler is not None else []) + helpers:
+        stats.add(p)
+    profile_path = os.path.join(directory, f"{node_name}.prof")
+    stats.dump_stats(profile_path)
+
+    diffs = after.compare_to(before, "lineno")
+    alloc_path = os.path.join(directory, f"{node_name}.alloc.txt")
+    with open(alloc_path, "w") as f:
+        for stat in diffs[:100]:
+            f.write(f"{stat}\n")
+
+    summary = {
+        "seconds": round(seconds, 3),
+        "node_profiled": profiler is not None,
+        "threads": len(helpers),
+        "unprofiled_threads": threads["unprofiled"],
+        "peak_kib": round(peak / 1024, 1),
+        "hotspots": _hotspots(stats, PROFILE_TOP_N),
+        "allocations": _allocations(diffs, PROFILE_TOP_N),
+        "files": {"profile": profile_path, "allocations": alloc_path},
+    }
+    if PROFILE_TOOLS:
+        summary["tools"] = _tool_times(stats)
+    save_run_profile(run_id, node_name, summary)
+
+
+def profiled_node(node_name: str, fn):
+    """Wrap a graph node so it is profiled when its run asked for it (state["profile"])."""
+    @functools.wraps(fn)
+    def wrapper(state):
+        if not state.get("profile"):
+            return fn(state)
+        return profile_node(state["run_id"], node_name, fn, state)
+    return wrapper
@@ -0,0 +1,96 @@
+"""
+Per-vendor report fragments.
+
+A vendor's part of the report (its "What's New" entry and its full-intelligence
+section) depends only on its synthesis and diff. diff_engine renders it as soon
+as the vendor's diff is ready and stores it under a hash of those inputs;
+report_writer then only joins stored fragments. Re-rendering a report in which
+one vendor changed renders that vendor alone.
+
+The hash includes FRAGMENT_VERSION, derived from INTELLIGENCE_SECTIONS and the
+source of render_fragment(), so fragments stored by an older rendering are
+never reused.
+"""
+import hashlib
+import inspect
+import json
+from db.database import save_report_fragment, get_report_fragments
+
+# (heading, synthesis field) in report order
+INTELLIGENCE_SECTIONS = [
+    ("### 🚀 Recent Feature Launches & Updates", "recent_launches"),
+    ("### 🎯 Use Cases & Target Segments", "use_cases"),
+    ("### ⚙️ Technical Architecture & Protocol Support", "technical_details"),
+    ("### 🖥️ User Interface & UX", "ui_ux"),
+    ("### 💰 Pricing & Packaging", "pricing_signals"),
+    ("### 🧭 Strategic Direction", "strategic_direction"),
+    ("### ⚔️ Gaps vs Your Product", "gap_vs_your_product"),
+    ("### 👁️ Key Watch Points", "watch_points"),
+]
+
+def fragment_hash(synthesis: dict, diff: dict | None) -> str:
+    """Hash of everything a vendor's fragment renders."""
+    rendered = {
+        "version": FRAGMENT_VERSION,
+        "vendor_name": synthesis["vendor_name"],
+        "sections": [synthesis.get(field, "_No data_") for _, field in INTELLIGENCE_SECTIONS],
+        "delta_summary": diff["delta_summary"] if diff else None,
+    }
+    return hashlib.sha256(json.dumps(rendered, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def render_fragment(synthesis: dict, diff: dict | None) -> dict:
+    """Markdown for one vendor: whats_new (None without a diff) and intelligence."""
+    vendor = synthesis["vendor_name"]
+    whats_new = "\n".join([f"### {vendor}", diff["delta_summary"], ""]) if diff else None
+
+    lines = [f"## {vendor}", ""]
+    for heading, field in INTELLIGENCE_SECTIONS:
+        lines += [heading, synthesis.get(field, "_No data_"), ""]
+    lines += ["---", ""]
+    return {"whats_new": whats_new, "intelligence": "\n".join(lines)}
+
+
+def _fragment_version() -> str:
+    """Digest of what decides a fragment's markup: the section list and render_fragment()."""
+    try:
+        code = inspect.getsource(render_fragment)
+    except OSError:   # no source shipped: fall back to the compiled code
+        code = repr((render_fragment.__code__.co_code, render_fragment.__code__.co_consts))
+    rendering = json.dumps([INTELLIGENCE_SECTIONS, code])
+    return hashlib.sha256(rendering.encode("utf-8")).hexdigest()[:16]
+
+
+FRAGMENT_VERSION = _fragment_version()
+
+
+def store_fragment(synthesis: dict, diff: dict | None) -> str:
+    """
+    Render and persist a vendor's fragment unless it is already stored. Returns
+    its hash. Rendering is a few string joins, cheaper than looking the hash up
+    first, so this is one INSERT OR IGNORE.
+    """
+    digest = fragment_hash(synthesis, diff)
+    fragment = render_fragment(synthesis, diff)
+    save_report_fragment(digest, synthesis["vendor_name"], fragment["whats_new"], fragment["intelligence"])
+    return digest
+
+
+def get_fragments(syntheses: list[dict], diff_lookup: dict) -> list[dict]:
+    """
+    Fragments for each synthesis, in order — read from the store in one query,
+    rendering (and storing) only the ones that are missing.
+    """
+    digests = [fragment_hash(s, diff_lookup.get(s["vendor_name"])) for s in syntheses]
+    stored = get_report_fragments(digests)
+
+    fragments = []
+    for synthesis, digest in zip(syntheses, digests):
+        fragment = stored.get(digest)
+        if fragment is None:
+            diff = diff_lookup.get(synthesis["vendor_name"])
+            fragment = render_fragment(synthesis, diff)
+            save_report_fragment(digest, synthesis["vendor_name"], fragment["whats_new"], fragment["intelligence"])
+            stored[digest] = fragment
+        fragments.append(fragment)
+    return fragments
@@ -0,0 +1,145 @@
+"""
+Scheduled refreshes.
+
+    python -m agent.scheduler             # run as a service, polling every SCHEDULER_POLL_SECONDS
+    python -m agent.scheduler --once      # one pass for cron: enqueue what's due, drain the queue, exit
+    python -m agent.scheduler --workers 0 # only enqueue; separate `python -m agent.worker` processes run jobs
+
+Each pass:
+  1. finds competitors whose refresh is due (cadence is set on the Configure page)
+  2. probes their web sources — vendors with nothing new since the last analyzed
+     run are skipped, so no LLM calls are spent on them
+  3. coalesces the rest into jobs of up to SCHEDULER_BATCH_SIZE vendors
+  4. its embedded workers (see agent/worker.py) run queued jobs, at most
+     SCHEDULER_MAX_CONCURRENT at once across every worker sharing the queue
+
+A vendor that was due several times while the scheduler was down is refreshed
+once, and its next refresh is one interval after that catch-up run.
+"""
+import argparse
+import logging
+import signal
+import threading
+from datetime import datetime, timedelta, timezone
+from agent.tools.scraper_tool import probe_url
+from agent.metrics import start_exporters
+from agent.worker import start_workers
+from db.database import (
+    init_db, get_due_competitors, mark_competitors_refreshed, enqueue_job,
+    get_source_validator, save_source_validator, get_analyzed_source_hash,
+)
+from config.settings import (
+    SCHEDULER_POLL_SECONDS, SCHEDULER_MAX_CONCURRENT, SCHEDULER_BATCH_SIZE,
+    SCHEDULER_QUERY, SCHEDULER_PUBLISH, SCHEDULER_MAX_SKIP_DAYS,
+)
+
+log = logging.getLogger("scheduler")
+
+WEB_SOURCES = ["website", "blog", "docs", "changelog"]
+
+
+# ── Change detection ───────────────────────────────────────────────────────────
+
+def sources_changed(competitor: dict) -> bool:
+    """
+    True if the competitor's web sources may have changed since they were last
+    analyzed. Anything uncertain (no baseline, probe error, no web sources,
+    last refresh older than SCHEDULER_MAX_SKIP_DAYS) counts as changed.
+    """
+    last = competitor.get("last_refreshed_at")
+    now = datetime.now(timezone.utc).replace(tzinfo=None)   # naive UTC, like the stored timestamp
+    if not last or now - datetime.fromisoformat(last) > timedelta(days=SCHEDULER_MAX_SKIP_DAYS):
+        return True
+
+    urls = [competitor.get(f"{source}_url") for source in WEB_SOURCES]
+    urls = [url for url in urls if url]
+    if not urls:
+        return True
+
+    for url in urls:
+        analyzed = get_analyzed_source_hash(url)
+        if not analyzed:
+            return True
+
+        # Stored validators only count if they describe the content that was analyzed
+        validator = get_source_validator(url) or {}
+        trusted = validator.get("content_hash") == analyzed
+        probe = probe_url(
+            url,
+            etag=validator.get("etag", "") if trusted else "",
+            last_modified=validator.get("last_modified", "") if trusted else "",
+        )
+        if probe["error"]:
+            return True
+        if probe["not_modified"]:
+            continue
+
+        save_source_validator(url, probe["etag"], probe["last_modified"], probe["content_hash"])
+        if probe["content_hash"] != analyzed:
+            return True
+
+    return False
+
+
+# ── Planning ───────────────────────────────────────────────────────────────────
+
+def enqueue_due(batch_size: int = SCHEDULER_BATCH_SIZE) -> dict:
+    """Queue jobs for due competitors with changed sources. Returns a summary."""
+    due = get_due_competitors()
+    changed, unchanged = [], []
+    for competitor in due:
+        if competitor["missed_slots"]:
+            log.info("%s missed %d scheduled refresh(es); running one catch-up refresh",
+                     competitor["vendor_name"], competitor["missed_slots"])
+        (changed if sources_changed(competitor) else unchanged).append(competitor["vendor_name"])
+
+    if unchanged:
+        log.info("Skipping unchanged: %s", ", ".join(unchanged))
+        mark_competitors_refreshed(unchanged, refreshed=False)
+
+    job_ids = []
+    for i in range(0, len(changed), batch_size):
+        batch = changed[i:i + batch_size]
+        job_ids.append(enqueue_job(SCHEDULER_QUERY, batch, SCHEDULER_PUBLISH))
+        log.info("Queued job %d: %s", job_ids[-1], ", ".join(batch))
+
+    return {"due": len(due), "skipped": unchanged, "jobs": job_ids}
+
+
+def _raise_interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Refresh competitors on their configured cadence.")
+    parser.add_argument("--once", action="store_true", help="enqueue due vendors, drain the queue, then exit")
+    parser.add_argument("--workers", type=int, default=SCHEDULER_MAX_CONCURRENT,
+                        help="worker threads in this process (0 = enqueue only)")
+    parser.add_argument("--poll-seconds", type=int, default=SCHEDULER_POLL_SECONDS)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(threadName)s %(levelname)s %(message)s")
+    signal.signal(signal.SIGTERM, _raise_interrupt)
+    init_db()
+    start_exporters()
+
+    stop = threading.Event()
+    enqueue_due()
+    threads = start_workers(args.workers, stop, once=args.once)
+    try:
+        if args.once:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(timeout=1)
+            return
+        while not stop.wait(args.poll_seconds):
+            enqueue_due()
+    except KeyboardInterrupt:
+        log.info("Stopping; in-flight jobs will finish first")
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Run-scoped single-flight for external fetches.
+
+Within a run, coalesced(kind, key, fn, ...) calls fn once per (kind, key): the
+first caller runs it, callers arriving while it runs wait for the same result,
+and later callers get it at once. Vendors that share a page (after URL
+canonicalization), a YouTube channel or a scrapbook doc therefore fetch and
+parse it once per run.
+
+Results are kept for the run (the scope run_flights() opens in agent/graph.py)
+and shared, so callers must not mutate them. Exceptions are shared the same
+way. Outside a run, coalesced() just calls fn.
+"""
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from agent.deadline import CALL_POLL_SECONDS, current_control
+from agent.tracing import current_span
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: dict[tuple, _Flight] = {}
+
+    def do(self, kind: str, key: str, fn, *args, **kwargs):
+        with self._lock:
+            flight = self._flights.get((kind, key))
+            leader = flight is None
+            if leader:
+                flight = self._flights[(kind, key)] = _Flight()
+
+        if leader:
+            try:
+                flight.result = fn(*args, **kwargs)
+            except BaseException as e:
+                flight.error = e
+            finally:
+                flight.done.set()
+        else:
+            current_span().incr("coalesced")
+            control = current_control()
+            while not flight.done.wait(CALL_POLL_SECONDS):
+                control.check()
+
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+
+_current: ContextVar = ContextVar("single_flight", default=None)
+
+
+@contextmanager
+def run_flights():
+    """Open the single-flight scope of a run for the nodes and tools it calls."""
+    token = _current.set(SingleFlight())
+    try:
+        yield
+    finally:
+        try:
+            _current.reset(token)
+        except ValueError:   # a stream generator closed from another context
+            pass
+
+
+def coalesced(kind: str, key: str, fn, *args, **kwargs):
+    """fn(*args, **kwargs), run at most once per (kind, key) in the current run."""
+    flights = _current.get()
+    if flights is None:
+        return fn(*args, **kwargs)
+    return flights.do(kind, key, fn, *args, **kwargs)
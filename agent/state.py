@@ -1,10 +1,12 @@
-from typing import TypedDict, List, Optional
+import operator
+from typing import Annotated, TypedDict, List, Optional
 
 
 class CompetitorRawData(TypedDict):
     vendor_name: str
     web_content: str
     docs_content: str
+    crawled_content: str        # new / changed pages crawled under blog, docs and changelog
     youtube_content: str
     scrapbook_content: str
     scrapbook_images: List[str]
@@ -21,6 +23,7 @@ class CompetitorSynthesis(TypedDict):
     gap_vs_your_product: str
     watch_points: str
     raw_synthesis: str
+    crawled_urls: List[str]     # crawled pages that made it into the prompt (see synthesizer._prompted_pages)
 
 
 class DiffResult(TypedDict):
@@ -29,16 +32,35 @@ class DiffResult(TypedDict):
     is_first_run: bool
 
 
+def merge_by_vendor(existing: list[dict], update: list[dict]) -> list[dict]:
+    """
+    Reducer for per-vendor channels: nodes return only the vendors/fields they
+    touched, and those fields are merged into the vendor's existing entry.
+    Entries for untouched vendors are reused as-is (no copying).
+    """
+    merged = {item["vendor_name"]: item for item in existing or []}
+    for item in update or []:
+        vendor_name = item["vendor_name"]
+        merged[vendor_name] = {**merged[vendor_name], **item} if vendor_name in merged else item
+    return list(merged.values())
+
+
 class AgentState(TypedDict):
     # ── Inputs ────────────────────────────────
     vendors: List[str]
     research_query: str
     save_to_drive: bool           # whether to upload report to Google Drive
+    run_id: str                   # keys this run's raw sources in the raw store
+    replay_run_id: str            # if set, raw sources are loaded from this past run instead of scraped
+    batch_id: str                 # multi-query batch this run belongs to (diffs skip its sibling runs)
+    profile: bool                 # profile each node (agent/profiling.py)
+    deadline_seconds: int         # time budget of the run, 0 = none (agent/deadline.py)
 
     # ── Intermediate ──────────────────────────
-    raw_data: List[CompetitorRawData]
-    syntheses: List[CompetitorSynthesis]
-    diffs: List[DiffResult]
+    # Nodes return deltas only; these reducers fold them into the running state
+    raw_data: Annotated[List[CompetitorRawData], merge_by_vendor]
+    syntheses: Annotated[List[CompetitorSynthesis], merge_by_vendor]
+    diffs: Annotated[List[DiffResult], merge_by_vendor]
 
     # ── Outputs ───────────────────────────────
     final_report_markdown: str
@@ -49,5 +71,7 @@ class AgentState(TypedDict):
     drive_duration_seconds: float        # time for drive upload (0 if skipped)
 
     # ── Meta ──────────────────────────────────
-    errors: List[str]
+    errors: Annotated[List[str], operator.add]     # append-only
+    partial_vendors: Annotated[List[dict], operator.add]   # {vendor_name, node, note}: work left out
+    stopped: str                  # "cancelled" / "deadline" when the report is partial
     current_step: str
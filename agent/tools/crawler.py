@@ -0,0 +1,154 @@
+"""
+Bounded crawling of blogs, docs and changelogs.
+
+A blog or changelog landing page is mostly titles and teasers; the content is
+one click deeper. crawl_source() scrapes the landing page as scrape_url()
+would, then follows its links breadth-first, within the source kind's
+CRAWL_LIMITS (max depth, max pages fetched besides the landing page). It only
+follows links that stay on the landing page's origin and under its path.
+Links are canonicalized (canonical_url), so a page reached under several
+spellings is fetched once. Pages are fetched CRAWL_CONCURRENCY at a time,
+subject to the per-host politeness rules.
+
+crawl_pages is the visited set across runs. A page checked less than
+CRAWL_REVISIT_DAYS ago is not fetched. An older one is re-checked with a
+conditional GET and its content hash. Only new or changed pages are returned,
+so each run takes in fresh articles without re-reading the whole site. Pages
+that are skipped or not modified still lead on: their links, stored with the
+page, go into the frontier like those of a fetched page.
+
+A run's checks are pending (crawl_visits) until report_writer saves its
+report and confirms them. New pages are confirmed only if they fit in the
+synthesis prompt. Pages that didn't fit, or whose run failed or was stopped
+before its report, stay new for the next run.
+"""
+import contextvars
+import hashlib
+import json
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+from agent.profiling import run_profiled
+from agent.singleflight import coalesced
+from agent.tools.politeness import HostUnavailable, RobotsDisallowed
+from agent.tools.scraper_tool import canonical_url, fetch_page, scrape_page, url_key
+from agent.deadline import current_control
+from agent.tracing import span
+from config.settings import CRAWL_CONCURRENCY, CRAWL_LIMITS, CRAWL_REVISIT_DAYS
+from db.database import get_crawl_page, save_crawl_page, save_crawl_visit
+
+# Links to these are never pages worth reading
+SKIP_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif", ".svg", ".webp", ".ico", ".pdf", ".zip", ".gz",
+                   ".mp4", ".mov", ".mp3", ".css", ".js", ".json", ".xml", ".rss", ".atom")
+
+
+def _scope(url: str) -> tuple[str, str]:
+    """(host, path prefix) a crawl from url stays within."""
+    parts = urlsplit(canonical_url(url))
+    path = parts.path
+    if "." in path.rsplit("/", 1)[-1]:   # a file like /changelog.html: its directory
+        path = path.rsplit("/", 1)[0]
+    return parts.netloc, path.rstrip("/") + "/"
+
+
+def in_scope(link: str, scope: tuple[str, str]) -> bool:
+    parts = urlsplit(canonical_url(link))
+    host, prefix = scope
+    return (parts.netloc == host and (parts.path + "/").startswith(prefix)
+            and not parts.path.lower().endswith(SKIP_EXTENSIONS))
+
+
+def _record(url: str, root_url: str, content_hash: str, page: dict, links: list[str], fresh: bool):
+    """Record a check: pending under the current run, or straight into the visited set outside one."""
+    run_id = current_control().run_id
+    if run_id:
+        save_crawl_visit(run_id, url, root_url, content_hash, page["etag"], page["last_modified"], links, fresh)
+    else:
+        save_crawl_page(url, root_url, content_hash, page["etag"], page["last_modified"], links)
+
+
+def _visit(url: str, root_url: str) -> dict:
+    """
+    Check one crawled page against the visited set. Returns {"skipped": True,
+    "links"} when it was checked recently, else {"fresh": bool, "text",
+    "links"} (fresh = new or changed since the last check), or {"error": str}.
+    """
+    key = canonical_url(url)
+    known = get_crawl_page(key, CRAWL_REVISIT_DAYS)
+    # Rows checked before links were stored can't feed the frontier, so those pages are fetched in full
+    links = json.loads(known["links"]) if known and known["links"] is not None else None
+    if links is not None and known["recent"]:
+        return {"skipped": True, "links": links}
+    validators = known if links is not None else {}
+
+    with span("http.scrape", url=url, crawl=True) as s:
+        try:
+            page = fetch_page(url, etag=validators.get("etag") or "",
+                              last_modified=validators.get("last_modified") or "")
+        except HostUnavailable as e:
+            s.set(circuit_open=True)
+            return {"error": str(e)}
+        except RobotsDisallowed as e:
+            s.set(robots_disallowed=True)
+            return {"error": str(e)}
+        except Exception as e:
+            s.fail(e)
+            return {"error": str(e)}
+        s.set(status_code=page["status_code"], bytes=page["bytes"])
+
+    if page["not_modified"]:
+        _record(key, root_url, known["content_hash"], page, links, fresh=False)
+        return {"fresh": False, "text": "", "links": links}
+
+    digest = hashlib.sha256(page["text"].encode("utf-8")).hexdigest()
+    fresh = known is None or known["content_hash"] != digest
+    _record(key, root_url, digest, page, page["links"], fresh)
+    return {"fresh": fresh, "text": page["text"], "links": page["links"]}
+
+
+def visit(url: str, root_url: str) -> dict:
+    """_visit(), once per page per run — other crawls reaching it share the outcome."""
+    return coalesced("crawl.page", url_key(url), _visit, url, root_url)
+
+
+def crawl_source(url: str, kind: str) -> tuple[dict, dict[str, str]]:
+    """
+    The landing page as scrape_page() returns it, and {url: text} of the new
+    or changed pages found under it, in crawl order.
+    """
+    landing = scrape_page(url)
+    pages = {}
+    max_depth, max_pages = CRAWL_LIMITS.get(kind, (0, 0))
+    if max_depth < 1 or max_pages < 1:
+        return landing, pages
+
+    scope = _scope(url)
+    seen = {url_key(url)}
+    frontier = deque((link, 1) for link in landing["links"])
+    fetched = 0
+
+    with ThreadPoolExecutor(max_workers=max(CRAWL_CONCURRENCY, 1), thread_name_prefix="crawl") as pool:
+        while frontier and fetched < max_pages:
+            batch = []
+            while frontier and len(batch) < max_pages - fetched:
+                link, depth = frontier.popleft()
+                link, key = canonical_url(link), url_key(link)
+                if key in seen or not in_scope(link, scope):
+                    continue
+                seen.add(key)
+                batch.append((link, depth))
+
+            # Each fetch runs in its own copy of the context, so its span, run control and profile follow it
+            futures = [pool.submit(contextvars.copy_context().run, run_profiled, visit, link, url)
+                       for link, _ in batch]
+            for (link, depth), future in zip(batch, futures):
+                outcome = future.result()
+                if not outcome.get("skipped"):   # skipped pages cost no fetch
+                    fetched += 1
+                if outcome.get("error"):
+                    continue
+                if outcome.get("fresh"):
+                    pages[link] = outcome["text"]
+                if depth < max_depth:
+                    frontier.extend((child, depth + 1) for child in outcome["links"])
+    return landing, pages
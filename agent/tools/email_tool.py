@@ -0,0 +1,11 @@
+"""
+Report emails as the agent sends them: mailer.emailer.send_report_email under
+the cassette (agent/cassette.py). The recorder is applied here so the mailer
+package stays free of agent imports.
+"""
+from agent.cassette import recorded
+from mailer.emailer import send_report_email as _send_report_email
+
+send_report_email = recorded(
+    "smtp.send", "recipients", on_miss={"success": False, "error": "Email not in cassette"},
+)(_send_report_email)
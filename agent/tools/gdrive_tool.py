@@ -1,19 +1,25 @@
 import os
 import io
 from datetime import datetime
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseUpload
+from agent.cassette import recorded
+from agent.deadline import current_control
+from agent.singleflight import coalesced
+from agent.tracing import traced
 from config.settings import GOOGLE_SCOPES, GOOGLE_DRIVE_FOLDER_ID, GOOGLE_DOC_SCRAPBOOK_ID
 
+# Google client libraries are imported inside the functions that use them —
+# they are slow to import and most page renders never touch Drive.
+
 TOKEN_PATH = "token.json"
 CREDENTIALS_PATH = "credentials.json"
 
 
-def get_google_creds() -> Credentials:
+def get_google_creds():
     """Get or refresh Google OAuth credentials."""
+    from google.oauth2.credentials import Credentials
+    from google_auth_oauthlib.flow import InstalledAppFlow
+    from google.auth.transport.requests import Request
+
     creds = None
 
     if os.path.exists(TOKEN_PATH):
@@ -33,6 +39,8 @@ def get_google_creds() -> Credentials:
 
 # ── Google Doc Reader (Folder-based, multi-tab) ────────────────────────────────
 
+@traced("drive.list_scrapbook")
+@recorded("drive.list_scrapbook", "folder_id", on_miss=[])
 def list_docs_in_scrapbook_folder(folder_id: str = None) -> list[dict]:
     """
     List all Google Docs inside the Competitor Scrapbook folder.
@@ -45,6 +53,7 @@ def list_docs_in_scrapbook_folder(folder_id: str = None) -> list[dict]:
         return []
 
     try:
+        from googleapiclient.discovery import build
         creds = get_google_creds()
         drive_service = build("drive", "v3", credentials=creds)
 
@@ -54,11 +63,11 @@ def list_docs_in_scrapbook_folder(folder_id: str = None) -> list[dict]:
             f"and trashed=false"
         )
 
-        results = drive_service.files().list(
+        results = current_control().call(drive_service.files().list(
             q=query,
             fields="files(id, name)",
             orderBy="name",
-        ).execute()
+        ).execute)
 
         return [
             {"doc_id": f["id"], "name": f["name"]}
@@ -107,6 +116,7 @@ def _extract_image_ids_from_body(content: list) -> list[str]:
     return image_ids
 
 
+@traced("drive.image", "object_id")
 def _fetch_image_as_base64(object_id: str, inline_objects: dict) -> str | None:
     """
     Fetch an inline image from a Google Doc as a base64 string.
@@ -124,7 +134,8 @@ def _fetch_image_as_base64(object_id: str, inline_objects: dict) -> str | None:
         creds = get_google_creds()
         import google.auth.transport.requests
         authed_session = google.auth.transport.requests.AuthorizedSession(creds)
-        response = authed_session.get(source_uri, timeout=15)
+        control = current_control()
+        response = control.call(authed_session.get, source_uri, timeout=control.timeout(15))
 
         if response.status_code == 200:
             import base64
@@ -136,6 +147,8 @@ def _fetch_image_as_base64(object_id: str, inline_objects: dict) -> str | None:
         return None
 
 
+@traced("docs.read", "doc_id")
+@recorded("docs.read", "doc_id", on_miss={"text": "[Doc not in cassette]", "images": []})
 def read_competitor_doc(doc_id: str) -> dict:
     """
     Read a single competitor Google Doc, including all tabs and inline images.
@@ -148,13 +161,14 @@ def read_competitor_doc(doc_id: str) -> dict:
         }
     """
     try:
+        from googleapiclient.discovery import build
         creds = get_google_creds()
         docs_service = build("docs", "v1", credentials=creds)
 
-        doc = docs_service.documents().get(
+        doc = current_control().call(docs_service.documents().get(
             documentId=doc_id,
             includeTabsContent=True,
-        ).execute()
+        ).execute)
 
         # Inline objects map: used to resolve image base64
         inline_objects = doc.get("inlineObjects", {})
@@ -206,7 +220,8 @@ def get_scrapbook_section(vendor_name: str) -> dict:
     """
     Find and read the Google Doc for a specific vendor from the scrapbook folder.
     Matches doc filename to vendor name (case-insensitive, partial match).
-    Reads all tabs and extracts inline images.
+    Reads all tabs and extracts inline images. Within a run the folder is listed
+    once and each doc read once, however many vendors match it.
 
     Folder structure expected:
         📁 Competitor Scrapbook/
@@ -220,7 +235,7 @@ def get_scrapbook_section(vendor_name: str) -> dict:
             "images": ["base64img1", ...]
         }
     """
-    docs = list_docs_in_scrapbook_folder()
+    docs = coalesced("drive.list_scrapbook", GOOGLE_DOC_SCRAPBOOK_ID or "", list_docs_in_scrapbook_folder)
     if not docs:
         return {"text": "", "images": []}
 
@@ -235,7 +250,7 @@ def get_scrapbook_section(vendor_name: str) -> dict:
     if not matched_doc:
         return {"text": "", "images": []}
 
-    result = read_competitor_doc(matched_doc["doc_id"])
+    result = dict(coalesced("docs.read", matched_doc["doc_id"], read_competitor_doc, matched_doc["doc_id"]))
     result["text"] = f"=== Scrapbook: {matched_doc['name']} ===\n{result['text']}"
     return result
 
@@ -251,6 +266,8 @@ def list_scrapbook_vendors() -> list[str]:
 
 # ── Google Drive Writer ────────────────────────────────────────────────────────
 
+@traced("drive.upload", "filename")
+@recorded("drive.upload", "filename", on_miss="")
 def upload_report_to_drive(report_markdown: str, filename: str = None) -> str:
     """
     Upload a markdown report to Google Drive as a Google Doc.
@@ -260,6 +277,7 @@ def upload_report_to_drive(report_markdown: str, filename: str = None) -> str:
         return ""
 
     try:
+        from googleapiclient.discovery import build
         creds = get_google_creds()
         drive_service = build("drive", "v3", credentials=creds)
 
@@ -274,6 +292,7 @@ def upload_report_to_drive(report_markdown: str, filename: str = None) -> str:
             "mimeType": "application/vnd.google-apps.document",
         }
 
+        from googleapiclient.http import MediaIoBaseUpload
         media = MediaIoBaseUpload(
             io.BytesIO(report_markdown.encode("utf-8")),
             mimetype="text/plain",
@@ -0,0 +1,188 @@
+"""
+Per-host politeness for page fetches.
+
+Every page fetch goes through polite_get(), which per host (scheme-less netloc)
+
+  - allows at most SCRAPE_HOST_CONCURRENCY requests in flight, started at least
+    SCRAPE_HOST_MIN_INTERVAL seconds apart — or the host's robots.txt
+    Crawl-delay, capped at SCRAPE_MAX_CRAWL_DELAY
+  - honors robots.txt (SCRAPE_RESPECT_ROBOTS). It is fetched once per
+    ROBOTS_TTL_HOURS and cached in robots_cache; a missing or unreachable
+    robots.txt allows everything
+  - retries 429 / 5xx responses up to SCRAPE_MAX_RETRIES times, waiting for
+    Retry-After (seconds or an HTTP date) or SCRAPE_BACKOFF_SECONDS doubled per
+    attempt. A wait longer than SCRAPE_MAX_RETRY_AFTER, or than the run has
+    left, gives up at once
+  - keeps a circuit breaker in host_health. After SCRAPE_BREAKER_FAILURES
+    failed fetches in a row the host is skipped for
+    SCRAPE_BREAKER_COOLDOWN_SECONDS; scrape_url() then serves the page's last
+    good copy from the raw store instead of waiting on the host
+
+Slots and pacing are per process; robots.txt and breaker state live in
+SQLite, so workers share them. In cassette replay mode none of this applies —
+nothing touches the network.
+"""
+import email.utils
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from urllib import robotparser
+from urllib.parse import urlsplit
+from agent import cassette
+from agent.deadline import CALL_POLL_SECONDS, current_control
+from agent.tracing import current_span
+from config.settings import (
+    SCRAPE_HOST_CONCURRENCY, SCRAPE_HOST_MIN_INTERVAL, SCRAPE_MAX_CRAWL_DELAY, SCRAPE_RESPECT_ROBOTS,
+    ROBOTS_TTL_HOURS, SCRAPE_MAX_RETRIES, SCRAPE_BACKOFF_SECONDS, SCRAPE_MAX_RETRY_AFTER,
+    SCRAPE_BREAKER_FAILURES, SCRAPE_BREAKER_COOLDOWN_SECONDS,
+)
+from db.database import get_open_circuit, get_robots, record_host_failure, record_host_success, save_robots
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+ROBOTS_AGENT = "*"   # HEADERS' browser User-Agent matches no named group, so the catch-all rules apply
+
+
+class HostUnavailable(Exception):
+    """The host's circuit breaker is open."""
+    def __init__(self, host: str, failures: int, last_error: str = ""):
+        super().__init__(f"{host} failed its last {failures} fetches ({last_error or 'unknown error'})")
+        self.host = host
+
+
+class RobotsDisallowed(Exception):
+    """robots.txt disallows the URL."""
+
+
+class _Host:
+    def __init__(self):
+        self.slots = threading.BoundedSemaphore(max(SCRAPE_HOST_CONCURRENCY, 1))
+        self.lock = threading.Lock()
+        self.next_start = 0.0   # time.monotonic() before which no new request may start
+
+
+_hosts: dict[str, _Host] = {}
+_robots: dict[str, tuple] = {}   # host -> (RobotFileParser or None, loaded at)
+_lock = threading.Lock()
+
+
+def _host(host: str) -> _Host:
+    with _lock:
+        return _hosts.setdefault(host, _Host())
+
+
+@contextmanager
+def host_slot(host: str, interval: float):
+    """Hold one of the host's request slots, starting interval seconds after its previous request."""
+    state = _host(host)
+    control = current_control()
+    while not state.slots.acquire(timeout=CALL_POLL_SECONDS):
+        control.check()
+    try:
+        with state.lock:
+            now = time.monotonic()
+            start = max(now, state.next_start)
+            state.next_start = start + interval
+        control.sleep(start - now)
+        yield
+    finally:
+        state.slots.release()
+
+
+# ── robots.txt ─────────────────────────────────────────────────────────────────
+
+def _fetch_robots(get, url: str, headers: dict):
+    """robots.txt body, "" when there is none (4xx), None when it can't be read right now."""
+    try:
+        response = get(url, headers)
+    except Exception:
+        return None
+    if response["status_code"] >= 500:
+        return None
+    return response["text"] if response["status_code"] < 400 else ""
+
+
+def robots_for(get, scheme: str, host: str, headers: dict):
+    """The host's parsed robots.txt, or None when everything is allowed."""
+    loaded = _robots.get(host)
+    if loaded and time.monotonic() - loaded[1] < ROBOTS_TTL_HOURS * 3600:
+        return loaded[0]
+
+    cached = get_robots(host, ROBOTS_TTL_HOURS)
+    if cached is not None:
+        body = cached["body"]
+    else:
+        body = _fetch_robots(get, f"{scheme}://{host}/robots.txt", {"User-Agent": headers.get("User-Agent", "")})
+        if body is not None:   # an unreachable robots.txt is retried by the next process
+            save_robots(host, body)
+
+    parser = None
+    if body:
+        parser = robotparser.RobotFileParser()
+        parser.parse(body.splitlines())
+    _robots[host] = (parser, time.monotonic())
+    return parser
+
+
+# ── Fetching ───────────────────────────────────────────────────────────────────
+
+def _retry_delay(response: dict, attempt: int) -> float:
+    value = (response.get("headers") or {}).get("Retry-After", "").strip()
+    if value.isdigit():
+        return float(value)
+    if value:
+        try:
+            when = email.utils.parsedate_to_datetime(value)
+            return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
+        except (TypeError, ValueError):
+            pass
+    return SCRAPE_BACKOFF_SECONDS * 2 ** attempt
+
+
+def polite_get(get, url: str, headers: dict) -> dict:
+    """
+    get(url, headers) (scraper_tool._get) under the host's politeness rules.
+    Raises HostUnavailable while the host's breaker is open and RobotsDisallowed
+    for URLs robots.txt excludes. A 429 / 5xx still failing after the retries is
+    returned as is.
+    """
+    if cassette.mode() == cassette.REPLAY:
+        return get(url, headers)
+
+    parts = urlsplit(url)
+    host = parts.netloc.lower()
+    circuit = get_open_circuit(host)
+    if circuit:
+        raise HostUnavailable(host, circuit["failures"], circuit["last_error"])
+
+    interval = SCRAPE_HOST_MIN_INTERVAL
+    if SCRAPE_RESPECT_ROBOTS:
+        robots = robots_for(get, parts.scheme, host, headers)
+        if robots is not None:
+            if not robots.can_fetch(ROBOTS_AGENT, url):
+                raise RobotsDisallowed(f"robots.txt disallows {url}")
+            interval = max(interval, min(float(robots.crawl_delay(ROBOTS_AGENT) or 0), SCRAPE_MAX_CRAWL_DELAY))
+
+    control = current_control()
+    for attempt in range(SCRAPE_MAX_RETRIES + 1):
+        try:
+            with host_slot(host, interval):
+                response = get(url, headers)
+        except Exception as e:
+            record_host_failure(host, str(e)[:500], SCRAPE_BREAKER_FAILURES, SCRAPE_BREAKER_COOLDOWN_SECONDS)
+            raise
+        if response["status_code"] not in RETRY_STATUSES or attempt == SCRAPE_MAX_RETRIES:
+            break
+        delay = _retry_delay(response, attempt)
+        remaining = control.remaining()
+        if delay > SCRAPE_MAX_RETRY_AFTER or (remaining is not None and delay >= remaining):
+            break
+        current_span().incr("retries")
+        control.sleep(delay)
+
+    if response["status_code"] in RETRY_STATUSES:
+        record_host_failure(host, f"{response['status_code']} {response.get('reason', '')}".strip(),
+                            SCRAPE_BREAKER_FAILURES, SCRAPE_BREAKER_COOLDOWN_SECONDS)
+    else:
+        record_host_success(host)
+    return response
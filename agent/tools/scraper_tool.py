@@ -1,5 +1,12 @@
+import hashlib
 import requests
-from bs4 import BeautifulSoup
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+from agent.cassette import recorded
+from agent.deadline import current_control
+from agent.singleflight import coalesced
+from agent.tools.politeness import HostUnavailable, RobotsDisallowed, polite_get
+from agent.tracing import span
+from db.database import get_last_good_content
 
 
 HEADERS = {
@@ -12,35 +19,218 @@ HEADERS = {
 
 MAX_CHARS = 8000  # cap per URL to avoid token overload
 
+DEFAULT_PORTS = {"http": 80, "https": 443}
+TRACKING_PARAMS = {"gclid", "fbclid", "msclkid", "yclid", "dclid", "igshid", "mc_cid", "mc_eid",
+                   "_hsenc", "_hsmi", "ref", "ref_src"}
+
+
+def _is_tracking(param: str) -> bool:
+    param = param.lower()
+    return param.startswith("utm_") or param in TRACKING_PARAMS
+
+
+def canonical_url(url: str) -> str:
+    """
+    url with a lowercase scheme and host, no default port, fragment or tracking
+    parameters, sorted query parameters and no trailing slash (except the root).
+    """
+    parts = urlsplit(url.strip())
+    scheme = (parts.scheme or "https").lower()
+    host = (parts.hostname or "").lower()
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    netloc = host if port in (None, DEFAULT_PORTS.get(scheme)) else f"{host}:{port}"
+    path = parts.path.rstrip("/") or "/"
+    query = urlencode(sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                             if not _is_tracking(k)))
+    return urlunsplit((scheme, netloc, path, query, ""))
+
+
+def url_key(url: str) -> str:
+    """What makes two URLs the same page: canonical_url() without the scheme (http and https coincide)."""
+    return canonical_url(url).split("://", 1)[-1]
+
 
 def scrape_url(url: str) -> str:
-    """Fetch and extract clean text from a URL using requests + BeautifulSoup."""
+    """
+    Fetch and extract clean text from a URL using requests + BeautifulSoup.
+    Fetches follow the host's politeness rules (agent/tools/politeness.py);
+    while the host's circuit breaker is open, the last good copy is returned.
+    Within a run each page (by url_key) is fetched and parsed once.
+    """
     if not url:
         return ""
-    try:
-        response = requests.get(url, headers=HEADERS, timeout=15)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, "lxml")
+    return scrape_page(url)["text"]
+
+
+def scrape_page(url: str) -> dict:
+    """
+    scrape_url() plus the page's links: {"text": str, "links": [absolute URLs],
+    "placeholder": bool}. placeholder is True when text stands in for the page
+    (an error or skip notice, or the last good copy) rather than being fetched now.
+    """
+    return coalesced("http.scrape", url_key(url), _scrape_page, url)
+
+
+def _scrape_page(url: str) -> dict:
+    with span("http.scrape", url=url) as s:
+        try:
+            response = polite_get(_get, url, HEADERS)
+            s.set(status_code=response["status_code"], bytes=response["bytes"])
+            _raise_for_status(response, url)
+            return {**parse_page(response["text"], url), "placeholder": False}
+
+        except HostUnavailable as e:
+            s.set(circuit_open=True)
+            cached = get_last_good_content(url)
+            s.set(cached=cached is not None)
+            if cached is None:
+                return {"text": f"[Skipped {url}: {e}]", "links": [], "placeholder": True}
+            return {"text": f"[Cached copy of {url}: {e}]\n{cached}", "links": [], "placeholder": True}
+
+        except RobotsDisallowed:
+            s.set(robots_disallowed=True)
+            return {"text": f"[Blocked by robots.txt: {url}]", "links": [], "placeholder": True}
+
+        except Exception as e:
+            s.fail(e)
+            return {"text": f"[Scrape error for {url}: {str(e)}]", "links": [], "placeholder": True}
+
+
+def fetch_page(url: str, etag: str = "", last_modified: str = "") -> dict:
+    """
+    Conditional, polite GET of a page, parsed. Returns {"not_modified": bool,
+    "status_code", "bytes", "text", "links", "etag", "last_modified"} (no text
+    or links when not modified). Raises on failures, including
+    HostUnavailable / RobotsDisallowed.
+    """
+    headers = dict(HEADERS)
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    response = polite_get(_get, url, headers)
+    page = {
+        "not_modified": response["status_code"] == 304,
+        "status_code": response["status_code"],
+        "bytes": response["bytes"],
+        "text": "",
+        "links": [],
+        "etag": response["headers"].get("ETag", etag),
+        "last_modified": response["headers"].get("Last-Modified", last_modified),
+    }
+    if not page["not_modified"]:
+        _raise_for_status(response, url)
+        page.update(parse_page(response["text"], url))
+    return page
+
 
-        # Remove noise
-        for tag in soup(["script", "style", "nav", "footer", "header",
-                          "aside", "form", "iframe", "noscript"]):
-            tag.decompose()
+@recorded("http.get", "url", "headers")
+def _get(url: str, headers: dict) -> dict:
+    """
+    One GET, reduced to what the scrapers read so it can be recorded and replayed.
+    Within a run its timeout is cut to the deadline, and it is abandoned on cancel.
+    """
+    control = current_control()
+    response = control.call(requests.get, url, headers=headers, timeout=control.timeout(15))
+    return {
+        "status_code": response.status_code,
+        "reason": response.reason,
+        "headers": {k: response.headers[k] for k in ("ETag", "Last-Modified", "Retry-After")
+                    if k in response.headers},
+        "text": response.text,
+        "bytes": len(response.content),
+    }
 
-        text = soup.get_text(separator="\n", strip=True)
-        lines = [line.strip() for line in text.splitlines() if len(line.strip()) > 40]
-        clean = "\n".join(lines)
-        return clean[:MAX_CHARS]
 
+def _raise_for_status(response: dict, url: str):
+    if response["status_code"] >= 400:
+        raise requests.HTTPError(f"{response['status_code']} Error: {response['reason']} for url: {url}")
+
+
+def _clean_soup(html: str):
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, "lxml")
+
+    # Remove noise
+    for tag in soup(["script", "style", "nav", "footer", "header",
+                      "aside", "form", "iframe", "noscript"]):
+        tag.decompose()
+    return soup
+
+
+def _soup_text(soup) -> str:
+    text = soup.get_text(separator="\n", strip=True)
+    lines = [line.strip() for line in text.splitlines() if len(line.strip()) > 40]
+    clean = "\n".join(lines)
+    return clean[:MAX_CHARS]
+
+
+def extract_text(html: str) -> str:
+    """Strip page chrome and short lines from HTML, capped at MAX_CHARS."""
+    return _soup_text(_clean_soup(html))
+
+
+def parse_page(html: str, base_url: str) -> dict:
+    """
+    extract_text() plus the page's links outside its chrome (nav, header,
+    footer, ...): {"text": str, "links": [absolute http(s) URLs, in page order]}.
+    """
+    soup = _clean_soup(html)
+    links = {}   # ordered set
+    for anchor in soup.find_all("a", href=True):
+        link = urljoin(base_url, anchor["href"].strip()).split("#", 1)[0]
+        if link.startswith(("http://", "https://")):
+            links[link] = None
+    return {"text": _soup_text(soup), "links": list(links)}
+
+
+def probe_url(url: str, etag: str = "", last_modified: str = "") -> dict:
+    """
+    Cheap change check for a URL. Sends a conditional GET with the validators
+    from the last probe; on 304 the page is unchanged. Otherwise the page text
+    is extracted exactly as scrape_url() would and hashed, so the hash can be
+    compared with the raw store.
+
+    Returns {"not_modified": bool, "content_hash": str | None,
+             "etag": str, "last_modified": str, "error": str | None}.
+    """
+    headers = dict(HEADERS)
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    try:
+        response = polite_get(_get, url, headers)
+        if response["status_code"] == 304:
+            return {"not_modified": True, "content_hash": None, "etag": etag,
+                    "last_modified": last_modified, "error": None}
+        _raise_for_status(response, url)
+        text = extract_text(response["text"])
     except Exception as e:
-        return f"[Scrape error for {url}: {str(e)}]"
+        return {"not_modified": False, "content_hash": None, "etag": "", "last_modified": "", "error": str(e)}
+
+    return {
+        "not_modified": False,
+        "content_hash": hashlib.sha256(text.encode("utf-8")).hexdigest(),
+        "etag": response["headers"].get("ETag", ""),
+        "last_modified": response["headers"].get("Last-Modified", ""),
+        "error": None,
+    }
+
+
+def scrape_each(urls: list[str]) -> dict[str, str]:
+    """Scrape a list of URLs. Returns {url: text}, preserving order."""
+    return {url: scrape_url(url) for url in urls if url}
+
+
+def join_sources(pages: dict[str, str]) -> str:
+    """Concatenate per-URL results with source markers (the format the synthesizer sees)."""
+    return "\n\n".join(f"--- Source: {url} ---\n{content}" for url, content in pages.items())
 
 
 def scrape_multiple(urls: list[str]) -> str:
     """Scrape a list of URLs and concatenate results."""
-    results = []
-    for url in urls:
-        if url:
-            content = scrape_url(url)
-            results.append(f"--- Source: {url} ---\n{content}")
-    return "\n\n".join(results)
+    return join_sources(scrape_each(urls))
@@ -1,6 +1,11 @@
-from youtube_transcript_api import YouTubeTranscriptApi, NoTranscriptFound, TranscriptsDisabled
-from googleapiclient.discovery import build
 import re
+from agent.metrics import YOUTUBE_QUOTA
+from agent.cassette import recorded
+from agent.deadline import current_control
+from agent.singleflight import coalesced
+from agent.tracing import current_span, traced
+
+SEARCH_QUOTA_UNITS = 100   # YouTube Data API cost of one search.list call
 
 
 MAX_TRANSCRIPT_CHARS = 6000
@@ -19,18 +24,25 @@ def extract_video_id(url: str) -> str | None:
     return None
 
 
+@traced("youtube.transcript", "video_id")
+@recorded("youtube.transcript", "video_id", on_miss="[No transcript available for this video]")
 def get_transcript(video_id: str) -> str:
     """Fetch transcript for a YouTube video ID."""
+    from youtube_transcript_api import YouTubeTranscriptApi, NoTranscriptFound, TranscriptsDisabled
     try:
-        transcript_list = YouTubeTranscriptApi.get_transcript(video_id)
+        transcript_list = current_control().call(YouTubeTranscriptApi.get_transcript, video_id)
         text = " ".join([t["text"] for t in transcript_list])
         return text[:MAX_TRANSCRIPT_CHARS]
     except (NoTranscriptFound, TranscriptsDisabled):
+        current_span().set(available=False)
         return "[No transcript available for this video]"
     except Exception as e:
+        current_span().fail(e)
         return f"[Transcript error: {str(e)}]"
 
 
+@traced("youtube.search", "channel_handle")
+@recorded("youtube.search", "channel_handle", "max_results", on_miss=[])
 def search_channel_videos(channel_handle: str, max_results: int = 5) -> list[dict]:
     """
     Search for recent videos from a YouTube channel.
@@ -46,16 +58,18 @@ def search_channel_videos(channel_handle: str, max_results: int = 5) -> list[dic
         return []
 
     try:
+        from googleapiclient.discovery import build
         youtube = build("youtube", "v3", developerKey=api_key)
 
         # Resolve channel handle to channel ID if needed
         if channel_handle.startswith("@"):
-            search_response = youtube.search().list(
+            YOUTUBE_QUOTA.inc(SEARCH_QUOTA_UNITS)
+            search_response = current_control().call(youtube.search().list(
                 q=channel_handle,
                 type="channel",
                 part="id",
                 maxResults=1
-            ).execute()
+            ).execute)
             if not search_response.get("items"):
                 return []
             channel_id = search_response["items"][0]["id"]["channelId"]
@@ -63,13 +77,14 @@ def search_channel_videos(channel_handle: str, max_results: int = 5) -> list[dic
             channel_id = channel_handle
 
         # Get recent uploads
-        search_response = youtube.search().list(
+        YOUTUBE_QUOTA.inc(SEARCH_QUOTA_UNITS)
+        search_response = current_control().call(youtube.search().list(
             channelId=channel_id,
             part="id,snippet",
             order="date",
             maxResults=max_results,
             type="video"
-        ).execute()
+        ).execute)
 
         videos = []
         for item in search_response.get("items", []):
@@ -84,14 +99,27 @@ def search_channel_videos(channel_handle: str, max_results: int = 5) -> list[dic
         return []
 
 
+def channel_key(channel_handle: str) -> str:
+    """Normalize '@Handle', 'youtube.com/@handle/' or a channel URL to '@handle' / the channel ID."""
+    handle = channel_handle.strip().rstrip("/")
+    match = re.search(r"youtube\.com/(?:channel/)?([^/?#]+)", handle)
+    if match:
+        handle = match.group(1)
+    return handle.lower() if handle.startswith("@") else handle   # handles are case-insensitive, IDs aren't
+
+
 def fetch_channel_transcripts(channel_handle: str, max_videos: int = 5) -> str:
     """
     Fetch transcripts for the most recent N videos from a channel.
-    Returns concatenated transcript text.
+    Returns concatenated transcript text. Within a run each channel is fetched once.
     """
     if not channel_handle:
         return ""
+    return coalesced("youtube.channel", f"{channel_key(channel_handle)}|{max_videos}",
+                     _fetch_channel_transcripts, channel_handle, max_videos)
+
 
+def _fetch_channel_transcripts(channel_handle: str, max_videos: int) -> str:
     videos = search_channel_videos(channel_handle, max_results=max_videos)
 
     if not videos:
@@ -0,0 +1,198 @@
+"""
+Run tracing.
+
+Every run is traced as a tree of timed spans — run → node → vendor → URL fetch /
+transcript / Drive call / LLM call — with attributes such as vendor, URL, bytes,
+tokens, cache hits and status. Spans are appended as JSON lines to
+TRACE_DIR/<run_id>.jsonl as they end, with OpenTelemetry field names, so the file
+can be read back for the Evaluate page's waterfall or shipped to a collector.
+
+    with span("http.get", url=url) as s:
+        ...
+        s.set(bytes=len(text))
+
+Finished spans also feed the Prometheus metrics (agent/metrics.py), so spans
+are recorded even with TRACING_ENABLED off — only the file is skipped.
+Outside a run (scheduler probes, UI previews) spans are no-ops.
+"""
+import functools
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from agent.metrics import observe_span
+from config.settings import TRACING_ENABLED, TRACE_DIR
+
+log = logging.getLogger("tracing")
+
+INHERITED_ATTRIBUTES = ("node", "vendor")   # copied from parent to child spans unless set
+
+_current: ContextVar = ContextVar("current_span", default=None)
+_write_lock = threading.Lock()
+
+
+class Span:
+    def __init__(self, name, trace_id, parent=None, path=None, attributes=None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else ""
+        self.path = path or parent.path
+        inherited = {k: parent.attributes[k] for k in INHERITED_ATTRIBUTES if parent and k in parent.attributes}
+        self.attributes = {**inherited, **{k: v for k, v in (attributes or {}).items() if v is not None}}
+        self.status, self.error = "OK", ""
+        self.start_ns = time.time_ns()
+
+    def set(self, **attributes):
+        self.attributes.update({k: v for k, v in attributes.items() if v is not None})
+
+    def incr(self, key, amount=1):
+        self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    def fail(self, message):
+        self.status, self.error = "ERROR", str(message)[:500]
+
+    def record(self):
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_id,
+            "name": self.name,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": time.time_ns(),
+            "status": {"code": self.status, "message": self.error},
+            "attributes": self.attributes,
+        }
+
+
+class _NoopSpan:
+    def set(self, **attributes):
+        pass
+
+    def incr(self, key, amount=1):
+        pass
+
+    def fail(self, message):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+def trace_path(run_id: str) -> str:
+    return os.path.join(TRACE_DIR, f"{run_id}.jsonl")
+
+
+def current_span():
+    """The active span, or a no-op span outside a traced run."""
+    return _current.get() or NOOP_SPAN
+
+
+@contextmanager
+def trace_run(run_id: str, **attributes):
+    """Root span for a run. A resumed run appends a new root to the same trace file."""
+    if TRACING_ENABLED:
+        os.makedirs(TRACE_DIR, exist_ok=True)
+    root = Span("run", trace_id=run_id, path=trace_path(run_id), attributes={"run_id": run_id, **attributes})
+    with _activate(root):
+        yield root
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Child span of the active span; a no-op when nothing is being traced."""
+    parent = _current.get()
+    if parent is None:
+        yield NOOP_SPAN
+        return
+    with _activate(Span(name, trace_id=parent.trace_id, parent=parent, attributes=attributes)) as child:
+        yield child
+
+
+@contextmanager
+def _activate(s: Span):
+    token = _current.set(s)
+    try:
+        yield s
+    except Exception as e:
+        s.fail(f"{type(e).__name__}: {e}")
+        raise
+    except BaseException as e:   # GeneratorExit / KeyboardInterrupt: the run was stopped
+        s.set(interrupted=True)
+        s.fail(type(e).__name__)
+        raise
+    finally:
+        try:
+            _current.reset(token)
+        except ValueError:   # a stream generator closed from another context
+            pass
+        _export(s)
+
+
+def _export(s: Span):
+    record = s.record()
+    try:
+        observe_span(record)
+    except Exception as e:   # metrics must never break a run
+        log.warning("Could not record metrics for span %s: %s", s.name, e)
+    if not TRACING_ENABLED:
+        return
+    line = json.dumps(record, default=str) + "\n"
+    with _write_lock:
+        with open(s.path, "a") as f:
+            f.write(line)
+
+
+def _size(value) -> int:
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(_size(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(_size(v) for v in value)
+    return 0
+
+
+def traced(name: str, *arg_names: str):
+    """
+    Decorator: run the function in a span named `name`, recording the named
+    arguments as attributes and the size of the result as bytes.
+    """
+    def decorator(fn):
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _current.get() is None:
+                return fn(*args, **kwargs)
+            arguments = signature.bind_partial(*args, **kwargs).arguments
+            with span(name, **{n: arguments.get(n) for n in arg_names}) as s:
+                result = fn(*args, **kwargs)
+                s.set(bytes=_size(result))
+                return result
+        return wrapper
+    return decorator
+
+
+def traced_node(node_name: str, fn):
+    """Wrap a graph node so each execution is a span."""
+    @functools.wraps(fn)
+    def wrapper(state):
+        with span("node", node=node_name) as s:
+            s.set(vendors=len(state.get("vendors") or []))
+            return fn(state)
+    return wrapper
+
+
+def load_trace(run_id: str) -> list[dict]:
+    """All spans recorded for a run, in the order they ended. Empty if untraced."""
+    try:
+        with open(trace_path(run_id)) as f:
+            return [json.loads(line) for line in f if line.strip()]
+    except FileNotFoundError:
+        return []
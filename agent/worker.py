@@ -0,0 +1,211 @@
+"""
+Queue workers.
+
+    python -m agent.worker                     # WORKER_CONCURRENCY jobs at a time, until stopped
+    python -m agent.worker --concurrency 4
+    python -m agent.worker --once              # drain the queue, then exit
+
+Start as many worker processes as you like — on one machine or several sharing
+the database and checkpoint files. Each claims a job with a lease of
+WORKER_LEASE_SECONDS and renews it while the run is in progress. If a worker dies,
+its lease lapses and another worker reclaims the job, resuming the run from its
+last checkpoint. At most SCHEDULER_MAX_CONCURRENT jobs run at once across all workers.
+"""
+import argparse
+import logging
+import os
+import signal
+import socket
+import threading
+import uuid
+from functools import lru_cache
+from agent.metrics import JOBS, start_exporters
+from db.database import (
+    init_db, enqueue_job, claim_next_job, heartbeat_job, set_job_run_id, finish_job, retry_job,
+    mark_competitors_refreshed, get_run,
+)
+from config.settings import (
+    SCHEDULER_MAX_CONCURRENT, SCHEDULER_MAX_ATTEMPTS, SCHEDULER_RETRY_SECONDS,
+    WORKER_CONCURRENCY, WORKER_LEASE_SECONDS, WORKER_POLL_SECONDS, UI_WORKER_THREADS,
+)
+
+log = logging.getLogger("worker")
+
+INTERACTIVE_PRIORITY = 10   # runs someone is watching are claimed before scheduled refreshes
+
+_wakeup = threading.Event()   # lets submit_run() rouse idle workers in this process without waiting a poll
+
+
+def submit_run(vendors: list[str], research_query: str, save_to_drive: bool = False,
+               resume_run_id: str = None, profile: bool = False, deadline_seconds: int = None) -> str:
+    """
+    Queue a run (or the resumption of resume_run_id) for the workers and return
+    its run ID straight away. Follow it with get_run() / get_run_events(), and
+    read the outcome with get_run_result() — from any process, after any reconnect.
+    Stop it with request_cancel(run_id).
+    """
+    run_id = resume_run_id or uuid.uuid4().hex
+    enqueue_job(research_query, vendors, save_to_drive, run_id=run_id, priority=INTERACTIVE_PRIORITY,
+                profile=profile, deadline_seconds=deadline_seconds)
+    _wakeup.set()
+    return run_id
+
+
+class LeaseLost(Exception):
+    pass
+
+
+def _job_stream(job: dict):
+    """Resume the job's run if it has a checkpoint, else start it (under the job's run ID, if any)."""
+    from agent.graph import stream_agent, resume_stream
+
+    if job.get("run_id") and get_run(job["run_id"]):
+        try:
+            return resume_stream(job["run_id"])
+        except ValueError:
+            pass   # no checkpoint to resume from
+    return stream_agent(job["vendors"], job["research_query"], save_to_drive=bool(job["save_to_drive"]),
+                        run_id=job.get("run_id"), profile=bool(job.get("profile")),
+                        deadline_seconds=job.get("deadline_seconds"))
+
+
+def _heartbeat(job_id, worker_id, lease_seconds, done: threading.Event, lost: threading.Event):
+    """Renew the lease at a third of its length until done; flag lost if it was taken over."""
+    while not done.wait(lease_seconds / 3):
+        try:
+            if not heartbeat_job(job_id, worker_id, lease_seconds):
+                lost.set()
+                return
+        except Exception as e:
+            log.warning("Heartbeat for job %d failed: %s", job_id, e)   # retried next beat
+
+
+def run_job(job: dict, worker_id: str, lease_seconds: int = WORKER_LEASE_SECONDS):
+    """Run one leased job to completion and record the outcome."""
+    if job["attempts"] > SCHEDULER_MAX_ATTEMPTS:
+        # Reclaimed after its worker died too many times — likely crashes the process
+        log.error("Job %d abandoned after %d attempts", job["id"], job["attempts"] - 1)
+        if finish_job(job["id"], "failed", "abandoned by workers", worker_id):
+            mark_competitors_refreshed(job["vendors"], refreshed=False)
+            JOBS.inc(status="failed")
+        return
+
+    done, lost = threading.Event(), threading.Event()
+    threading.Thread(
+        target=_heartbeat, args=(job["id"], worker_id, lease_seconds, done, lost), daemon=True,
+    ).start()
+
+    run = get_run(job["run_id"]) if job.get("run_id") else None
+    try:
+        if not (run and run["status"] == "completed"):   # else it finished before its worker died
+            log.info("Starting job %d (attempt %d): %s", job["id"], job["attempts"], ", ".join(job["vendors"]))
+            stream = _job_stream(job)
+            for node_name, update in stream:
+                if node_name == "__start__":
+                    set_job_run_id(job["id"], update["run_id"])
+                if lost.is_set():
+                    stream.close()   # checkpointed; the new lease holder resumes it
+                    raise LeaseLost()
+    except LeaseLost:
+        log.warning("Lost the lease on job %d; another worker has it", job["id"])
+        return
+    except Exception as e:
+        # Interactive runs fail straight away — the user decides whether to resume
+        if job["attempts"] < SCHEDULER_MAX_ATTEMPTS and job["priority"] < INTERACTIVE_PRIORITY:
+            delay = SCHEDULER_RETRY_SECONDS * 2 ** (job["attempts"] - 1)
+            log.warning("Job %d failed (%s); retrying in %ds", job["id"], e, delay)
+            retry_job(job["id"], str(e), delay, worker_id)
+            JOBS.inc(status="retried")
+        else:
+            log.error("Job %d failed after %d attempts: %s", job["id"], job["attempts"], e)
+            if finish_job(job["id"], "failed", str(e), worker_id):
+                mark_competitors_refreshed(job["vendors"], refreshed=False)
+                JOBS.inc(status="failed")
+        return
+    finally:
+        done.set()
+
+    if finish_job(job["id"], "completed", worker_id=worker_id):
+        mark_competitors_refreshed(job["vendors"])
+        JOBS.inc(status="completed")
+        log.info("Job %d completed", job["id"])
+
+
+def work(worker_id: str, stop: threading.Event, once: bool = False,
+         max_running: int = SCHEDULER_MAX_CONCURRENT,
+         lease_seconds: int = WORKER_LEASE_SECONDS,
+         poll_seconds: int = WORKER_POLL_SECONDS):
+    """Claim and run jobs until stop is set (or, with once=True, until none are ready)."""
+    while not stop.is_set():
+        job = claim_next_job(worker_id, lease_seconds, max_running)
+        if job:
+            run_job(job, worker_id, lease_seconds)
+        elif once:
+            return
+        else:
+            _wakeup.wait(poll_seconds)
+            _wakeup.clear()
+
+
+def start_workers(concurrency: int, stop: threading.Event, once: bool = False, daemon: bool = False,
+                  **kwargs) -> list[threading.Thread]:
+    """Start `concurrency` worker threads in this process, each with its own worker ID."""
+    base = f"{socket.gethostname()}:{os.getpid()}"
+    threads = []
+    for i in range(concurrency):
+        thread = threading.Thread(
+            target=work, args=(f"{base}:{i}", stop, once), kwargs=kwargs, name=f"worker-{i}", daemon=daemon,
+        )
+        thread.start()
+        threads.append(thread)
+    return threads
+
+
+@lru_cache(maxsize=None)
+def start_background_workers(concurrency: int = UI_WORKER_THREADS) -> int:
+    """
+    Host worker threads inside a long-lived process such as the Streamlit server.
+    Runs once per process. The threads are daemons: if the process exits
+    mid-run, the job's lease lapses and it is resumed by the next worker.
+    Also starts the process's metrics exporters, if configured.
+    """
+    start_exporters()
+    if concurrency > 0:
+        start_workers(concurrency, threading.Event(), daemon=True)
+    return concurrency
+
+
+def _raise_interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run queued evaluation jobs.")
+    parser.add_argument("--concurrency", type=int, default=WORKER_CONCURRENCY, help="jobs at a time in this process")
+    parser.add_argument("--once", action="store_true", help="exit when no job is ready")
+    parser.add_argument("--lease-seconds", type=int, default=WORKER_LEASE_SECONDS)
+    parser.add_argument("--poll-seconds", type=int, default=WORKER_POLL_SECONDS)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(threadName)s %(levelname)s %(message)s")
+    signal.signal(signal.SIGTERM, _raise_interrupt)
+    init_db()
+    start_exporters()
+
+    stop = threading.Event()
+    threads = start_workers(args.concurrency, stop, args.once,
+                            lease_seconds=args.lease_seconds, poll_seconds=args.poll_seconds)
+    try:
+        for thread in threads:
+            while thread.is_alive():
+                thread.join(timeout=1)
+    except KeyboardInterrupt:
+        log.info("Stopping; in-flight jobs will finish first")
+        stop.set()
+        _wakeup.set()
+        for thread in threads:
+            thread.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,5 @@
 import streamlit as st
 from db.database import init_db
-from ui.pages import configure, evaluate, history
 
 st.set_page_config(
     page_title="CompIntel — Competitive Intelligence Agent",
@@ -9,7 +8,19 @@ st.set_page_config(
     initial_sidebar_state="expanded",
 )
 
-init_db()
+
+@st.cache_resource
+def _init_db_once():
+    # Schema checks/migrations only need to run once per server process, not on every rerun
+    init_db()
+    # Evaluations run on background worker threads, not in the script thread,
+    # so reruns and reloads don't kill them (UI_WORKER_THREADS; 0 = external workers)
+    from agent.worker import start_background_workers
+    start_background_workers()
+    return True
+
+
+_init_db_once()
 
 # ── Global CSS — Warm Neutral / Stripe-Vercel feel ─────────────────────────────
 st.markdown("""
@@ -317,9 +328,13 @@ with st.sidebar:
     """, unsafe_allow_html=True)
 
 # ── Page Routing ───────────────────────────────────────────────────────────────
+# Pages are imported on demand so opening one doesn't load the others' dependencies
 if page == "Configure Competitors":
+    from ui.pages import configure
     configure.render()
 elif page == "Evaluate Competitors":
+    from ui.pages import evaluate
     evaluate.render()
 elif page == "Report History":
+    from ui.pages import history
     history.render()
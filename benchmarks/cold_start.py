@@ -0,0 +1,126 @@
+"""
+Cold-start benchmark.
+
+    python -m benchmarks.cold_start [--runs 5] [--output cold_start.json] [--skip-server]
+
+Measures, each in a fresh interpreter:
+  - import_agent_graph  time to `import agent.graph`
+  - first_render        time to import + run app.py once (Streamlit AppTest, default page)
+  - server_ready        `streamlit run app.py` until /_stcore/health answers
+Prints a JSON summary (median / min / max seconds per measurement).
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_SNIPPET = """
+import time
+t = time.perf_counter()
+import agent.graph
+print(time.perf_counter() - t)
+"""
+
+RENDER_SNIPPET = """
+import time
+t = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+AppTest.from_file("app.py", default_timeout=120).run()
+print(time.perf_counter() - t)
+"""
+
+
+def _env(db_path):
+    env = dict(os.environ)
+    env["DB_PATH"] = db_path            # never touch the real database
+    env.setdefault("OPENAI_API_KEY", "sk-benchmark")
+    return env
+
+
+def _time_snippet(snippet, env) -> float:
+    out = subprocess.run(
+        [sys.executable, "-c", snippet], cwd=ROOT, env=env,
+        capture_output=True, text=True, check=True,
+    )
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _time_server(env, timeout=120) -> float:
+    port = _free_port()
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", "app.py",
+         "--server.headless", "true", "--server.port", str(port),
+         "--browser.gatherUsageStats", "false"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1) as r:
+                    if r.status == 200:
+                        return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.05)
+        raise TimeoutError("streamlit server did not become healthy")
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+def _summary(samples):
+    return {
+        "median_s": round(statistics.median(samples), 4),
+        "min_s": round(min(samples), 4),
+        "max_s": round(max(samples), 4),
+        "runs": len(samples),
+    }
+
+
+def run(runs: int = 5, skip_server: bool = False) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        env = _env(os.path.join(tmp, "bench.db"))
+        # Warm the OS file cache / bytecode once so runs measure import work, not disk
+        _time_snippet(IMPORT_SNIPPET, env)
+
+        results = {
+            "import_agent_graph": _summary([_time_snippet(IMPORT_SNIPPET, env) for _ in range(runs)]),
+            "first_render": _summary([_time_snippet(RENDER_SNIPPET, env) for _ in range(runs)]),
+        }
+        if not skip_server:
+            results["server_ready"] = _summary([_time_server(env) for _ in range(runs)])
+    results["python"] = sys.version.split()[0]
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cold-start benchmark for app.py and agent.graph")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--output", help="also write the JSON summary to this file")
+    parser.add_argument("--skip-server", action="store_true", help="skip the `streamlit run` measurement")
+    args = parser.parse_args(argv)
+
+    results = run(runs=args.runs, skip_server=args.skip_server)
+    text = json.dumps(results, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+"""
+Offline stand-ins for the pipeline's external I/O, used by the benchmarks.
+
+configure_environment() must run before any project module is imported:
+it points DB_PATH / CHECKPOINT_DB_PATH / TRACE_DIR at a scratch directory so benchmarks
+never touch the real database, and turns off per-host pacing and robots.txt.
+"""
+import base64
+import os
+import random
+import string
+import struct
+import tempfile
+import time
+import zlib
+
+
+def configure_environment(workdir: str = None) -> str:
+    workdir = workdir or tempfile.mkdtemp(prefix="compintel-bench-")
+    os.environ["DB_PATH"] = os.path.join(workdir, "bench.db")
+    os.environ["CHECKPOINT_DB_PATH"] = os.path.join(workdir, "checkpoints.db")
+    os.environ["TRACE_DIR"] = os.path.join(workdir, "traces")
+    os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+    # Synthetic hosts don't need pacing, and robots.txt fetches would skew the call counts
+    os.environ.setdefault("SCRAPE_HOST_MIN_INTERVAL", "0")
+    os.environ.setdefault("SCRAPE_RESPECT_ROBOTS", "false")
+    return workdir
+
+
+def synthetic_text(n_chars: int, seed: int = 0) -> str:
+    """Deterministic pseudo-prose of roughly n_chars characters."""
+    rng = random.Random(seed)
+    words = []
+    size = 0
+    while size < n_chars:
+        word = "".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 10)))
+        words.append(word)
+        size += len(word) + 1
+    lines = [" ".join(words[i:i + 12]) for i in range(0, len(words), 12)]
+    return "\n".join(lines)[:n_chars]
+
+
+def synthetic_html(n_chars: int, seed: int = 0, links=()) -> str:
+    """
+    A page of roughly n_chars of prose wrapped in the chrome extract_text() strips.
+    links are listed in the content, where the crawler follows them (see with_links).
+    """
+    paragraphs = synthetic_text(n_chars, seed=seed).split("\n")
+    body = "\n".join(f"<p>{p}</p>" for p in paragraphs)
+    return with_links(
+        "<html><head><title>Page</title><style>p { margin: 0 }</style>"
+        "<script>window.analytics = [];</script></head><body>"
+        "<header><nav><a href='/'>Home</a><a href='/blog'>Blog</a><a href='/docs'>Docs</a></nav></header>"
+        f"<main><h1>Product update</h1>{body}</main>"
+        "<aside>Related posts</aside><footer>© Example Inc. All rights reserved.</footer>"
+        "</body></html>",
+        links,
+    )
+
+
+ARTICLES_PER_PAGE = 6   # more than a blog / changelog crawl fetches, so CRAWL_LIMITS is what stops it
+
+
+def article_links(url: str, n: int = ARTICLES_PER_PAGE) -> list[str]:
+    """
+    The in-content links of a synthetic page: an index page (blog, docs,
+    changelog) links to n articles under it, an article to its n siblings.
+    """
+    base = url.rstrip("/")
+    if "/post-" in base:
+        base = base.rsplit("/post-", 1)[0]
+    return [f"{base}/post-{k}" for k in range(n)]
+
+
+def with_links(html: str, links) -> str:
+    """html with links appended to its <main> content."""
+    if not links:
+        return html
+    items = "".join(f"<li><a href='{link}'>Post {i}</a></li>" for i, link in enumerate(links))
+    return html.replace("</main>", f"<ul>{items}</ul></main>", 1)
+
+
+def synthetic_png(width: int = 1280, height: int = 720, n_bytes: int = 60000) -> str:
+    """Base64 "PNG" with a real header (for image-token estimates) padded to n_bytes."""
+    header = b"\x89PNG\r\n\x1a\n" + struct.pack(">I", 13) + b"IHDR" + struct.pack(">II", width, height)
+    return base64.b64encode(header + b"\0" * max(n_bytes - len(header), 0)).decode("ascii")
+
+
+def synthetic_doc(n_chars: int, n_images: int = 0, n_tabs: int = 2, seed: int = 0) -> dict:
+    """A Google Docs API document (documents.get with tabs) with headings, text and inline images."""
+    def paragraph(text, style="NORMAL_TEXT"):
+        return {"paragraph": {"elements": [{"textRun": {"content": text + "\n"}}],
+                              "paragraphStyle": {"namedStyleType": style}}}
+
+    inline_objects, tabs = {}, []
+    for t in range(n_tabs):
+        content = [paragraph(f"Feature area {t}", "HEADING_2")]
+        content += [paragraph(line) for line in synthetic_text(n_chars // n_tabs, seed=seed + t).split("\n")]
+        for i in range(t, n_images, n_tabs):
+            object_id = f"kix.image{i}"
+            inline_objects[object_id] = {"inlineObjectProperties": {"embeddedObject": {
+                "imageProperties": {"contentUri": f"https://docs.example/image/{seed}/{i}"}}}}
+            content.append({"paragraph": {"elements": [{"inlineObjectElement": {"inlineObjectId": object_id}}]}})
+        tabs.append({"tabProperties": {"title": f"Tab {t}"}, "documentTab": {"body": {"content": content}}})
+    return {"tabs": tabs, "inlineObjects": inline_objects}
+
+
+SYNTHESIS_SECTIONS = [
+    "Recent Feature Launches & Updates",
+    "Use Cases & Target Segments",
+    "Technical Architecture & Protocol Support",
+    "User Interface & User Experience",
+    "Pricing & Packaging",
+    "Strategic Direction & Roadmap Signals",
+    "Gaps vs Your Product",
+    "Key Watch Points",
+]
+
+
+class FakeLLM:
+    """Mimics ChatOpenAI.invoke with configurable latency and output size."""
+
+    def __init__(self, latency_s: float = 0.0, output_chars: int = 4000):
+        self.latency_s = latency_s
+        self.output_chars = output_chars
+        self.calls = 0
+
+    def invoke(self, messages, *args, **kwargs):
+        from langchain_core.messages import AIMessage
+        self.calls += 1
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        per_section = max(self.output_chars // len(SYNTHESIS_SECTIONS), 40)
+        content = "\n\n".join(
+            f"## {title}\n{synthetic_text(per_section, seed=self.calls * 31 + i)}"
+            for i, title in enumerate(SYNTHESIS_SECTIONS)
+        )
+        return AIMessage(
+            content=content,
+            usage_metadata={"input_tokens": 3000, "output_tokens": self.output_chars // 4,
+                            "total_tokens": 3000 + self.output_chars // 4},
+        )
+
+
+def install_fakes(page_chars: int = 8000, transcript_chars: int = 6000, scrapbook_chars: int = 2000,
+                  images_per_vendor: int = 0, llm: FakeLLM = None) -> dict:
+    """
+    Patch scraping, YouTube, Drive and the LLM factory inside the node modules.
+    Blogs, docs and changelogs still go through the real crawler, over fake
+    page fetches whose pages link to articles (article_links).
+    Returns a dict of call counters.
+    """
+    import agent.nodes.web_scraper as web_scraper
+    import agent.nodes.youtube_scraper as youtube_scraper
+    import agent.nodes.gdoc_reader as gdoc_reader
+    import agent.nodes.synthesizer as synthesizer
+    import agent.nodes.diff_engine as diff_engine
+    import agent.nodes.report_writer as report_writer
+    from agent.tools import crawler
+
+    calls = {"scrape": 0, "youtube": 0, "scrapbook": 0}
+    llm = llm or FakeLLM()
+
+    def scrape_page(url):
+        calls["scrape"] += 1
+        return {"text": synthetic_text(page_chars, seed=zlib.crc32(url.encode())), "links": article_links(url),
+                "placeholder": False}
+
+    def fetch_page(url, etag="", last_modified=""):
+        page = scrape_page(url)
+        return {"not_modified": False, "status_code": 200, "bytes": len(page["text"]),
+                "etag": "", "last_modified": "", "text": page["text"], "links": page["links"]}
+
+    def fetch_channel_transcripts(channel, max_videos=5):
+        calls["youtube"] += 1
+        return synthetic_text(transcript_chars, seed=zlib.crc32(channel.encode()))
+
+    def get_scrapbook_section(vendor_name):
+        calls["scrapbook"] += 1
+        image = synthetic_text(20000, seed=7)  # stands in for a base64 PNG
+        return {"text": synthetic_text(scrapbook_chars, seed=zlib.crc32(vendor_name.encode())),
+                "images": [image] * images_per_vendor}
+
+    web_scraper.scrape_page = scrape_page
+    crawler.scrape_page = scrape_page
+    crawler.fetch_page = fetch_page
+    youtube_scraper.fetch_channel_transcripts = fetch_channel_transcripts
+    gdoc_reader.get_scrapbook_section = get_scrapbook_section
+    synthesizer.get_llm = lambda *a, **k: llm
+    diff_engine.get_llm = lambda *a, **k: llm
+    report_writer.upload_report_to_drive = lambda markdown, filename=None: "https://drive.example/bench"
+
+    calls["llm"] = llm
+    return calls
+
+
+FIXTURE_VARIANTS = 16   # distinct pages / transcripts / docs per install_io_fakes()
+
+
+class _FakeDocsService:
+    """Just enough of googleapiclient's docs v1 service for read_competitor_doc()."""
+
+    def __init__(self, documents: dict, calls: dict):
+        self.documents_by_id, self.calls = documents, calls
+
+    def documents(self):
+        return self
+
+    def get(self, documentId, **kwargs):
+        self.calls["docs.read"] += 1
+        self._doc = self.documents_by_id[documentId]
+        return self
+
+    def execute(self):
+        return self._doc
+
+
+def install_io_fakes(page_chars: int = 30000, transcript_chars: int = 6000, videos_per_channel: int = 5,
+                     scrapbook_chars: int = 4000, images_per_doc: int = 2, llm: FakeLLM = None) -> dict:
+    """
+    Like install_fakes(), but fakes only the network boundary, so the real
+    HTML parsing, crawling, transcript assembly, Docs JSON walking and image
+    handling run on synthetic fixtures. Pages link to articles under them
+    (article_links), so blog, docs and changelog crawls fetch real depth. Scrapbook docs are served for every seeded
+    vendor. Returns a dict of external-call counters.
+    """
+    import googleapiclient.discovery
+    import agent.nodes.synthesizer as synthesizer
+    import agent.nodes.diff_engine as diff_engine
+    import agent.nodes.report_writer as report_writer
+    from agent.tools import gdrive_tool, scraper_tool, youtube_tool
+    from db.database import get_all_competitors
+
+    # Fixtures are generated up front and shared round-robin, so producing them isn't timed
+    pages = [synthetic_html(page_chars, seed=i) for i in range(FIXTURE_VARIANTS)]
+    transcripts = [synthetic_text(transcript_chars, seed=i) for i in range(FIXTURE_VARIANTS)]
+    docs_pool = [synthetic_doc(scrapbook_chars, images_per_doc, seed=i) for i in range(FIXTURE_VARIANTS)]
+    image = synthetic_png()
+
+    calls = {k: 0 for k in ("http.get", "youtube.search", "youtube.transcript", "drive.list_scrapbook",
+                            "docs.read", "drive.image", "drive.upload")}
+    documents = {}
+    llm = llm or FakeLLM()
+
+    def get(url, headers):
+        calls["http.get"] += 1
+        text = with_links(pages[zlib.crc32(url.encode()) % FIXTURE_VARIANTS], article_links(url))
+        return {"status_code": 200, "reason": "OK", "headers": {}, "text": text, "bytes": len(text)}
+
+    def search_channel_videos(channel_handle, max_results=5):
+        calls["youtube.search"] += 1
+        return [{"video_id": f"{zlib.crc32(channel_handle.encode()):08x}{i:03d}", "title": f"Video {i}",
+                 "published_at": "2024-01-01T00:00:00Z"} for i in range(min(max_results, videos_per_channel))]
+
+    def get_transcript(video_id):
+        calls["youtube.transcript"] += 1
+        return transcripts[zlib.crc32(video_id.encode()) % FIXTURE_VARIANTS]
+
+    def list_docs_in_scrapbook_folder(folder_id=None):
+        calls["drive.list_scrapbook"] += 1
+        docs = []
+        for competitor in get_all_competitors():
+            doc_id = f"doc-{zlib.crc32(competitor['vendor_name'].encode()):08x}"
+            if doc_id not in documents:
+                documents[doc_id] = docs_pool[len(documents) % FIXTURE_VARIANTS]
+            docs.append({"doc_id": doc_id, "name": competitor["vendor_name"]})
+        return docs
+
+    def fetch_image(object_id, inline_objects):
+        calls["drive.image"] += 1
+        return image
+
+    def upload(markdown, filename=None):
+        calls["drive.upload"] += 1
+        return "https://drive.example/bench"
+
+    scraper_tool._get = get
+    youtube_tool.search_channel_videos = search_channel_videos
+    youtube_tool.get_transcript = get_transcript
+    gdrive_tool.list_docs_in_scrapbook_folder = list_docs_in_scrapbook_folder
+    gdrive_tool.get_google_creds = lambda: None
+    gdrive_tool._fetch_image_as_base64 = fetch_image
+    googleapiclient.discovery.build = lambda *a, **k: _FakeDocsService(documents, calls)
+    synthesizer.get_llm = lambda *a, **k: llm
+    diff_engine.get_llm = lambda *a, **k: llm
+    report_writer.upload_report_to_drive = upload
+
+    calls["llm"] = llm
+    return calls
+
+
+def seed_vendors(n: int, prefix: str = "Vendor") -> list[str]:
+    """Create n competitors with every source configured. Returns their names."""
+    from db.database import add_competitor
+    names = []
+    for i in range(n):
+        name = f"{prefix} {i:03d}"
+        add_competitor(
+            name,
+            website_url=f"https://vendor{i}.example/",
+            blog_url=f"https://vendor{i}.example/blog",
+            docs_url=f"https://docs.vendor{i}.example/",
+            changelog_url=f"https://vendor{i}.example/changelog",
+            youtube_channel=f"@vendor{i}",
+        )
+        names.append(name)
+    return names
@@ -0,0 +1,195 @@
+"""
+Pipeline throughput vs vendor count, plus hot-function microbenchmarks.
+
+    python -m benchmarks.pipeline [--vendors 1 10 50 200] [--llm-latency 0.5] [--output bench.json]
+    python -m benchmarks.pipeline --baseline bench.json [--tolerance 0.25]   # exit 1 on regression
+    python -m benchmarks.pipeline --micro-only
+
+Every vendor count runs `run_agent` in a fresh interpreter against synthetic
+fixtures (see install_io_fakes in benchmarks/fakes.py): generated HTML pages
+that link to articles, transcripts, Docs JSON with inline images and a fake
+LLM. Only the network is faked, so HTML parsing, crawling, Docs walking, prompt
+building, the DB and the graph are the real code. Per vendor count it reports:
+  - wall_s            run_agent wall time
+  - peak_rss_mb       peak resident memory of the process
+  - node_s            seconds per graph node (from the run's trace)
+  - calls             external calls by kind (HTTP, YouTube, Drive/Docs, LLM)
+
+Microbenchmarks report the median seconds per call of the parsing / rendering
+functions every vendor goes through.
+
+With --baseline, each metric is compared with the stored results and anything
+more than --tolerance slower (or larger) is reported as a regression.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+import timeit
+
+from benchmarks.fakes import configure_environment
+
+configure_environment()
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MICRO_REPEATS = 7
+MIN_REGRESSION_S = 0.05   # wall-time differences smaller than this are noise, whatever the ratio
+
+
+# ── End to end ─────────────────────────────────────────────────────────────────
+
+def measure(n_vendors: int, llm_latency: float, page_chars: int, images_per_doc: int) -> dict:
+    """One run_agent over n_vendors. Meant to run in a fresh interpreter (see _measure_in_child)."""
+    from benchmarks.fakes import FakeLLM, install_io_fakes, seed_vendors
+    from db.database import init_db
+    from agent.graph import run_agent
+    from agent.tracing import load_trace
+
+    init_db()
+    llm = FakeLLM(latency_s=llm_latency)
+    calls = install_io_fakes(page_chars=page_chars, images_per_doc=images_per_doc, llm=llm)
+    vendors = seed_vendors(n_vendors)
+
+    start = time.perf_counter()
+    state = run_agent(vendors, "benchmark query")
+    wall = time.perf_counter() - start
+
+    node_s = {}
+    for record in load_trace(state["run_id"]):
+        if record["name"] == "node":
+            seconds = (record["end_time_unix_nano"] - record["start_time_unix_nano"]) / 1e9
+            node = record["attributes"].get("node")
+            node_s[node] = round(node_s.get(node, 0.0) + seconds, 3)
+
+    calls = {k: v for k, v in calls.items() if k != "llm"}
+    calls["llm"] = llm.calls
+    return {
+        "vendors": n_vendors,
+        "wall_s": round(wall, 3),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),   # KiB on Linux
+        "node_s": node_s,
+        "calls": calls,
+    }
+
+
+def _measure_in_child(n_vendors: int, args) -> dict:
+    """Run measure() in a new interpreter, so peak RSS and caches belong to that run alone."""
+    out = subprocess.run(
+        [sys.executable, "-m", "benchmarks.pipeline", "--child", str(n_vendors),
+         "--llm-latency", str(args.llm_latency), "--page-chars", str(args.page_chars),
+         "--images-per-doc", str(args.images_per_doc)],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+# ── Microbenchmarks ────────────────────────────────────────────────────────────
+
+def _per_call(fn) -> float:
+    """Median seconds per call of fn over MICRO_REPEATS timing rounds."""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    return statistics.median(t / number for t in timer.repeat(repeat=MICRO_REPEATS, number=number))
+
+
+def micro(page_chars: int) -> dict:
+    from benchmarks.fakes import FakeLLM, synthetic_doc, synthetic_html
+    from agent.nodes.synthesizer import _extract_section
+    from agent.tools.gdrive_tool import _extract_text_from_body
+    from agent.tools.scraper_tool import extract_text
+    from mailer.emailer import _markdown_to_html
+
+    html = synthetic_html(page_chars, seed=1)
+    body = synthetic_doc(8000, n_tabs=1, seed=2)["tabs"][0]["documentTab"]["body"]["content"]
+    synthesis = FakeLLM(output_chars=8000).invoke([]).content
+    report = "\n\n".join(["# Report", *[f"**Vendor {i}**\n- point\n{synthesis}\n---" for i in range(10)]])
+
+    return {
+        "scrape_parse": round(_per_call(lambda: extract_text(html)), 7),
+        "extract_text_from_body": round(_per_call(lambda: _extract_text_from_body(body)), 7),
+        "extract_section": round(_per_call(lambda: _extract_section(synthesis, "Key Watch Points")), 7),
+        "markdown_to_html": round(_per_call(lambda: _markdown_to_html(report, "https://drive.example/x")), 7),
+    }
+
+
+# ── Baseline comparison ────────────────────────────────────────────────────────
+
+def _metrics(results: dict) -> dict:
+    """Flatten results into {metric name: value} for comparison."""
+    flat = {}
+    for run in results.get("pipeline", []):
+        flat[f"pipeline[{run['vendors']}].wall_s"] = run["wall_s"]
+        flat[f"pipeline[{run['vendors']}].peak_rss_mb"] = run["peak_rss_mb"]
+        for kind, count in run["calls"].items():
+            flat[f"pipeline[{run['vendors']}].calls.{kind}"] = count
+    for name, seconds in results.get("micro", {}).items():
+        flat[f"micro.{name}"] = seconds
+    return flat
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[dict]:
+    """Metrics present in both that got worse than baseline × (1 + tolerance)."""
+    current, previous = _metrics(results), _metrics(baseline)
+    regressions = []
+    for name, value in current.items():
+        before = previous.get(name)
+        if before is None or value <= before * (1 + tolerance):
+            continue
+        if name.endswith(".wall_s") and value - before < MIN_REGRESSION_S:
+            continue
+        regressions.append({"metric": name, "baseline": before, "current": value,
+                            "ratio": round(value / before, 2) if before else None})
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Pipeline throughput vs vendor count, plus microbenchmarks")
+    parser.add_argument("--vendors", type=int, nargs="+", default=[1, 10, 50, 200])
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="seconds per fake LLM call")
+    parser.add_argument("--page-chars", type=int, default=30000, help="text per synthetic HTML page")
+    parser.add_argument("--images-per-doc", type=int, default=2, help="inline images per scrapbook doc")
+    parser.add_argument("--micro-only", action="store_true", help="skip the end-to-end runs")
+    parser.add_argument("--output", help="also write the JSON results to this file")
+    parser.add_argument("--baseline", help="compare with results previously written by --output")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before a regression")
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child is not None:
+        print(json.dumps(measure(args.child, args.llm_latency, args.page_chars, args.images_per_doc)))
+        return 0
+
+    results = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "llm_latency": args.llm_latency,
+            "page_chars": args.page_chars,
+            "images_per_doc": args.images_per_doc,
+        },
+        "pipeline": [] if args.micro_only else [_measure_in_child(n, args) for n in args.vendors],
+        "micro": micro(args.page_chars),
+    }
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            results["regressions"] = compare(results, json.load(f), args.tolerance)
+        exit_code = 1 if results["regressions"] else 0
+
+    text = json.dumps(results, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""
+State-update overhead vs vendor count.
+
+    python -m benchmarks.state_overhead [--vendors 1 10 50 200] [--output state_overhead.json]
+
+Runs the real graph (fake scraping / LLM, see benchmarks/fakes.py) and, per
+vendor count, reports:
+  - wall_s, peak_mb           wall time and tracemalloc peak for the run
+  - event_bytes               pickled size of everything stream_agent yielded
+                              (node deltas — the current protocol)
+  - full_state_bytes          pickled size of the full state after every node,
+                              i.e. what the old protocol yielded / copied per node
+  - copy_ratio                full_state_bytes / event_bytes
+"""
+import argparse
+import json
+import pickle
+import time
+import tracemalloc
+
+from benchmarks.fakes import configure_environment, install_fakes, seed_vendors
+
+configure_environment()
+
+from db.database import init_db  # noqa: E402  (env must be configured first)
+from agent.graph import stream_agent  # noqa: E402
+from agent.state import merge_by_vendor  # noqa: E402
+
+REDUCERS = {
+    "raw_data": merge_by_vendor,
+    "syntheses": merge_by_vendor,
+    "diffs": merge_by_vendor,
+    "errors": lambda old, new: (old or []) + (new or []),
+}
+
+
+def _fold(state: dict, update: dict) -> dict:
+    state = dict(state)
+    for key, value in update.items():
+        reducer = REDUCERS.get(key)
+        state[key] = reducer(state.get(key), value) if reducer else value
+    return state
+
+
+def measure(n_vendors: int) -> dict:
+    vendors = seed_vendors(n_vendors, prefix=f"S{n_vendors}")
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    event_bytes = 0
+    full_state_bytes = 0
+    folded = {}
+    for node_name, update in stream_agent(vendors, "benchmark query"):
+        if node_name == "__end__":
+            break
+        event_bytes += len(pickle.dumps(update))
+        if node_name != "__start__":
+            folded = _fold(folded, update)
+            full_state_bytes += len(pickle.dumps(folded))
+    wall = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "vendors": n_vendors,
+        "wall_s": round(wall, 3),
+        "peak_mb": round(peak / 1e6, 2),
+        "event_bytes": event_bytes,
+        "full_state_bytes": full_state_bytes,
+        "copy_ratio": round(full_state_bytes / event_bytes, 2) if event_bytes else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="State-update overhead vs vendor count")
+    parser.add_argument("--vendors", type=int, nargs="+", default=[1, 10, 50, 200])
+    parser.add_argument("--output", help="also write the JSON results to this file")
+    args = parser.parse_args(argv)
+
+    init_db()
+    install_fakes()
+    results = [measure(n) for n in args.vendors]
+
+    text = json.dumps(results, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
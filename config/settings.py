@@ -1,3 +1,4 @@
+import json
 import os
 from dotenv import load_dotenv
 
@@ -6,13 +7,117 @@ load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_MODEL = "gpt-4o"
 
+# USD per million tokens: (input, cached input, output). Extend or override with e.g.
+# MODEL_PRICES='{"gpt-4o": [2.5, 1.25, 10.0]}'
+MODEL_PRICES = {
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+}
+MODEL_PRICES.update({model: tuple(prices) for model, prices in json.loads(os.getenv("MODEL_PRICES", "{}")).items()})
+
 GOOGLE_DRIVE_FOLDER_ID = os.getenv("GOOGLE_DRIVE_FOLDER_ID")       # folder for output reports
 GOOGLE_DOC_SCRAPBOOK_ID = os.getenv("GOOGLE_DOC_SCRAPBOOK_ID")     # folder containing per-competitor docs
 
 GMAIL_SENDER = os.getenv("GMAIL_SENDER")
 GMAIL_APP_PASSWORD = os.getenv("GMAIL_APP_PASSWORD")
 
-DB_PATH = "db/competitor_intel.db"
+DB_PATH = os.getenv("DB_PATH", "db/competitor_intel.db")
+CHECKPOINT_DB_PATH = os.getenv("CHECKPOINT_DB_PATH", "db/checkpoints.db")   # LangGraph run checkpoints
+
+# Retention (python -m db.retention): keep every run for RETENTION_KEEP_ALL_DAYS,
+# then the newest run per query per week, then per month, then drop.
+RETENTION_KEEP_ALL_DAYS = int(os.getenv("RETENTION_KEEP_ALL_DAYS", "30"))
+RETENTION_KEEP_WEEKLY_DAYS = int(os.getenv("RETENTION_KEEP_WEEKLY_DAYS", "180"))
+RETENTION_KEEP_MONTHLY_DAYS = int(os.getenv("RETENTION_KEEP_MONTHLY_DAYS", "730"))   # 0 = keep monthly forever
+RETENTION_LOCAL_ONLY_DAYS = int(os.getenv("RETENTION_LOCAL_ONLY_DAYS", "7"))        # live-only runs
+
+# Scheduler (python -m agent.scheduler): competitors with a refresh cadence are
+# re-evaluated when due, batched into jobs of up to SCHEDULER_BATCH_SIZE vendors.
+SCHEDULER_POLL_SECONDS = int(os.getenv("SCHEDULER_POLL_SECONDS", "60"))
+SCHEDULER_MAX_CONCURRENT = int(os.getenv("SCHEDULER_MAX_CONCURRENT", "2"))       # global cap across all workers
+SCHEDULER_BATCH_SIZE = int(os.getenv("SCHEDULER_BATCH_SIZE", "10"))
+SCHEDULER_QUERY = os.getenv("SCHEDULER_QUERY", "General competitive overview")
+SCHEDULER_PUBLISH = os.getenv("SCHEDULER_PUBLISH", "false").lower() == "true"   # upload scheduled reports to Drive
+SCHEDULER_MAX_ATTEMPTS = int(os.getenv("SCHEDULER_MAX_ATTEMPTS", "3"))
+SCHEDULER_RETRY_SECONDS = int(os.getenv("SCHEDULER_RETRY_SECONDS", "900"))      # doubled per attempt
+# Unchanged websites skip the run, but YouTube / scrapbook can't be probed cheaply,
+# so a vendor is refreshed regardless once its last refresh is this old
+SCHEDULER_MAX_SKIP_DAYS = int(os.getenv("SCHEDULER_MAX_SKIP_DAYS", "14"))
+
+# Workers (python -m agent.worker) lease jobs from the queue and renew the lease
+# while running; a job whose lease lapses (worker crashed) is picked up by another.
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", "1"))       # jobs per worker process
+WORKER_LEASE_SECONDS = int(os.getenv("WORKER_LEASE_SECONDS", "300"))
+WORKER_POLL_SECONDS = int(os.getenv("WORKER_POLL_SECONDS", "5"))
+UI_WORKER_THREADS = int(os.getenv("UI_WORKER_THREADS", "2"))   # hosted by the Streamlit server; 0 = external workers only
+# LLM tokens streamed during a run are written for the Evaluate page at most this often
+PREVIEW_FLUSH_SECONDS = float(os.getenv("PREVIEW_FLUSH_SECONDS", "0.5"))
+
+# Tracing: each run's spans (nodes, vendors, fetches, LLM calls) go to TRACE_DIR/<run_id>.jsonl
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").lower() == "true"
+TRACE_DIR = os.getenv("TRACE_DIR", "traces")
+
+# Prometheus metrics: serve /metrics on METRICS_PORT (0 = off) and/or rewrite
+# METRICS_TEXTFILE (for node_exporter's textfile collector) every METRICS_TEXTFILE_SECONDS
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+METRICS_TEXTFILE = os.getenv("METRICS_TEXTFILE", "")
+METRICS_TEXTFILE_SECONDS = int(os.getenv("METRICS_TEXTFILE_SECONDS", "15"))
+
+# Profiling (agent/profiling.py): PROFILING_ENABLED profiles every run, otherwise only
+# runs started with "Profile this run". Each node gets a cProfile + tracemalloc session;
+# stats go to PROFILE_DIR/<run_id>/ and the top PROFILE_TOP_N hotspots to run_profiles.
+# PROFILE_TOOLS also lists time per tool function (scraping, YouTube, Drive, email)
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_TOP_N = int(os.getenv("PROFILE_TOP_N", "15"))
+PROFILE_TOOLS = os.getenv("PROFILE_TOOLS", "false").lower() == "true"
+
+# Scraping politeness (agent/tools/politeness.py): SCRAPE_CONCURRENCY vendors are scraped
+# at once, but each host gets at most SCRAPE_HOST_CONCURRENCY requests in flight, started
+# SCRAPE_HOST_MIN_INTERVAL seconds apart (or its robots.txt Crawl-delay, up to
+# SCRAPE_MAX_CRAWL_DELAY). 429 / 5xx responses are retried SCRAPE_MAX_RETRIES times with
+# exponential backoff from SCRAPE_BACKOFF_SECONDS, honoring Retry-After up to
+# SCRAPE_MAX_RETRY_AFTER. After SCRAPE_BREAKER_FAILURES failed fetches in a row a host
+# is skipped (its last good pages are reused) for SCRAPE_BREAKER_COOLDOWN_SECONDS
+SCRAPE_CONCURRENCY = int(os.getenv("SCRAPE_CONCURRENCY", "4"))
+SCRAPE_HOST_CONCURRENCY = int(os.getenv("SCRAPE_HOST_CONCURRENCY", "2"))
+SCRAPE_HOST_MIN_INTERVAL = float(os.getenv("SCRAPE_HOST_MIN_INTERVAL", "1.0"))
+SCRAPE_MAX_CRAWL_DELAY = float(os.getenv("SCRAPE_MAX_CRAWL_DELAY", "10"))
+SCRAPE_RESPECT_ROBOTS = os.getenv("SCRAPE_RESPECT_ROBOTS", "true").lower() == "true"
+ROBOTS_TTL_HOURS = int(os.getenv("ROBOTS_TTL_HOURS", "24"))
+SCRAPE_MAX_RETRIES = int(os.getenv("SCRAPE_MAX_RETRIES", "2"))
+SCRAPE_BACKOFF_SECONDS = float(os.getenv("SCRAPE_BACKOFF_SECONDS", "1.0"))
+SCRAPE_MAX_RETRY_AFTER = float(os.getenv("SCRAPE_MAX_RETRY_AFTER", "60"))
+SCRAPE_BREAKER_FAILURES = int(os.getenv("SCRAPE_BREAKER_FAILURES", "3"))
+SCRAPE_BREAKER_COOLDOWN_SECONDS = int(os.getenv("SCRAPE_BREAKER_COOLDOWN_SECONDS", "3600"))
+
+# Crawler (agent/tools/crawler.py): blog, docs and changelog URLs are followed past their
+# landing page — same-origin links under the configured path, up to (depth, pages) per
+# source kind in CRAWL_LIMITS, e.g. CRAWL_LIMITS='{"docs": [3, 20], "blog": [0, 0]}'
+# ([0, 0] = landing page only), CRAWL_CONCURRENCY fetches at once. A page seen by an
+# earlier run is re-checked (conditional GET) once CRAWL_REVISIT_DAYS old; only new or
+# changed pages are passed on to synthesis
+CRAWL_LIMITS = {"blog": (1, 5), "docs": (2, 10), "changelog": (1, 5)}
+CRAWL_LIMITS.update({kind: tuple(limits) for kind, limits in json.loads(os.getenv("CRAWL_LIMITS", "{}")).items()})
+CRAWL_CONCURRENCY = int(os.getenv("CRAWL_CONCURRENCY", "4"))
+CRAWL_REVISIT_DAYS = int(os.getenv("CRAWL_REVISIT_DAYS", "7"))
+
+# Deadlines and cancellation (agent/deadline.py): a run gets RUN_DEADLINE_SECONDS
+# (0 = none) unless started with its own. Below DEADLINE_DEGRADE_FRACTION of the budget
+# left, YouTube is skipped, images go at "low" detail and source excerpts shrink to
+# DEADLINE_PROMPT_SCALE; past it, no new vendor work starts and the report is partial.
+# A Stop request is noticed within CANCEL_POLL_SECONDS
+RUN_DEADLINE_SECONDS = int(os.getenv("RUN_DEADLINE_SECONDS", "0"))
+DEADLINE_DEGRADE_FRACTION = float(os.getenv("DEADLINE_DEGRADE_FRACTION", "0.3"))
+DEADLINE_PROMPT_SCALE = float(os.getenv("DEADLINE_PROMPT_SCALE", "0.5"))
+CANCEL_POLL_SECONDS = float(os.getenv("CANCEL_POLL_SECONDS", "1.0"))
+
+# Record / replay of external I/O (agent/cassette.py): "record" appends every outbound
+# call to CASSETTE_PATH, "replay" serves them from it offline. CASSETTE_LATENCY is
+# "none", "recorded", a multiplier of the recorded time, or JSON seconds per call kind
+CASSETTE_MODE = os.getenv("CASSETTE_MODE", "off")
+CASSETTE_PATH = os.getenv("CASSETTE_PATH", "cassettes/default.jsonl")
+CASSETTE_LATENCY = os.getenv("CASSETTE_LATENCY", "none")
 
 # Google OAuth scopes needed
 GOOGLE_SCOPES = [
@@ -0,0 +1,88 @@
+import zlib
+from collections import Counter
+
+# Compressed values are stored as BLOBs in the same columns that used to hold
+# plain TEXT. Legacy rows stay as str, so readers can tell the two apart by type.
+#
+# Blob layout:  MAGIC (2 bytes) | dict_id (4 bytes, big-endian, 0 = no dict) | zlib stream
+MAGIC = b"\xc1\x01"
+HEADER_LEN = 6
+
+COMPRESSION_LEVEL = 9
+MIN_COMPRESS_CHARS = 256       # tiny values aren't worth the header overhead
+DICT_MAX_BYTES = 32 * 1024     # zlib only uses the last 32 KB of a dictionary
+
+
+def compress_text(text: str | None, zdict: bytes | None = None, dict_id: int = 0) -> bytes | str | None:
+    """
+    Compress a text value for storage.
+    Returns the input unchanged if it is empty or too short to benefit.
+    """
+    if text is None or isinstance(text, bytes):
+        return text
+    if len(text) < MIN_COMPRESS_CHARS:
+        return text
+
+    if zdict:
+        compressor = zlib.compressobj(COMPRESSION_LEVEL, zdict=zdict)
+    else:
+        compressor = zlib.compressobj(COMPRESSION_LEVEL)
+        dict_id = 0
+    payload = compressor.compress(text.encode("utf-8")) + compressor.flush()
+    return MAGIC + dict_id.to_bytes(4, "big") + payload
+
+
+def is_compressed(value) -> bool:
+    return isinstance(value, (bytes, memoryview)) and bytes(value[:2]) == MAGIC
+
+
+def blob_dict_id(value) -> int:
+    """Return the dictionary id a compressed blob was written with (0 = none)."""
+    return int.from_bytes(bytes(value[2:HEADER_LEN]), "big")
+
+
+def decompress_text(value, zdict: bytes | None = None) -> str | None:
+    """Inverse of compress_text. Plain str values (legacy rows) pass through."""
+    if value is None or isinstance(value, str):
+        return value
+    value = bytes(value)
+    if not value.startswith(MAGIC):
+        return value.decode("utf-8")
+
+    if blob_dict_id(value):
+        decompressor = zlib.decompressobj(zdict=zdict)
+    else:
+        decompressor = zlib.decompressobj()
+    return (decompressor.decompress(value[HEADER_LEN:]) + decompressor.flush()).decode("utf-8")
+
+
+def train_dictionary(samples: list[str], max_bytes: int = DICT_MAX_BYTES) -> bytes:
+    """
+    Build a zlib preset dictionary from past reports / snapshots.
+
+    Reports share a lot of boilerplate — section headings, prompt-driven
+    phrasing, diff markers — so we keep the lines that recur across samples.
+    zlib favours matches near the end of the dictionary, so the most frequent
+    lines are placed last.
+    """
+    counts = Counter()
+    for sample in samples:
+        if not sample:
+            continue
+        # Count each line once per sample so one long report can't dominate
+        counts.update({line.strip() for line in sample.splitlines() if len(line.strip()) > 3})
+
+    recurring = [(line, n) for line, n in counts.items() if n > 1]
+    recurring.sort(key=lambda item: (item[1], len(item[0])), reverse=True)
+
+    chosen = []
+    size = 0
+    for line, _ in recurring:
+        encoded = (line + "\n").encode("utf-8")
+        if size + len(encoded) > max_bytes:
+            continue
+        chosen.append(encoded)
+        size += len(encoded)
+
+    chosen.reverse()  # most frequent last
+    return b"".join(chosen)
@@ -1,12 +1,27 @@
 import sqlite3
 import json
+import hashlib
 from datetime import datetime
 from config.settings import DB_PATH
+from db.compression import compress_text, decompress_text, is_compressed, blob_dict_id, train_dictionary
+
+# Bump when a one-time data migration is added below (tracked via PRAGMA user_version)
+SCHEMA_VERSION = 3
+
+DICT_TRAIN_MIN_SAMPLES = 5     # reports needed before a shared dictionary is worth training
+DICT_TRAIN_SAMPLE_LIMIT = 200  # most recent reports/snapshots used for training
+DICT_RETRAIN_AFTER_REPORTS = 20  # new reports before training is tried again (after a failure or by retention)
+
+_dict_cache: dict[int, bytes] = {}
+_dict_failed_at: dict[str, int] = {}   # DB_PATH -> report count when training last produced no dictionary
 
 
 def get_connection():
-    conn = sqlite3.connect(DB_PATH)
+    # Several worker processes may share the file; wait out short write locks instead of failing
+    conn = sqlite3.connect(DB_PATH, timeout=30)
     conn.row_factory = sqlite3.Row
+    # Used by the FTS source views so snippets and rebuilds can read compressed columns
+    conn.create_function("ci_decompress", 1, lambda value: _decode(conn, value), deterministic=True)
     return conn
 
 
@@ -48,30 +63,437 @@ def init_db():
             delta_summary TEXT,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         );
+
+        CREATE INDEX IF NOT EXISTS idx_reports_created ON reports(created_at DESC, id DESC);
+
+        CREATE INDEX IF NOT EXISTS idx_diff_log_vendor ON diff_log(vendor_name, created_at);
+
+        -- Shared zlib dictionaries trained on past reports (see db/compression.py)
+        CREATE TABLE IF NOT EXISTS compression_dicts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            zdict BLOB NOT NULL,
+            sample_count INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+
+        -- ── Raw source store ─────────────────────────────────────────────────
+        -- Content-addressed: each distinct scraped page / transcript / scrapbook
+        -- text is stored once (sha256 → compressed content), and every run keeps
+        -- a manifest row per vendor/source/URL pointing at it.
+        CREATE TABLE IF NOT EXISTS raw_blobs (
+            hash TEXT PRIMARY KEY,
+            size INTEGER,
+            content BLOB,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+
+        CREATE TABLE IF NOT EXISTS run_sources (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            run_id TEXT NOT NULL,
+            vendor_name TEXT,
+            source TEXT,
+            url TEXT,
+            hash TEXT REFERENCES raw_blobs(hash),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_run_sources_run ON run_sources(run_id);
+        CREATE INDEX IF NOT EXISTS idx_run_sources_hash ON run_sources(hash);
+        CREATE INDEX IF NOT EXISTS idx_run_sources_url ON run_sources(url);
+
+        -- ── Runs ─────────────────────────────────────────────────────────────
+        -- One row per evaluation. status: running | completed | failed | interrupted
+        CREATE TABLE IF NOT EXISTS runs (
+            run_id TEXT PRIMARY KEY,
+            research_query TEXT,
+            vendors TEXT,
+            save_to_drive INTEGER DEFAULT 0,
+            replay_run_id TEXT,
+            status TEXT NOT NULL DEFAULT 'running',
+            error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_runs_status ON runs(status, updated_at);
+
+        -- Progress log: one row per completed node, polled by the Evaluate page
+        CREATE TABLE IF NOT EXISTS run_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            run_id TEXT NOT NULL,
+            node TEXT,
+            data TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_run_events_run ON run_events(run_id, id);
+
+        -- Text streamed so far by each in-flight LLM call, flushed every PREVIEW_FLUSH_SECONDS
+        CREATE TABLE IF NOT EXISTS run_previews (
+            run_id TEXT NOT NULL,
+            node TEXT NOT NULL,
+            vendor_name TEXT NOT NULL,
+            text TEXT,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (run_id, node, vendor_name)
+        );
+
+        -- Per-vendor node results, so a resumed run skips vendors already done
+        CREATE TABLE IF NOT EXISTS run_vendor_results (
+            run_id TEXT NOT NULL,
+            node TEXT NOT NULL,
+            vendor_name TEXT NOT NULL,
+            payload BLOB,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (run_id, node, vendor_name)
+        );
+
+        -- One row per LLM call: tokens and cost, for spend per vendor / node / run
+        CREATE TABLE IF NOT EXISTS run_usage (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            run_id TEXT NOT NULL,
+            node TEXT,
+            vendor_name TEXT,
+            model TEXT,
+            input_tokens INTEGER,
+            output_tokens INTEGER,
+            cached_tokens INTEGER,
+            image_tokens INTEGER,
+            cost_usd REAL,
+            sources TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_run_usage_run ON run_usage(run_id);
+        CREATE INDEX IF NOT EXISTS idx_run_usage_vendor ON run_usage(vendor_name, created_at);
+
+        -- Hotspots of profiled runs, one row per node execution (agent/profiling.py)
+        CREATE TABLE IF NOT EXISTS run_profiles (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            run_id TEXT NOT NULL,
+            node TEXT,
+            summary TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_run_profiles_run ON run_profiles(run_id, id);
+
+        -- Rendered report sections per vendor, keyed by a hash of the synthesis + diff they render
+        CREATE TABLE IF NOT EXISTS report_fragments (
+            hash TEXT PRIMARY KEY,
+            vendor_name TEXT,
+            whats_new BLOB,
+            intelligence BLOB,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+
+        -- ── Scheduler ────────────────────────────────────────────────────────
+        -- Job queue for scheduled refreshes (agent/scheduler.py), run by
+        -- workers holding a renewable lease (agent/worker.py).
+        -- status: queued | running | completed | failed | cancelled (stopped before it started)
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            research_query TEXT,
+            vendors TEXT,
+            save_to_drive INTEGER DEFAULT 0,
+            status TEXT NOT NULL DEFAULT 'queued',
+            run_id TEXT,
+            attempts INTEGER DEFAULT 0,
+            not_before TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            started_at TIMESTAMP,
+            finished_at TIMESTAMP
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, not_before);
+
+        -- HTTP validators from the last change probe of each source URL
+        CREATE TABLE IF NOT EXISTS source_validators (
+            url TEXT PRIMARY KEY,
+            etag TEXT,
+            last_modified TEXT,
+            content_hash TEXT,
+            checked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+
+        -- Visited set of the crawler (agent/tools/crawler.py), by canonical URL: validators,
+        -- content hash and links (JSON) from the last check that made it into a report, so
+        -- later runs skip or conditionally re-check pages and still follow their links
+        CREATE TABLE IF NOT EXISTS crawl_pages (
+            url TEXT PRIMARY KEY,
+            root_url TEXT,
+            content_hash TEXT,
+            etag TEXT,
+            last_modified TEXT,
+            links TEXT,
+            first_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            checked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+
+        -- Crawl checks of a run not yet in crawl_pages: report_writer confirms them once
+        -- the run's report is saved (fresh = new or changed vs crawl_pages)
+        CREATE TABLE IF NOT EXISTS crawl_visits (
+            run_id TEXT NOT NULL,
+            url TEXT NOT NULL,
+            root_url TEXT,
+            content_hash TEXT,
+            etag TEXT,
+            last_modified TEXT,
+            links TEXT,
+            fresh INTEGER,
+            checked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (run_id, url)
+        );
+
+        -- ── Scraping politeness (agent/tools/politeness.py) ──────────────────
+        -- robots.txt per host (NULL body = none / unreachable: everything allowed)
+        CREATE TABLE IF NOT EXISTS robots_cache (
+            host TEXT PRIMARY KEY,
+            body TEXT,
+            fetched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+
+        -- Circuit breaker per host: consecutive failed fetches; skipped until open_until
+        CREATE TABLE IF NOT EXISTS host_health (
+            host TEXT PRIMARY KEY,
+            failures INTEGER DEFAULT 0,
+            open_until TIMESTAMP,
+            last_error TEXT,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+
+        -- ── Full-text search ────────────────────────────────────────────────
+        -- External-content FTS5 tables: only the index is stored; snippets read
+        -- the (decompressed) text back through these views on demand. Rows are
+        -- indexed from Python (_index_report / _index_snapshot), not by triggers,
+        -- so plain sqlite3 clients can still write the tables without ci_decompress.
+        CREATE VIEW IF NOT EXISTS reports_fts_source AS
+            SELECT id, research_query, ci_decompress(report_markdown) AS report_markdown
+            FROM reports;
+
+        CREATE VIRTUAL TABLE IF NOT EXISTS reports_fts USING fts5(
+            research_query, report_markdown,
+            content='reports_fts_source', content_rowid='id',
+            tokenize='porter unicode61'
+        );
+
+        CREATE VIEW IF NOT EXISTS diff_log_fts_source AS
+            SELECT id, vendor_name, ci_decompress(new_snapshot) AS new_snapshot, delta_summary
+            FROM diff_log;
+
+        CREATE VIRTUAL TABLE IF NOT EXISTS diff_log_fts USING fts5(
+            vendor_name, new_snapshot, delta_summary,
+            content='diff_log_fts_source', content_rowid='id',
+            tokenize='porter unicode61'
+        );
     """)
 
+    # Indexing used to be done by triggers calling ci_decompress, which broke writes
+    # from any connection without it (sqlite3 CLI, DB browsers)
+    for trigger in ("reports_fts_insert", "reports_fts_delete", "reports_fts_update",
+                    "diff_log_fts_insert", "diff_log_fts_delete", "diff_log_fts_update"):
+        conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+
     conn.commit()
 
     # ── Migration: safely add new columns to existing databases ───────────────
-    for col in [("docs_url", "TEXT"), ("changelog_url", "TEXT")]:
+    for table, col in [
+        ("competitors", ("docs_url", "TEXT")),
+        ("competitors", ("changelog_url", "TEXT")),
+        ("reports", ("run_id", "TEXT")),
+        ("competitors", ("refresh_interval_hours", "INTEGER")),   # NULL = not scheduled
+        ("competitors", ("next_refresh_at", "TIMESTAMP")),
+        ("competitors", ("last_refreshed_at", "TIMESTAMP")),
+        ("jobs", ("lease_owner", "TEXT")),             # worker holding the job (agent/worker.py)
+        ("jobs", ("lease_expires_at", "TIMESTAMP")),   # reclaimable by another worker after this
+        ("runs", ("batch_id", "TEXT")),                # runs of one multi-query batch share ingestion
+        ("runs", ("result", "BLOB")),                  # final state (minus raw data), for reconnecting clients
+        ("jobs", ("priority", "INTEGER DEFAULT 0")),   # higher first — interactive runs jump scheduled ones
+        ("jobs", ("profile", "INTEGER DEFAULT 0")),    # profile the run's nodes (agent/profiling.py)
+        ("jobs", ("deadline_seconds", "INTEGER")),     # run deadline (agent/deadline.py); NULL = default
+        ("runs", ("cancel_requested", "INTEGER DEFAULT 0")),   # Stop pressed; polled by the running run
+        ("crawl_pages", ("links", "TEXT")),            # NULL on rows checked before links were kept
+        ("run_sources", ("placeholder", "INTEGER DEFAULT 0")),   # an error/skip notice or cached copy, not a fetch
+    ]:
         try:
-            conn.execute(f"ALTER TABLE competitors ADD COLUMN {col[0]} {col[1]}")
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {col[0]} {col[1]}")
             conn.commit()
         except Exception:
             pass  # column already exists — safe to ignore
 
+    # ── One-time data migrations ──────────────────────────────────────────────
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version < 2:
+        # v2: index rows written before the FTS tables existed. The v1 rewrite
+        # below only changes the encoding, so the index stays valid through it.
+        conn.execute("INSERT INTO reports_fts(reports_fts) VALUES ('rebuild')")
+        conn.execute("INSERT INTO diff_log_fts(diff_log_fts) VALUES ('rebuild')")
+        conn.commit()
+    if version < 1:
+        _migrate_compress_storage(conn)
+    if version < 3:
+        _migrate_flag_placeholders(conn)
+    if version < SCHEMA_VERSION:
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.commit()
+
     conn.close()
 
 
+def _migrate_compress_storage(conn):
+    """
+    v1: compress existing report bodies and snapshots in place.
+    Also drops the old duplicate of delta_summary that used to be written
+    into previous_snapshot.
+    """
+    conn.execute(
+        "UPDATE diff_log SET previous_snapshot = NULL WHERE previous_snapshot = delta_summary"
+    )
+    dict_id, zdict = _get_active_dict(conn) or _train_dict(conn) or (0, None)
+
+    rows = conn.execute("SELECT id, report_markdown FROM reports").fetchall()
+    for row in rows:
+        if isinstance(row["report_markdown"], str):
+            conn.execute(
+                "UPDATE reports SET report_markdown=? WHERE id=?",
+                (compress_text(row["report_markdown"], zdict, dict_id), row["id"]),
+            )
+
+    rows = conn.execute("SELECT id, previous_snapshot, new_snapshot FROM diff_log").fetchall()
+    for row in rows:
+        conn.execute(
+            "UPDATE diff_log SET previous_snapshot=?, new_snapshot=? WHERE id=?",
+            (
+                compress_text(row["previous_snapshot"], zdict, dict_id),
+                compress_text(row["new_snapshot"], zdict, dict_id),
+                row["id"],
+            ),
+        )
+    conn.commit()
+
+    if rows:
+        conn.execute("VACUUM")  # hand the freed pages back to the filesystem
+
+
+# What scrape_page() stored in place of a page before run_sources.placeholder existed
+_LEGACY_PLACEHOLDERS = ("[Skipped ", "[Cached copy of ", "[Blocked by robots.txt: ", "[Scrape error for ")
+
+
+def _migrate_flag_placeholders(conn):
+    """v3: flag the scraper's stand-in texts stored before run_sources.placeholder existed."""
+    rows = conn.execute(
+        """SELECT DISTINCT b.hash, b.content FROM run_sources s JOIN raw_blobs b ON b.hash = s.hash
+           WHERE s.source IN ('website', 'blog', 'docs', 'changelog')"""
+    ).fetchall()
+    stale = [r["hash"] for r in rows if (decompress_text(r["content"]) or "").startswith(_LEGACY_PLACEHOLDERS)]
+    conn.executemany("UPDATE run_sources SET placeholder=1 WHERE hash=?", [(h,) for h in stale])
+    conn.commit()
+
+
+# ── Compression helpers ────────────────────────────────────────────────────────
+
+def _get_active_dict(conn):
+    """Return (dict_id, zdict) for the newest trained dictionary, or None."""
+    row = conn.execute(
+        "SELECT id, zdict FROM compression_dicts ORDER BY id DESC LIMIT 1"
+    ).fetchone()
+    if not row:
+        return None
+    _dict_cache[row["id"]] = row["zdict"]
+    return row["id"], row["zdict"]
+
+
+def _train_dict(conn):
+    """
+    Train a new dictionary from recent reports + snapshots. Returns (dict_id, zdict) or None.
+    When the samples yield no dictionary, training isn't tried again in this process
+    until DICT_RETRAIN_AFTER_REPORTS more reports exist.
+    """
+    report_count = conn.execute("SELECT COUNT(*) FROM reports").fetchone()[0]
+    if report_count < DICT_TRAIN_MIN_SAMPLES:
+        return None
+    failed_at = _dict_failed_at.get(DB_PATH)
+    if failed_at is not None and report_count < failed_at + DICT_RETRAIN_AFTER_REPORTS:
+        return None
+
+    reports = conn.execute(
+        "SELECT report_markdown FROM reports ORDER BY id DESC LIMIT ?", (DICT_TRAIN_SAMPLE_LIMIT,)
+    ).fetchall()
+    snapshots = conn.execute(
+        "SELECT new_snapshot FROM diff_log ORDER BY id DESC LIMIT ?", (DICT_TRAIN_SAMPLE_LIMIT,)
+    ).fetchall()
+
+    samples = [_decode(conn, r[0]) for r in reports + snapshots]
+    zdict = train_dictionary(samples)
+    if not zdict:
+        _dict_failed_at[DB_PATH] = report_count
+        return None
+    _dict_failed_at.pop(DB_PATH, None)
+
+    cursor = conn.execute(
+        "INSERT INTO compression_dicts (zdict, sample_count) VALUES (?, ?)",
+        (zdict, len(samples)),
+    )
+    conn.commit()
+    _dict_cache[cursor.lastrowid] = zdict
+    return cursor.lastrowid, zdict
+
+
+def _encode(conn, text):
+    """Compress text with the active shared dictionary (training one if enough history exists)."""
+    active = _get_active_dict(conn) or _train_dict(conn)
+    if active:
+        return compress_text(text, active[1], active[0])
+    return compress_text(text)
+
+
+def _decode(conn, value):
+    """Decompress a stored value, resolving its dictionary by id. Plain text passes through."""
+    if not is_compressed(value):
+        return decompress_text(value)
+    dict_id = blob_dict_id(value)
+    zdict = None
+    if dict_id:
+        zdict = _dict_cache.get(dict_id)
+        if zdict is None:
+            row = conn.execute("SELECT zdict FROM compression_dicts WHERE id=?", (dict_id,)).fetchone()
+            zdict = _dict_cache[dict_id] = row["zdict"]
+    return decompress_text(value, zdict)
+
+
+def retrain_compression_dictionary(min_new_reports=DICT_RETRAIN_AFTER_REPORTS):
+    """
+    Train a fresh shared dictionary from recent history once at least min_new_reports
+    reports were saved after the active one (0 = always). New writes use the newest
+    dictionary; older blobs keep decoding with theirs. Returns the new dict id or None.
+    """
+    conn = get_connection()
+    new_reports = conn.execute(
+        """SELECT COUNT(*) FROM reports
+           WHERE created_at > COALESCE((SELECT MAX(created_at) FROM compression_dicts), '')"""
+    ).fetchone()[0]
+    result = None
+    if new_reports >= min_new_reports:
+        _dict_failed_at.pop(DB_PATH, None)
+        result = _train_dict(conn)
+    conn.close()
+    return result[0] if result else None
+
+
 # ── Competitor CRUD ────────────────────────────────────────────────────────────
 
-def add_competitor(vendor_name, website_url="", blog_url="", docs_url="", changelog_url="", youtube_channel=""):
+def add_competitor(vendor_name, website_url="", blog_url="", docs_url="", changelog_url="", youtube_channel="",
+                   refresh_interval_hours=None):
     conn = get_connection()
     try:
         conn.execute(
-            """INSERT INTO competitors (vendor_name, website_url, blog_url, docs_url, changelog_url, youtube_channel)
-               VALUES (?, ?, ?, ?, ?, ?)""",
-            (vendor_name, website_url, blog_url, docs_url, changelog_url, youtube_channel),
+            """INSERT INTO competitors (vendor_name, website_url, blog_url, docs_url, changelog_url, youtube_channel,
+                                        refresh_interval_hours)
+               VALUES (?, ?, ?, ?, ?, ?, ?)""",
+            (vendor_name, website_url, blog_url, docs_url, changelog_url, youtube_channel,
+             refresh_interval_hours or None),
         )
         conn.commit()
         return True
@@ -117,55 +539,1014 @@ def get_competitor_by_name(vendor_name):
 
 # ── Reports ────────────────────────────────────────────────────────────────────
 
-def save_report(research_query, vendors_covered, report_markdown, gdrive_link=""):
+def save_report(research_query, vendors_covered, report_markdown, gdrive_link="", run_id=None):
     conn = get_connection()
     run_date = datetime.now().strftime("%Y-%m-%d %H:%M")
     cursor = conn.execute(
-        """INSERT INTO reports (run_date, research_query, vendors_covered, report_markdown, gdrive_link)
-           VALUES (?, ?, ?, ?, ?)""",
-        (run_date, research_query, json.dumps(vendors_covered), report_markdown, gdrive_link),
+        """INSERT INTO reports (run_date, research_query, vendors_covered, report_markdown, gdrive_link, run_id)
+           VALUES (?, ?, ?, ?, ?, ?)""",
+        (run_date, research_query, json.dumps(vendors_covered), _encode(conn, report_markdown), gdrive_link, run_id),
     )
     report_id = cursor.lastrowid
+    _index_report(conn, report_id, research_query, report_markdown)
     conn.commit()
     conn.close()
     return report_id
 
 
-def get_all_reports():
+def _published_only(table="reports"):
+    """SQL condition leaving out reports saved without the Drive/archive option (placeholder link)."""
+    return f"({table}.gdrive_link IS NULL OR {table}.gdrive_link != '__local_only__')"
+
+
+def get_report_history(page_size=25, after=None, include_local_only=True):
+    """
+    One page of report metadata, newest first, using keyset pagination.
+
+    after: (created_at, id) of the last row on the previous page, or None for the first page.
+    include_local_only=False leaves out reports saved without publishing (the
+    "__local_only__" Drive link), as count_reports() does with the same flag.
+    Returns (rows, next_cursor) — next_cursor is None when there are no older reports.
+    Report bodies are never read here; fetch them with get_report_by_id.
+    """
+    where = [] if include_local_only else [_published_only()]
+    params = []
+    if after:
+        where.append("(created_at < ? OR (created_at = ? AND id < ?))")
+        params += [after[0], after[0], after[1]]
+    where_sql = f"WHERE {' AND '.join(where)}" if where else ""
+
     conn = get_connection()
-    rows = conn.execute("SELECT * FROM reports ORDER BY created_at DESC").fetchall()
+    rows = conn.execute(
+        f"""SELECT id, run_date, research_query, vendors_covered, gdrive_link, created_at
+            FROM reports {where_sql}
+            ORDER BY created_at DESC, id DESC
+            LIMIT ?""",
+        params + [page_size + 1],
+    ).fetchall()
     conn.close()
-    return [dict(r) for r in rows]
+
+    rows = [dict(r) for r in rows]
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = (rows[-1]["created_at"], rows[-1]["id"])
+    return rows, next_cursor
+
+
+def count_reports(include_local_only=True):
+    where_sql = "" if include_local_only else f"WHERE {_published_only()}"
+    conn = get_connection()
+    total = conn.execute(f"SELECT COUNT(*) FROM reports {where_sql}").fetchone()[0]
+    conn.close()
+    return total
 
 
 def get_report_by_id(report_id):
     conn = get_connection()
     row = conn.execute("SELECT * FROM reports WHERE id=?", (report_id,)).fetchone()
+    report = dict(row) if row else None
+    if report:
+        report["report_markdown"] = _decode(conn, report["report_markdown"])
+    conn.close()
+    return report
+
+
+def get_last_report_for_vendor(vendor_name, exclude_batch_id=None):
+    """
+    Returns the most recent synthesis snapshot for a vendor from diff_log.
+    exclude_batch_id skips snapshots written by runs of that batch, so sibling
+    queries over the same sources aren't diffed against each other.
+    """
+    conn = get_connection()
+    if exclude_batch_id:
+        row = conn.execute(
+            """SELECT d.new_snapshot, d.created_at FROM diff_log d
+               LEFT JOIN reports r ON r.id = d.report_id
+               LEFT JOIN runs u ON u.run_id = r.run_id
+               WHERE d.vendor_name=? AND (u.batch_id IS NULL OR u.batch_id != ?)
+               ORDER BY d.created_at DESC, d.id DESC LIMIT 1""",
+            (vendor_name, exclude_batch_id),
+        ).fetchone()
+    else:
+        row = conn.execute(
+            """SELECT new_snapshot, created_at FROM diff_log
+               WHERE vendor_name=?
+               ORDER BY created_at DESC, id DESC LIMIT 1""",
+            (vendor_name,),
+        ).fetchone()
+    last = dict(row) if row else None
+    if last:
+        last["new_snapshot"] = _decode(conn, last["new_snapshot"])
+    conn.close()
+    return last
+
+
+# ── Diff Log ───────────────────────────────────────────────────────────────────
+
+def save_diff_log(report_id, vendor_name, new_snapshot, delta_summary, previous_snapshot=None):
+    """
+    previous_snapshot is optional: the previous snapshot already lives in the
+    vendor's prior diff_log row, so callers normally leave it empty.
+    """
+    conn = get_connection()
+    cursor = conn.execute(
+        """INSERT INTO diff_log (report_id, vendor_name, previous_snapshot, new_snapshot, delta_summary)
+           VALUES (?, ?, ?, ?, ?)""",
+        (report_id, vendor_name, _encode(conn, previous_snapshot), _encode(conn, new_snapshot), delta_summary),
+    )
+    _index_snapshot(conn, cursor.lastrowid, vendor_name, new_snapshot, delta_summary)
+    conn.commit()
+    conn.close()
+
+
+# ── Raw Source Store ───────────────────────────────────────────────────────────
+
+def save_raw_source(run_id, vendor_name, source, url, content, dedupe=False, placeholder=False):
+    """
+    Persist one raw source document for a run. The content is stored once per
+    distinct sha256; repeated content (same page across runs) only adds a manifest row.
+    With dedupe=True no manifest row is added if the run already references this hash
+    under the same source. placeholder=True marks content that stands in for a page
+    (an error notice or a cached copy), so it is never served as the page's last good copy.
+    Returns the content hash.
+    """
+    content = content or ""
+    digest = hashlib.sha256(content.encode("utf-8")).hexdigest()
+    conn = get_connection()
+    conn.execute(
+        "INSERT OR IGNORE INTO raw_blobs (hash, size, content) VALUES (?, ?, ?)",
+        (digest, len(content), compress_text(content)),
+    )
+    if dedupe:
+        conn.execute(
+            """INSERT INTO run_sources (run_id, vendor_name, source, url, hash, placeholder)
+               SELECT ?, ?, ?, ?, ?, ?
+               WHERE NOT EXISTS (SELECT 1 FROM run_sources WHERE run_id=? AND source=? AND hash=?)""",
+            (run_id, vendor_name, source, url, digest, int(placeholder), run_id, source, digest),
+        )
+    else:
+        conn.execute(
+            """INSERT INTO run_sources (run_id, vendor_name, source, url, hash, placeholder)
+               VALUES (?, ?, ?, ?, ?, ?)""",
+            (run_id, vendor_name, source, url, digest, int(placeholder)),
+        )
+    conn.commit()
+    conn.close()
+    return digest
+
+
+def get_raw_content(digest):
+    """Return the raw text stored under a content hash, or None."""
+    conn = get_connection()
+    row = conn.execute("SELECT content FROM raw_blobs WHERE hash=?", (digest,)).fetchone()
+    conn.close()
+    return decompress_text(row["content"]) if row else None
+
+
+def get_run_manifest(run_id):
+    """All raw sources captured for a run, in capture order (content not loaded)."""
+    conn = get_connection()
+    rows = conn.execute(
+        """SELECT s.vendor_name, s.source, s.url, s.hash, s.placeholder, b.size, s.created_at
+           FROM run_sources s LEFT JOIN raw_blobs b ON b.hash = s.hash
+           WHERE s.run_id=? ORDER BY s.id""",
+        (run_id,),
+    ).fetchall()
+    conn.close()
+    return [dict(r) for r in rows]
+
+
+def get_report_by_run_id(run_id):
+    conn = get_connection()
+    row = conn.execute(
+        "SELECT id FROM reports WHERE run_id=? ORDER BY id DESC LIMIT 1", (run_id,)
+    ).fetchone()
+    conn.close()
+    return get_report_by_id(row["id"]) if row else None
+
+
+# ── Runs ───────────────────────────────────────────────────────────────────────
+
+# run_sources.source for payloads offloaded from LangGraph checkpoints (agent/checkpoint.py)
+CHECKPOINT_SOURCE = "checkpoint"
+
+
+def create_run(run_id, research_query, vendors, save_to_drive=False, replay_run_id="", batch_id=""):
+    conn = get_connection()
+    conn.execute(
+        """INSERT INTO runs (run_id, research_query, vendors, save_to_drive, replay_run_id, batch_id)
+           VALUES (?, ?, ?, ?, ?, ?)
+           ON CONFLICT(run_id) DO UPDATE SET status='running', error=NULL, updated_at=CURRENT_TIMESTAMP""",
+        (run_id, research_query, json.dumps(vendors), int(bool(save_to_drive)), replay_run_id, batch_id),
+    )
+    conn.commit()
+    conn.close()
+
+
+def update_run_status(run_id, status, error=None):
+    conn = get_connection()
+    conn.execute(
+        "UPDATE runs SET status=?, error=?, updated_at=CURRENT_TIMESTAMP WHERE run_id=?",
+        (status, error, run_id),
+    )
+    conn.commit()
+    conn.close()
+
+
+def request_cancel(run_id):
+    """
+    Ask a run to stop. A running run notices within CANCEL_POLL_SECONDS and
+    writes a partial report; a job still waiting in the queue is dropped.
+    Returns whether there was anything to stop.
+    """
+    conn = get_connection()
+    updated = conn.execute(
+        "UPDATE runs SET cancel_requested=1, updated_at=CURRENT_TIMESTAMP WHERE run_id=? AND status='running'",
+        (run_id,),
+    ).rowcount
+    updated += conn.execute(
+        """UPDATE jobs SET status='cancelled', finished_at=CURRENT_TIMESTAMP
+           WHERE run_id=? AND status='queued'""",
+        (run_id,),
+    ).rowcount
+    conn.commit()
+    conn.close()
+    return bool(updated)
+
+
+def is_cancel_requested(run_id):
+    conn = get_connection()
+    row = conn.execute("SELECT cancel_requested FROM runs WHERE run_id=?", (run_id,)).fetchone()
+    conn.close()
+    return bool(row and row["cancel_requested"])
+
+
+def get_run(run_id):
+    conn = get_connection()
+    row = conn.execute("SELECT * FROM runs WHERE run_id=?", (run_id,)).fetchone()
+    conn.close()
+    if not row:
+        return None
+    run = dict(row)
+    run["vendors"] = json.loads(run["vendors"] or "[]")
+    return run
+
+
+def save_run_result(run_id, result):
+    conn = get_connection()
+    conn.execute(
+        "UPDATE runs SET result=? WHERE run_id=?",
+        (compress_text(json.dumps(result, default=str)), run_id),
+    )
+    conn.commit()
+    conn.close()
+
+
+def get_run_result(run_id):
+    """Final state saved when the run completed, or None."""
+    conn = get_connection()
+    row = conn.execute("SELECT result FROM runs WHERE run_id=?", (run_id,)).fetchone()
+    conn.close()
+    if not row or row["result"] is None:
+        return None
+    return json.loads(decompress_text(row["result"]))
+
+
+def save_run_event(run_id, node, data=None):
+    conn = get_connection()
+    conn.execute(
+        "INSERT INTO run_events (run_id, node, data) VALUES (?, ?, ?)",
+        (run_id, node, json.dumps(data or {}, default=str)),
+    )
+    conn.commit()
+    conn.close()
+
+
+def get_run_events(run_id, after_id=0):
+    conn = get_connection()
+    rows = conn.execute(
+        "SELECT * FROM run_events WHERE run_id=? AND id>? ORDER BY id", (run_id, after_id)
+    ).fetchall()
+    conn.close()
+    events = [dict(r) for r in rows]
+    for event in events:
+        event["data"] = json.loads(event["data"] or "{}")
+    return events
+
+
+def save_run_previews(run_id, previews):
+    """Upsert streamed text, given as {(node, vendor_name): text so far}."""
+    if not previews:
+        return
+    conn = get_connection()
+    conn.executemany(
+        """INSERT INTO run_previews (run_id, node, vendor_name, text) VALUES (?, ?, ?, ?)
+           ON CONFLICT(run_id, node, vendor_name)
+           DO UPDATE SET text=excluded.text, updated_at=CURRENT_TIMESTAMP""",
+        [(run_id, node, vendor_name, text) for (node, vendor_name), text in previews.items()],
+    )
+    conn.commit()
+    conn.close()
+
+
+def get_run_previews(run_id, node=None):
+    conn = get_connection()
+    if node:
+        rows = conn.execute(
+            "SELECT * FROM run_previews WHERE run_id=? AND node=? ORDER BY vendor_name", (run_id, node)
+        ).fetchall()
+    else:
+        rows = conn.execute(
+            "SELECT * FROM run_previews WHERE run_id=? ORDER BY node, vendor_name", (run_id,)
+        ).fetchall()
+    conn.close()
+    return [dict(r) for r in rows]
+
+
+def get_incomplete_runs(limit=10):
+    """
+    Runs that failed, were interrupted, or never finished (e.g. the process died).
+    Runs a worker has queued or in hand are left out — they'll finish on their own.
+    """
+    conn = get_connection()
+    rows = conn.execute(
+        """SELECT * FROM runs WHERE status != 'completed'
+             AND run_id NOT IN (SELECT run_id FROM jobs WHERE status IN ('queued', 'running') AND run_id IS NOT NULL)
+           ORDER BY updated_at DESC LIMIT ?""",
+        (limit,),
+    ).fetchall()
+    conn.close()
+    runs = [dict(r) for r in rows]
+    for run in runs:
+        run["vendors"] = json.loads(run["vendors"] or "[]")
+    return runs
+
+
+def get_vendor_result(run_id, node, vendor_name):
+    """Cached per-vendor output of a node for this run, or None."""
+    if not run_id:
+        return None
+    conn = get_connection()
+    row = conn.execute(
+        "SELECT payload FROM run_vendor_results WHERE run_id=? AND node=? AND vendor_name=?",
+        (run_id, node, vendor_name),
+    ).fetchone()
+    conn.close()
+    return json.loads(decompress_text(row["payload"])) if row else None
+
+
+def save_vendor_result(run_id, node, vendor_name, payload):
+    if not run_id:
+        return
+    conn = get_connection()
+    conn.execute(
+        """INSERT OR REPLACE INTO run_vendor_results (run_id, node, vendor_name, payload)
+           VALUES (?, ?, ?, ?)""",
+        (run_id, node, vendor_name, compress_text(json.dumps(payload))),
+    )
+    conn.commit()
+    conn.close()
+
+
+def clear_run_scratch(run_id):
+    """Drop per-vendor results, streamed previews and checkpoint blob references once a run is done with them."""
+    conn = get_connection()
+    conn.execute("DELETE FROM run_vendor_results WHERE run_id=?", (run_id,))
+    conn.execute("DELETE FROM run_previews WHERE run_id=?", (run_id,))
+    conn.execute("DELETE FROM run_sources WHERE run_id=? AND source=?", (run_id, CHECKPOINT_SOURCE))
+    conn.commit()
+    conn.close()
+
+
+# ── LLM usage ──────────────────────────────────────────────────────────────────
+
+def save_run_usage(run_id, node, vendor_name, model, usage, sources=None):
+    conn = get_connection()
+    conn.execute(
+        """INSERT INTO run_usage (run_id, node, vendor_name, model, input_tokens, output_tokens,
+                                  cached_tokens, image_tokens, cost_usd, sources)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+        (run_id, node, vendor_name, model, usage.get("input_tokens"), usage.get("output_tokens"),
+         usage.get("cached_tokens"), usage.get("image_tokens"), usage.get("cost_usd"),
+         json.dumps(sources) if sources else None),
+    )
+    conn.commit()
+    conn.close()
+
+
+def get_run_usage_totals(run_id):
+    """Tokens and cost summed over one run."""
+    conn = get_connection()
+    row = conn.execute(
+        """SELECT COUNT(*) AS calls, COALESCE(SUM(input_tokens), 0) AS input_tokens,
+                  COALESCE(SUM(output_tokens), 0) AS output_tokens,
+                  COALESCE(SUM(cached_tokens), 0) AS cached_tokens,
+                  COALESCE(SUM(image_tokens), 0) AS image_tokens,
+                  COALESCE(SUM(cost_usd), 0) AS cost_usd
+           FROM run_usage WHERE run_id=?""",
+        (run_id,),
+    ).fetchone()
+    conn.close()
+    return dict(row)
+
+
+def get_usage_by_vendor(since=None):
+    """Per-vendor and per-node tokens and cost since a 'YYYY-MM-DD HH:MM:SS' timestamp, costliest first."""
+    conn = get_connection()
+    rows = conn.execute(
+        """SELECT vendor_name, node, COUNT(*) AS calls, COUNT(DISTINCT run_id) AS runs,
+                  SUM(input_tokens) AS input_tokens, SUM(output_tokens) AS output_tokens,
+                  SUM(cached_tokens) AS cached_tokens, SUM(image_tokens) AS image_tokens,
+                  SUM(cost_usd) AS cost_usd
+           FROM run_usage WHERE created_at >= ?
+           GROUP BY vendor_name, node ORDER BY cost_usd DESC""",
+        (since or "",),
+    ).fetchall()
+    conn.close()
+    return [dict(r) for r in rows]
+
+
+def get_usage_daily(since=None):
+    """Cost and tokens per vendor per day, oldest first."""
+    conn = get_connection()
+    rows = conn.execute(
+        """SELECT date(created_at) AS day, vendor_name,
+                  SUM(input_tokens + output_tokens) AS tokens, SUM(cost_usd) AS cost_usd
+           FROM run_usage WHERE created_at >= ?
+           GROUP BY day, vendor_name ORDER BY day""",
+        (since or "",),
+    ).fetchall()
+    conn.close()
+    return [dict(r) for r in rows]
+
+
+def get_usage_sources(since=None):
+    """The prompt characters per source kind (web, docs, youtube, ...) logged with each synthesis call."""
+    conn = get_connection()
+    rows = conn.execute(
+        "SELECT vendor_name, input_tokens, sources FROM run_usage WHERE created_at >= ? AND sources IS NOT NULL",
+        (since or "",),
+    ).fetchall()
+    conn.close()
+    return [{**dict(r), "sources": json.loads(r["sources"])} for r in rows]
+
+
+# ── Run profiles ───────────────────────────────────────────────────────────────
+
+def save_run_profile(run_id, node, summary):
+    conn = get_connection()
+    conn.execute(
+        "INSERT INTO run_profiles (run_id, node, summary) VALUES (?, ?, ?)",
+        (run_id, node, json.dumps(summary)),
+    )
+    conn.commit()
+    conn.close()
+
+
+def get_run_profiles(run_id):
+    """Profile summaries of a run's nodes, in execution order."""
+    conn = get_connection()
+    rows = conn.execute(
+        "SELECT node, summary, created_at FROM run_profiles WHERE run_id=? ORDER BY id", (run_id,)
+    ).fetchall()
+    conn.close()
+    return [{"node": r["node"], "created_at": r["created_at"], **json.loads(r["summary"])} for r in rows]
+
+
+def get_profiled_runs(limit=20):
+    """Most recently profiled runs with their total profiled seconds."""
+    conn = get_connection()
+    rows = conn.execute(
+        """SELECT p.run_id, r.research_query, r.vendors, r.status, MAX(p.created_at) AS profiled_at,
+                  COUNT(*) AS nodes, SUM(json_extract(p.summary, '$.seconds')) AS seconds
+           FROM run_profiles p LEFT JOIN runs r ON r.run_id = p.run_id
+           GROUP BY p.run_id ORDER BY profiled_at DESC LIMIT ?""",
+        (limit,),
+    ).fetchall()
+    conn.close()
+    return [{**dict(r), "vendors": json.loads(r["vendors"] or "[]")} for r in rows]
+
+
+# ── Report fragments ───────────────────────────────────────────────────────────
+
+def save_report_fragment(digest, vendor_name, whats_new, intelligence):
+    conn = get_connection()
+    conn.execute(
+        """INSERT OR IGNORE INTO report_fragments (hash, vendor_name, whats_new, intelligence)
+           VALUES (?, ?, ?, ?)""",
+        (digest, vendor_name, compress_text(whats_new) if whats_new is not None else None,
+         compress_text(intelligence)),
+    )
+    conn.commit()
+    conn.close()
+
+
+def get_report_fragments(digests):
+    """Stored fragments for the given hashes, as {hash: {"whats_new", "intelligence"}}. Missing hashes are left out."""
+    digests = list(dict.fromkeys(digests))
+    if not digests:
+        return {}
+    conn = get_connection()
+    rows = conn.execute(
+        f"SELECT * FROM report_fragments WHERE hash IN ({','.join('?' * len(digests))})", digests
+    ).fetchall()
+    conn.close()
+    return {
+        row["hash"]: {
+            "whats_new": decompress_text(row["whats_new"]) if row["whats_new"] is not None else None,
+            "intelligence": decompress_text(row["intelligence"]),
+        }
+        for row in rows
+    }
+
+
+# ── Scheduler ──────────────────────────────────────────────────────────────────
+
+def set_refresh_interval(competitor_id, hours):
+    """Set a competitor's refresh cadence in hours (None/0 = not scheduled). A new cadence is due now."""
+    conn = get_connection()
+    conn.execute(
+        """UPDATE competitors
+           SET next_refresh_at = CASE WHEN refresh_interval_hours IS ? THEN next_refresh_at END,
+               refresh_interval_hours = ?
+           WHERE id=?""",
+        (hours or None, hours or None, competitor_id),
+    )
+    conn.commit()
+    conn.close()
+
+
+def get_due_competitors():
+    """
+    Scheduled competitors whose next refresh is due and that aren't already in
+    a queued or running job. missed_slots counts whole intervals that passed
+    while nothing ran (e.g. the scheduler was down).
+    """
+    conn = get_connection()
+    rows = conn.execute(
+        """SELECT c.*,
+                  CASE WHEN c.next_refresh_at IS NULL THEN 0
+                       ELSE CAST((julianday('now') - julianday(c.next_refresh_at)) * 24
+                                 / c.refresh_interval_hours AS INTEGER)
+                  END AS missed_slots
+           FROM competitors c
+           WHERE c.refresh_interval_hours > 0
+             AND (c.next_refresh_at IS NULL OR c.next_refresh_at <= CURRENT_TIMESTAMP)
+             AND NOT EXISTS (
+                 SELECT 1 FROM jobs j, json_each(j.vendors) v
+                 WHERE j.status IN ('queued', 'running') AND v.value = c.vendor_name
+             )
+           ORDER BY c.next_refresh_at IS NOT NULL, c.next_refresh_at, c.vendor_name"""
+    ).fetchall()
+    conn.close()
+    return [dict(r) for r in rows]
+
+
+def mark_competitors_refreshed(vendor_names, refreshed=True):
+    """
+    Push the next refresh one interval past now. Missed slots are not replayed —
+    one catch-up run covers them. refreshed=False (skipped as unchanged, or gave
+    up after failures) leaves last_refreshed_at alone.
+    """
+    conn = get_connection()
+    conn.executemany(
+        f"""UPDATE competitors
+            SET next_refresh_at = datetime('now', '+' || refresh_interval_hours || ' hours')
+                {", last_refreshed_at = CURRENT_TIMESTAMP" if refreshed else ""}
+            WHERE vendor_name=?""",
+        [(name,) for name in vendor_names],
+    )
+    conn.commit()
+    conn.close()
+
+
+def enqueue_job(research_query, vendors, save_to_drive=False, run_id=None, priority=0, profile=False,
+                deadline_seconds=None):
+    """Queue a job. With run_id, the job starts (or resumes) that run instead of a new one."""
+    conn = get_connection()
+    cursor = conn.execute(
+        """INSERT INTO jobs (research_query, vendors, save_to_drive, run_id, priority, profile, deadline_seconds)
+           VALUES (?, ?, ?, ?, ?, ?, ?)""",
+        (research_query, json.dumps(vendors), int(bool(save_to_drive)), run_id, priority, int(bool(profile)),
+         deadline_seconds),
+    )
+    conn.commit()
+    job_id = cursor.lastrowid
+    conn.close()
+    return job_id
+
+
+def _job_row(row):
+    job = dict(row)
+    job["vendors"] = json.loads(job["vendors"] or "[]")
+    return job
+
+
+def claim_next_job(worker_id, lease_seconds, max_running):
+    """
+    Atomically lease the oldest ready job to worker_id, unless max_running jobs
+    already hold a live lease. A running job whose lease expired (its worker
+    died or hung) is ready again. Returns the job, or None.
+    """
+    conn = get_connection()
+    conn.isolation_level = None
+    conn.execute("BEGIN IMMEDIATE")   # serialize claims across worker processes
+    try:
+        running = conn.execute(
+            "SELECT COUNT(*) FROM jobs WHERE status='running' AND lease_expires_at > CURRENT_TIMESTAMP"
+        ).fetchone()[0]
+        row = None
+        if running < max_running:
+            row = conn.execute(
+                """SELECT * FROM jobs
+                   WHERE (status='queued' AND not_before <= CURRENT_TIMESTAMP)
+                      OR (status='running' AND (lease_expires_at IS NULL OR lease_expires_at <= CURRENT_TIMESTAMP))
+                   ORDER BY priority DESC, not_before, id LIMIT 1"""
+            ).fetchone()
+        if row:
+            conn.execute(
+                """UPDATE jobs SET status='running', attempts=attempts+1, started_at=CURRENT_TIMESTAMP,
+                       lease_owner=?, lease_expires_at=datetime('now', '+' || ? || ' seconds')
+                   WHERE id=?""",
+                (worker_id, int(lease_seconds), row["id"]),
+            )
+            row = conn.execute("SELECT * FROM jobs WHERE id=?", (row["id"],)).fetchone()
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+    return _job_row(row) if row else None
+
+
+def heartbeat_job(job_id, worker_id, lease_seconds):
+    """Extend a job's lease. Returns False if the worker no longer holds it."""
+    conn = get_connection()
+    renewed = conn.execute(
+        """UPDATE jobs SET lease_expires_at=datetime('now', '+' || ? || ' seconds')
+           WHERE id=? AND lease_owner=? AND status='running'""",
+        (int(lease_seconds), job_id, worker_id),
+    ).rowcount
+    conn.commit()
+    conn.close()
+    return bool(renewed)
+
+
+def set_job_run_id(job_id, run_id):
+    conn = get_connection()
+    conn.execute("UPDATE jobs SET run_id=? WHERE id=?", (run_id, job_id))
+    conn.commit()
+    conn.close()
+
+
+def finish_job(job_id, status, error=None, worker_id=None):
+    """
+    Record a job's final status. With worker_id, only if that worker still holds
+    the lease. Returns whether the job was updated.
+    """
+    conn = get_connection()
+    updated = conn.execute(
+        """UPDATE jobs SET status=?, error=?, finished_at=CURRENT_TIMESTAMP, lease_expires_at=NULL
+           WHERE id=? AND (? IS NULL OR lease_owner=?)""",
+        (status, error, job_id, worker_id, worker_id),
+    ).rowcount
+    conn.commit()
+    conn.close()
+    return bool(updated)
+
+
+def retry_job(job_id, error, delay_seconds, worker_id=None):
+    """Put a failed job back in the queue, not to be claimed for delay_seconds."""
+    conn = get_connection()
+    updated = conn.execute(
+        """UPDATE jobs SET status='queued', error=?, lease_owner=NULL, lease_expires_at=NULL,
+               not_before=datetime('now', '+' || ? || ' seconds')
+           WHERE id=? AND (? IS NULL OR lease_owner=?)""",
+        (error, int(delay_seconds), job_id, worker_id, worker_id),
+    ).rowcount
+    conn.commit()
+    conn.close()
+    return bool(updated)
+
+
+def get_jobs(limit=50, status=None):
+    conn = get_connection()
+    if status:
+        rows = conn.execute(
+            "SELECT * FROM jobs WHERE status=? ORDER BY id DESC LIMIT ?", (status, limit)
+        ).fetchall()
+    else:
+        rows = conn.execute("SELECT * FROM jobs ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+    conn.close()
+    return [_job_row(r) for r in rows]
+
+
+def get_job_by_run_id(run_id):
+    conn = get_connection()
+    row = conn.execute("SELECT * FROM jobs WHERE run_id=? ORDER BY id DESC LIMIT 1", (run_id,)).fetchone()
+    conn.close()
+    return _job_row(row) if row else None
+
+
+def get_source_validator(url):
+    conn = get_connection()
+    row = conn.execute("SELECT * FROM source_validators WHERE url=?", (url,)).fetchone()
     conn.close()
     return dict(row) if row else None
 
 
-def get_last_report_for_vendor(vendor_name):
-    """Returns the most recent synthesis snapshot for a vendor from diff_log."""
+def save_source_validator(url, etag, last_modified, content_hash):
+    conn = get_connection()
+    conn.execute(
+        """INSERT OR REPLACE INTO source_validators (url, etag, last_modified, content_hash, checked_at)
+           VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)""",
+        (url, etag, last_modified, content_hash),
+    )
+    conn.commit()
+    conn.close()
+
+
+def get_crawl_page(url, revisit_days):
+    """A crawl_pages row, with recent=1 if it was checked within revisit_days, or None."""
     conn = get_connection()
     row = conn.execute(
-        """SELECT new_snapshot, created_at FROM diff_log
-           WHERE vendor_name=?
-           ORDER BY created_at DESC LIMIT 1""",
-        (vendor_name,),
+        """SELECT *, checked_at > datetime('now', '-' || ? || ' days') AS recent
+           FROM crawl_pages WHERE url=?""",
+        (revisit_days, url),
     ).fetchone()
     conn.close()
     return dict(row) if row else None
 
 
-# ── Diff Log ───────────────────────────────────────────────────────────────────
+_CRAWL_PAGE_UPSERT = """
+    ON CONFLICT(url) DO UPDATE SET
+        root_url=excluded.root_url, etag=excluded.etag, last_modified=excluded.last_modified,
+        links=excluded.links, checked_at=excluded.checked_at,
+        changed_at=CASE WHEN content_hash IS excluded.content_hash THEN changed_at
+                        ELSE excluded.checked_at END,
+        content_hash=excluded.content_hash"""
 
-def save_diff_log(report_id, vendor_name, previous_snapshot, new_snapshot, delta_summary):
+
+def save_crawl_page(url, root_url, content_hash, etag, last_modified, links):
+    """Record a check of a crawled page; changed_at moves only when its content hash does."""
     conn = get_connection()
     conn.execute(
-        """INSERT INTO diff_log (report_id, vendor_name, previous_snapshot, new_snapshot, delta_summary)
-           VALUES (?, ?, ?, ?, ?)""",
-        (report_id, vendor_name, previous_snapshot, new_snapshot, delta_summary),
+        """INSERT INTO crawl_pages (url, root_url, content_hash, etag, last_modified, links, checked_at)
+           VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)""" + _CRAWL_PAGE_UPSERT,
+        (url, root_url, content_hash, etag, last_modified, json.dumps(links)),
+    )
+    conn.commit()
+    conn.close()
+
+
+def save_crawl_visit(run_id, url, root_url, content_hash, etag, last_modified, links, fresh):
+    """Record a run's check of a crawled page, pending until confirm_crawl_visits()."""
+    conn = get_connection()
+    conn.execute(
+        """INSERT OR REPLACE INTO crawl_visits
+               (run_id, url, root_url, content_hash, etag, last_modified, links, fresh)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+        (run_id, url, root_url, content_hash, etag, last_modified, json.dumps(links), int(fresh)),
+    )
+    conn.commit()
+    conn.close()
+
+
+def confirm_crawl_visits(run_id, prompted_urls):
+    """
+    Move a run's crawl checks into crawl_pages once its report is saved. A new or
+    changed page only counts as seen if it is in prompted_urls (made it into the
+    synthesis prompt of a vendor in the report); the others stay new for the next
+    run. Returns the pages confirmed.
+    """
+    conn = get_connection()
+    confirmed = conn.execute(
+        """INSERT INTO crawl_pages (url, root_url, content_hash, etag, last_modified, links, checked_at)
+           SELECT url, root_url, content_hash, etag, last_modified, links, checked_at FROM crawl_visits
+           WHERE run_id=? AND (NOT fresh OR url IN (SELECT value FROM json_each(?)))""" + _CRAWL_PAGE_UPSERT,
+        (run_id, json.dumps(list(prompted_urls))),
+    ).rowcount
+    conn.execute("DELETE FROM crawl_visits WHERE run_id=?", (run_id,))
+    conn.commit()
+    conn.close()
+    return confirmed
+
+
+def get_last_good_content(url):
+    """The newest non-empty text fetched for this URL (placeholders skipped), or None."""
+    conn = get_connection()
+    row = conn.execute(
+        """SELECT b.content FROM run_sources s JOIN raw_blobs b ON b.hash = s.hash
+           WHERE s.url=? AND NOT s.placeholder AND b.size > 0
+           ORDER BY s.id DESC LIMIT 1""",
+        (url,),
+    ).fetchone()
+    conn.close()
+    return decompress_text(row["content"]) if row else None
+
+
+def get_robots(host, max_age_hours):
+    """{"body": ...} for a robots.txt fetched within max_age_hours, else None."""
+    conn = get_connection()
+    row = conn.execute(
+        "SELECT body FROM robots_cache WHERE host=? AND fetched_at > datetime('now', '-' || ? || ' hours')",
+        (host, int(max_age_hours)),
+    ).fetchone()
+    conn.close()
+    return dict(row) if row else None
+
+
+def save_robots(host, body):
+    conn = get_connection()
+    conn.execute(
+        "INSERT OR REPLACE INTO robots_cache (host, body, fetched_at) VALUES (?, ?, CURRENT_TIMESTAMP)",
+        (host, body),
     )
     conn.commit()
     conn.close()
+
+
+def get_open_circuit(host):
+    """The host's host_health row while its circuit breaker is open, else None."""
+    conn = get_connection()
+    row = conn.execute(
+        "SELECT * FROM host_health WHERE host=? AND open_until > CURRENT_TIMESTAMP", (host,)
+    ).fetchone()
+    conn.close()
+    return dict(row) if row else None
+
+
+def record_host_success(host):
+    conn = get_connection()
+    conn.execute(
+        """INSERT INTO host_health (host, failures) VALUES (?, 0)
+           ON CONFLICT(host) DO UPDATE SET failures=0, open_until=NULL, updated_at=CURRENT_TIMESTAMP""",
+        (host,),
+    )
+    conn.commit()
+    conn.close()
+
+
+def record_host_failure(host, error, threshold, cooldown_seconds):
+    """Count a failed fetch; at threshold failures in a row the host's breaker opens for cooldown_seconds."""
+    conn = get_connection()
+    conn.execute(
+        """INSERT INTO host_health (host, failures, last_error) VALUES (?, 1, ?)
+           ON CONFLICT(host) DO UPDATE SET failures=failures+1, last_error=excluded.last_error,
+               updated_at=CURRENT_TIMESTAMP""",
+        (host, error),
+    )
+    conn.execute(
+        """UPDATE host_health SET open_until=datetime('now', '+' || ? || ' seconds')
+           WHERE host=? AND failures >= ?""",
+        (int(cooldown_seconds), host, threshold),
+    )
+    conn.commit()
+    conn.close()
+
+
+def get_analyzed_source_hash(url):
+    """Content hash of this URL as captured by the latest completed run, or None."""
+    conn = get_connection()
+    row = conn.execute(
+        """SELECT s.hash FROM run_sources s JOIN runs r ON r.run_id = s.run_id
+           WHERE s.url=? AND r.status='completed' AND NOT s.placeholder
+           ORDER BY s.id DESC LIMIT 1""",
+        (url,),
+    ).fetchone()
+    conn.close()
+    return row["hash"] if row else None
+
+
+# ── Full-Text Search ───────────────────────────────────────────────────────────
+
+SEARCH_ORDERS = {
+    "rank": "rank",
+    "newest": "created_at DESC",
+    "oldest": "created_at ASC",
+}
+
+
+def _index_report(conn, report_id, research_query, report_markdown):
+    conn.execute(
+        "INSERT INTO reports_fts(rowid, research_query, report_markdown) VALUES (?, ?, ?)",
+        (report_id, research_query, report_markdown),
+    )
+
+
+def _index_snapshot(conn, diff_id, vendor_name, new_snapshot, delta_summary):
+    conn.execute(
+        "INSERT INTO diff_log_fts(rowid, vendor_name, new_snapshot, delta_summary) VALUES (?, ?, ?, ?)",
+        (diff_id, vendor_name, new_snapshot, delta_summary),
+    )
+
+
+def delete_reports(conn, report_ids):
+    """
+    Delete reports and their search index entries on conn (the caller commits).
+    FTS5 needs the indexed text to drop a row, so it is decompressed here.
+    """
+    ids = json.dumps(list(report_ids))
+    for row in conn.execute(
+        "SELECT id, research_query, report_markdown FROM reports WHERE id IN (SELECT value FROM json_each(?))", (ids,)
+    ).fetchall():
+        conn.execute(
+            "INSERT INTO reports_fts(reports_fts, rowid, research_query, report_markdown) VALUES ('delete', ?, ?, ?)",
+            (row["id"], row["research_query"], _decode(conn, row["report_markdown"])),
+        )
+    return conn.execute("DELETE FROM reports WHERE id IN (SELECT value FROM json_each(?))", (ids,)).rowcount
+
+
+def delete_snapshots(conn, diff_ids):
+    """Delete diff_log rows and their search index entries on conn (the caller commits)."""
+    ids = json.dumps(list(diff_ids))
+    for row in conn.execute(
+        "SELECT id, vendor_name, new_snapshot, delta_summary FROM diff_log WHERE id IN (SELECT value FROM json_each(?))",
+        (ids,),
+    ).fetchall():
+        conn.execute(
+            """INSERT INTO diff_log_fts(diff_log_fts, rowid, vendor_name, new_snapshot, delta_summary)
+               VALUES ('delete', ?, ?, ?, ?)""",
+            (row["id"], row["vendor_name"], _decode(conn, row["new_snapshot"]), row["delta_summary"]),
+        )
+    return conn.execute("DELETE FROM diff_log WHERE id IN (SELECT value FROM json_each(?))", (ids,)).rowcount
+
+
+def _fts_query(text):
+    """
+    Turn free text into a safe FTS5 query: every term is quoted (so input like
+    "C++" or "SOC-2" can't break the syntax) and terms are AND-ed together.
+    A trailing * on a term is kept as a prefix search.
+    """
+    terms = []
+    for term in text.split():
+        prefix = term.endswith("*")
+        term = term.rstrip("*").replace('"', '""')
+        if term:
+            terms.append(f'"{term}"' + ("*" if prefix else ""))
+    return " ".join(terms)
+
+
+def search_reports(query, limit=20, order="rank", include_local_only=True):
+    """
+    Full-text search over report bodies and research queries.
+    include_local_only=False leaves out unpublished reports, as in get_report_history().
+    Returns [{id, run_date, research_query, vendors_covered, created_at, snippet}, ...]
+    """
+    match = _fts_query(query)
+    if not match:
+        return []
+    published_sql = "" if include_local_only else f"AND {_published_only('r')}"
+    conn = get_connection()
+    try:
+        rows = conn.execute(
+            f"""SELECT r.id, r.run_date, r.research_query, r.vendors_covered, r.created_at,
+                       snippet(reports_fts, 1, '**', '**', '…', 24) AS snippet
+                FROM reports_fts
+                JOIN reports r ON r.id = reports_fts.rowid
+                WHERE reports_fts MATCH ? {published_sql}
+                ORDER BY {SEARCH_ORDERS.get(order, "rank")}
+                LIMIT ?""",
+            (match, limit),
+        ).fetchall()
+    except sqlite3.OperationalError:
+        rows = []
+    finally:
+        conn.close()
+    return [{**dict(r), "snippet": " ".join((r["snippet"] or "").split())} for r in rows]
+
+
+def search_vendor_snapshots(query, vendor_name=None, limit=20, order="rank", include_local_only=True):
+    """
+    Full-text search over per-vendor synthesis snapshots and delta summaries.
+    order="oldest" answers "when did a competitor first mention X".
+    include_local_only=False only searches snapshots of published reports.
+    Returns [{id, report_id, vendor_name, created_at, snippet}, ...]
+    """
+    match = _fts_query(query)
+    if not match:
+        return []
+    vendor_sql = "AND d.vendor_name = ?" if vendor_name else ""
+    if not include_local_only:   # a semi-join: reports.created_at would make ORDER BY ambiguous
+        vendor_sql += f" AND d.report_id IN (SELECT id FROM reports WHERE {_published_only()})"
+    params = [match] + ([vendor_name] if vendor_name else []) + [limit]
+
+    conn = get_connection()
+    try:
+        rows = conn.execute(
+            f"""SELECT d.id, d.report_id, d.vendor_name, d.created_at,
+                       snippet(diff_log_fts, -1, '**', '**', '…', 24) AS snippet
+                FROM diff_log_fts
+                JOIN diff_log d ON d.id = diff_log_fts.rowid
+                WHERE diff_log_fts MATCH ? {vendor_sql}
+                ORDER BY {SEARCH_ORDERS.get(order, "rank")}
+                LIMIT ?""",
+            params,
+        ).fetchall()
+    except sqlite3.OperationalError:
+        rows = []
+    finally:
+        conn.close()
+    return [{**dict(r), "snippet": " ".join((r["snippet"] or "").split())} for r in rows]
@@ -0,0 +1,327 @@
+"""
+Retention and compaction for the intelligence database.
+
+    python -m db.retention              # apply the configured policy
+    python -m db.retention --dry-run    # report what would be removed
+
+Policy (see config/settings.py):
+  - every report younger than RETENTION_KEEP_ALL_DAYS is kept
+  - up to RETENTION_KEEP_WEEKLY_DAYS, the newest report per research query per ISO week
+  - up to RETENTION_KEEP_MONTHLY_DAYS, the newest report per research query per month
+  - older reports are dropped (RETENTION_KEEP_MONTHLY_DAYS = 0 keeps monthly forever)
+  - live-only (__local_only__) reports are dropped after RETENTION_LOCAL_ONLY_DAYS
+  - unfinished runs (and their checkpoints) are dropped after RETENTION_KEEP_ALL_DAYS
+  - so are run progress logs, saved run results, finished queue jobs,
+    cached report fragments, run traces and run profiles, cached robots.txt
+    files and the circuit-breaker state of hosts not fetched since (open
+    breakers are kept until they close)
+  - crawled pages no crawl has reached for RETENTION_KEEP_WEEKLY_DAYS are
+    forgotten, so the crawler's visited set only holds pages still linked;
+    pending crawl checks of runs that never saved a report go after
+    RETENTION_KEEP_ALL_DAYS
+  - LLM usage records are kept as long as monthly reports
+    (RETENTION_KEEP_MONTHLY_DAYS), so the spend view covers what history does
+
+The latest diff_log snapshot per vendor is never removed — the diff engine
+needs it to compute the next delta.
+
+Afterwards the shared compression dictionary is retrained once
+DICT_RETRAIN_AFTER_REPORTS reports were saved since the active one
+(`--retrain-dictionary` retrains regardless).
+"""
+import argparse
+import os
+import shutil
+from datetime import datetime, timedelta, timezone
+from db.database import (
+    DICT_RETRAIN_AFTER_REPORTS, delete_reports, delete_snapshots, get_connection, init_db,
+    retrain_compression_dictionary,
+)
+from config.settings import (
+    RETENTION_KEEP_ALL_DAYS,
+    RETENTION_KEEP_WEEKLY_DAYS,
+    RETENTION_KEEP_MONTHLY_DAYS,
+    RETENTION_LOCAL_ONLY_DAYS,
+    TRACE_DIR,
+    PROFILE_DIR,
+)
+
+AUTO_VACUUM_INCREMENTAL = 2
+SQL_TIME = "%Y-%m-%d %H:%M:%S"   # CURRENT_TIMESTAMP's format: naive UTC
+
+
+def _utcnow() -> datetime:
+    """Now in UTC, naive like the timestamps SQLite stores."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _mtime(path: str) -> datetime:
+    return datetime.fromtimestamp(os.path.getmtime(path), timezone.utc).replace(tzinfo=None)
+
+
+def _bucket(created_at: datetime, now: datetime, keep_all_days, keep_weekly_days, keep_monthly_days):
+    """Return the thinning bucket for a report, "all" to always keep, or None to drop."""
+    age = now - created_at
+    if age <= timedelta(days=keep_all_days):
+        return "all"
+    if age <= timedelta(days=keep_weekly_days):
+        year, week, _ = created_at.isocalendar()
+        return f"week:{year}-{week:02d}"
+    if not keep_monthly_days or age <= timedelta(days=keep_monthly_days):
+        return f"month:{created_at:%Y-%m}"
+    return None
+
+
+def select_expired_reports(conn, now=None,
+                           keep_all_days=RETENTION_KEEP_ALL_DAYS,
+                           keep_weekly_days=RETENTION_KEEP_WEEKLY_DAYS,
+                           keep_monthly_days=RETENTION_KEEP_MONTHLY_DAYS,
+                           local_only_days=RETENTION_LOCAL_ONLY_DAYS) -> list[int]:
+    """Return ids of reports the policy no longer keeps. Reads metadata only."""
+    now = now or _utcnow()
+    rows = conn.execute(
+        """SELECT id, research_query, gdrive_link, created_at FROM reports
+           ORDER BY created_at DESC, id DESC"""
+    ).fetchall()
+
+    expired = []
+    kept_buckets = set()
+    for row in rows:
+        created_at = datetime.fromisoformat(row["created_at"])
+
+        if row["gdrive_link"] == "__local_only__":
+            if now - created_at > timedelta(days=local_only_days):
+                expired.append(row["id"])
+            continue
+
+        bucket = _bucket(created_at, now, keep_all_days, keep_weekly_days, keep_monthly_days)
+        if bucket == "all":
+            continue
+        key = (bucket, (row["research_query"] or "").strip().lower())
+        if bucket is None or key in kept_buckets:
+            expired.append(row["id"])
+        else:
+            kept_buckets.add(key)  # rows are newest-first, so the first one per bucket wins
+
+    return expired
+
+
+def _expired_traces(cutoff: datetime) -> list[str]:
+    """Trace files (TRACE_DIR/<run_id>.jsonl) last written before the cutoff."""
+    if not os.path.isdir(TRACE_DIR):
+        return []
+    paths = [os.path.join(TRACE_DIR, name) for name in os.listdir(TRACE_DIR) if name.endswith(".jsonl")]
+    return [p for p in paths if _mtime(p) < cutoff]
+
+
+def _expired_profiles(cutoff: datetime) -> list[str]:
+    """Profile directories (PROFILE_DIR/<run_id>/) last written before the cutoff."""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    paths = [os.path.join(PROFILE_DIR, name) for name in os.listdir(PROFILE_DIR)]
+    return [p for p in paths if os.path.isdir(p) and _mtime(p) < cutoff]
+
+
+def _db_bytes(conn) -> int:
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+    return page_size * page_count
+
+
+def run_retention(dry_run: bool = False, now=None, retrain_dictionary: bool = False, **policy) -> dict:
+    """
+    Apply the retention policy, trim orphans, garbage-collect the raw store,
+    refresh the compression dictionary and compact the file. With dry_run=True
+    all deletes are rolled back. Returns a summary dict including bytes_reclaimed.
+    """
+    init_db()
+    conn = get_connection()
+    bytes_before = _db_bytes(conn)
+
+    expired = select_expired_reports(conn, now=now, **policy)
+    summary = {"reports_deleted": len(expired)}
+
+    delete_reports(conn, expired)
+
+    # Orphaned snapshots, except each vendor's latest (the next diff baseline). Snapshots
+    # saved within the same second tie on created_at; id breaks the tie, as in get_last_report_for_vendor
+    orphaned = [r["id"] for r in conn.execute(
+        """SELECT id FROM diff_log d
+           WHERE (report_id IS NULL OR report_id NOT IN (SELECT id FROM reports))
+             AND id != (SELECT id FROM diff_log WHERE vendor_name = d.vendor_name
+                        ORDER BY created_at DESC, id DESC LIMIT 1)"""
+    ).fetchall()]
+    summary["diff_rows_deleted"] = delete_snapshots(conn, orphaned)
+
+    now = now or _utcnow()
+    cutoff = now - timedelta(days=policy.get("keep_all_days", RETENTION_KEEP_ALL_DAYS))
+
+    # Runs that never completed and are too old to be worth resuming
+    stale_runs = [r["run_id"] for r in conn.execute(
+        "SELECT run_id FROM runs WHERE status != 'completed' AND updated_at < ?",
+        (cutoff.strftime(SQL_TIME),),
+    ).fetchall()]
+    for run_id in stale_runs:
+        conn.execute("DELETE FROM run_vendor_results WHERE run_id=?", (run_id,))
+        conn.execute("DELETE FROM run_previews WHERE run_id=?", (run_id,))
+    conn.execute(
+        "DELETE FROM runs WHERE status != 'completed' AND updated_at < ?",
+        (cutoff.strftime(SQL_TIME),),
+    )
+    summary["stale_runs_deleted"] = len(stale_runs)
+
+    # Progress logs, saved results and finished jobs only matter while someone may reconnect
+    conn.execute(
+        """DELETE FROM run_events
+           WHERE run_id IN (SELECT run_id FROM runs WHERE updated_at < ?)
+              OR run_id NOT IN (SELECT run_id FROM runs)""",
+        (cutoff.strftime(SQL_TIME),),
+    )
+    conn.execute(
+        "UPDATE runs SET result=NULL WHERE result IS NOT NULL AND updated_at < ?",
+        (cutoff.strftime(SQL_TIME),),
+    )
+    conn.execute(
+        "DELETE FROM jobs WHERE status IN ('completed', 'failed', 'cancelled') AND finished_at < ?",
+        (cutoff.strftime(SQL_TIME),),
+    )
+    # Rendered report fragments are a cache; anything missing is re-rendered on demand
+    conn.execute(
+        "DELETE FROM report_fragments WHERE created_at < ?",
+        (cutoff.strftime(SQL_TIME),),
+    )
+    # Profiles are diagnostics for recent runs
+    conn.execute(
+        "DELETE FROM run_profiles WHERE created_at < ?",
+        (cutoff.strftime(SQL_TIME),),
+    )
+
+    # Caches of the scraping politeness layer; anything missing is fetched or rebuilt
+    summary["robots_rows_deleted"] = conn.execute(
+        "DELETE FROM robots_cache WHERE fetched_at < ?",
+        (cutoff.strftime(SQL_TIME),),
+    ).rowcount
+    summary["host_rows_deleted"] = conn.execute(
+        "DELETE FROM host_health WHERE updated_at < ? AND (open_until IS NULL OR open_until <= ?)",
+        (cutoff.strftime(SQL_TIME), now.strftime(SQL_TIME)),
+    ).rowcount
+    # Crawled pages no crawl has reached in a long while are off the site (or its crawl scope)
+    crawl_cutoff = now - timedelta(days=policy.get("keep_weekly_days", RETENTION_KEEP_WEEKLY_DAYS))
+    summary["crawl_rows_deleted"] = conn.execute(
+        "DELETE FROM crawl_pages WHERE checked_at < ?",
+        (crawl_cutoff.strftime(SQL_TIME),),
+    ).rowcount
+    # Crawl checks of runs that never saved a report
+    conn.execute(
+        "DELETE FROM crawl_visits WHERE checked_at < ?",
+        (cutoff.strftime(SQL_TIME),),
+    )
+    # LLM usage backs the spend view, so it lives as long as the oldest reports kept
+    keep_monthly_days = policy.get("keep_monthly_days", RETENTION_KEEP_MONTHLY_DAYS)
+    summary["usage_rows_deleted"] = 0
+    if keep_monthly_days:
+        summary["usage_rows_deleted"] = conn.execute(
+            "DELETE FROM run_usage WHERE created_at < ?",
+            ((now - timedelta(days=keep_monthly_days)).strftime(SQL_TIME),),
+        ).rowcount
+
+    # Raw-source manifests of runs that no longer have a report, once past the keep-all window
+    summary["manifest_rows_deleted"] = conn.execute(
+        """DELETE FROM run_sources
+           WHERE created_at < ?
+             AND run_id NOT IN (SELECT run_id FROM reports WHERE run_id IS NOT NULL)""",
+        (cutoff.strftime(SQL_TIME),),
+    ).rowcount
+    summary["raw_blobs_deleted"] = conn.execute(
+        "DELETE FROM raw_blobs WHERE hash NOT IN (SELECT hash FROM run_sources)"
+    ).rowcount
+
+    expired_traces = _expired_traces(cutoff)
+    summary["traces_deleted"] = len(expired_traces)
+    expired_profiles = _expired_profiles(cutoff)
+    summary["profiles_deleted"] = len(expired_profiles)
+
+    if dry_run:
+        conn.rollback()
+        conn.close()
+        summary.update(dry_run=True, bytes_before=bytes_before, bytes_after=bytes_before, bytes_reclaimed=0)
+        return summary
+
+    conn.commit()
+
+    for path in expired_traces:
+        os.remove(path)
+    for path in expired_profiles:
+        shutil.rmtree(path, ignore_errors=True)
+
+    if stale_runs:
+        from agent.checkpoint import get_checkpointer
+        for run_id in stale_runs:
+            get_checkpointer().delete_thread(run_id)
+
+    # ── Compaction ─────────────────────────────────────────────────────────────
+    conn.execute("INSERT INTO reports_fts(reports_fts) VALUES ('optimize')")
+    conn.execute("INSERT INTO diff_log_fts(diff_log_fts) VALUES ('optimize')")
+    conn.commit()
+
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != AUTO_VACUUM_INCREMENTAL:
+        # Switching auto_vacuum mode only takes effect after one full VACUUM
+        conn.execute(f"PRAGMA auto_vacuum = {AUTO_VACUUM_INCREMENTAL}")
+        conn.execute("VACUUM")
+    else:
+        conn.execute("PRAGMA incremental_vacuum")
+    conn.execute("ANALYZE")
+    conn.commit()
+
+    bytes_after = _db_bytes(conn)
+    conn.close()
+
+    # New reports drift from what the active dictionary was trained on
+    dict_id = retrain_compression_dictionary(0 if retrain_dictionary else DICT_RETRAIN_AFTER_REPORTS)
+    summary["dictionary_retrained"] = dict_id is not None
+
+    summary.update(
+        dry_run=False,
+        bytes_before=bytes_before,
+        bytes_after=bytes_after,
+        bytes_reclaimed=max(bytes_before - bytes_after, 0),
+    )
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply retention policy and compact the intelligence database.")
+    parser.add_argument("--dry-run", action="store_true", help="report what would be deleted without deleting")
+    parser.add_argument("--keep-all-days", type=int, default=RETENTION_KEEP_ALL_DAYS)
+    parser.add_argument("--keep-weekly-days", type=int, default=RETENTION_KEEP_WEEKLY_DAYS)
+    parser.add_argument("--keep-monthly-days", type=int, default=RETENTION_KEEP_MONTHLY_DAYS)
+    parser.add_argument("--local-only-days", type=int, default=RETENTION_LOCAL_ONLY_DAYS)
+    parser.add_argument("--retrain-dictionary", action="store_true",
+                        help="retrain the compression dictionary even if few reports are new")
+    args = parser.parse_args(argv)
+
+    summary = run_retention(
+        dry_run=args.dry_run,
+        retrain_dictionary=args.retrain_dictionary,
+        keep_all_days=args.keep_all_days,
+        keep_weekly_days=args.keep_weekly_days,
+        keep_monthly_days=args.keep_monthly_days,
+        local_only_days=args.local_only_days,
+    )
+
+    prefix = "[dry run] would delete" if summary["dry_run"] else "Deleted"
+    print(f"{prefix} {summary['reports_deleted']} report(s), {summary['diff_rows_deleted']} diff row(s), "
+          f"{summary['manifest_rows_deleted']} manifest row(s), {summary['raw_blobs_deleted']} raw blob(s), "
+          f"{summary['stale_runs_deleted']} unfinished run(s), {summary['traces_deleted']} trace file(s), "
+          f"{summary['profiles_deleted']} run profile(s), {summary['crawl_rows_deleted']} crawled page(s), "
+          f"{summary['usage_rows_deleted']} usage row(s), "
+          f"{summary['robots_rows_deleted'] + summary['host_rows_deleted']} host cache row(s)")
+    if not summary["dry_run"]:
+        print(f"Database size: {summary['bytes_before']:,} → {summary['bytes_after']:,} bytes "
+              f"({summary['bytes_reclaimed']:,} reclaimed)")
+        if summary["dictionary_retrained"]:
+            print("Retrained the compression dictionary")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""
+The tests run the real pipeline offline, on the benchmark fakes (benchmarks/fakes.py).
+configure_environment() has to run before any project module is imported, so
+it runs here, when pytest loads this file; the whole session shares one
+scratch database.
+"""
+import tempfile
+from benchmarks.fakes import configure_environment
+
+configure_environment(tempfile.mkdtemp(prefix="compintel-test-"))
+
+import itertools  # noqa: E402
+import pytest  # noqa: E402
+
+_vendor_ids = itertools.count()
+
+
+@pytest.fixture(scope="session", autouse=True)
+def database():
+    from db.database import init_db
+    init_db()
+
+
+@pytest.fixture
+def vendor():
+    """A fresh competitor with every source configured; each test gets its own hosts."""
+    from db.database import add_competitor
+    i = next(_vendor_ids)
+    name = f"Test vendor {i:03d}"
+    add_competitor(
+        name,
+        website_url=f"https://test{i}.example/",
+        blog_url=f"https://test{i}.example/blog",
+        docs_url=f"https://docs.test{i}.example/",
+        changelog_url=f"https://test{i}.example/changelog",
+        youtube_channel=f"@test{i}",
+    )
+    return name
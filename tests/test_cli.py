@@ -0,0 +1,10 @@
+from agent.cli import EXIT_OK, main
+from benchmarks.fakes import install_io_fakes
+
+
+def test_clean_run_with_scrapbook_images_exits_ok(vendor, capsys):
+    calls = install_io_fakes(page_chars=2000, images_per_doc=2)
+
+    assert main(["-q", "Pricing", "-v", vendor]) == EXIT_OK
+    assert calls["drive.image"] > 0   # the synthesizer did get images
+    assert '"status": "completed"' in capsys.readouterr().out
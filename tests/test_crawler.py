@@ -0,0 +1,59 @@
+from agent.graph import run_agent
+from agent.nodes.synthesizer import SOURCE_MARKER
+from benchmarks.fakes import FakeLLM, install_io_fakes
+from db.database import get_competitor_by_name, get_crawl_page
+
+
+class RecordingLLM(FakeLLM):
+    """FakeLLM that keeps the prompt text of every call."""
+
+    def __init__(self):
+        super().__init__()
+        self.prompts = []
+
+    def invoke(self, messages, *args, **kwargs):
+        self.prompts.append(messages[-1].content)
+        return super().invoke(messages, *args, **kwargs)
+
+
+class FailingLLM(FakeLLM):
+    def invoke(self, messages, *args, **kwargs):
+        raise RuntimeError("LLM unavailable")
+
+
+def test_crawled_articles_reach_the_synthesis_prompt(vendor):
+    llm = RecordingLLM()
+    install_io_fakes(page_chars=30000, images_per_doc=0, llm=llm)   # landing pages far over their budget
+    article = get_competitor_by_name(vendor)["blog_url"] + "/post-0"
+
+    state = run_agent([vendor], "Pricing")
+
+    assert f"--- Source: {article} ---" in state["raw_data"][0]["crawled_content"]
+    assert f"--- Source: {article} ---" in llm.prompts[0]
+
+
+def test_articles_stay_new_until_a_report_carries_them(vendor):
+    article = get_competitor_by_name(vendor)["blog_url"] + "/post-0"
+
+    install_io_fakes(page_chars=2000, images_per_doc=0, llm=FailingLLM())
+    run_agent([vendor], "Pricing")
+    assert get_crawl_page(article, 7) is None   # fetched, but the vendor never made it into the report
+
+    install_io_fakes(page_chars=2000, images_per_doc=0)
+    state = run_agent([vendor], "Pricing")
+    assert f"--- Source: {article} ---" in state["raw_data"][0]["crawled_content"]
+    assert get_crawl_page(article, 7)["recent"]
+
+
+def test_articles_cut_from_the_prompt_stay_new(vendor):
+    install_io_fakes(page_chars=3000, images_per_doc=0)   # a few crawled pages overflow SOURCE_CHARS["crawled"]
+    state = run_agent([vendor], "Pricing")
+    crawled = SOURCE_MARKER.findall(state["raw_data"][0]["crawled_content"])
+    prompted = state["syntheses"][0]["crawled_urls"]
+
+    assert 0 < len(prompted) < len(crawled)
+    assert [url for url in crawled if get_crawl_page(url, 7)] == prompted
+
+    state = run_agent([vendor], "Pricing")
+    left_out = [url for url in crawled if url not in prompted]
+    assert left_out[0] in SOURCE_MARKER.findall(state["raw_data"][0]["crawled_content"])
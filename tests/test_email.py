@@ -0,0 +1,20 @@
+import subprocess
+import sys
+
+from agent import cassette
+from agent.tools.email_tool import send_report_email
+
+
+def test_mailer_does_not_import_the_agent():
+    code = "import sys, mailer.emailer; print(sorted(m for m in sys.modules if m.split('.')[0] == 'agent'))"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    assert out.strip() == "[]"
+
+
+def test_report_emails_are_replayed_from_the_cassette(tmp_path, monkeypatch):
+    monkeypatch.setitem(cassette._config, "mode", cassette.REPLAY)
+    monkeypatch.setitem(cassette._config, "path", str(tmp_path / "empty.jsonl"))
+    monkeypatch.setattr(cassette, "_tape", None)
+    (tmp_path / "empty.jsonl").write_text("")
+
+    assert send_report_email(["pm@example.com"], "# Report") == {"success": False, "error": "Email not in cassette"}
@@ -0,0 +1,20 @@
+import cProfile
+
+from agent import profiling
+from db.database import get_run_profiles
+
+
+class BusyProfile(cProfile.Profile):
+    """A profiler that can't start, as on Python 3.12+ while another one is active."""
+    def enable(self, *args, **kwargs):
+        raise ValueError("Another profiling tool is already active")
+
+
+def test_node_runs_unprofiled_when_profiler_is_taken(monkeypatch):
+    monkeypatch.setattr(profiling.cProfile, "Profile", BusyProfile)
+
+    assert profiling.profile_node("profile-busy-run", "synthesizer", lambda x: x * 2, 21) == 42
+
+    [summary] = get_run_profiles("profile-busy-run")
+    assert summary["node_profiled"] is False
+    assert summary["hotspots"] == []
@@ -0,0 +1,29 @@
+from agent import report_fragments
+from agent.report_fragments import fragment_hash, get_fragments, render_fragment
+
+
+def _synthesis(vendor):
+    return {"vendor_name": vendor, **{field: f"{field} notes" for _, field in report_fragments.INTELLIGENCE_SECTIONS}}
+
+
+def test_rendering_changes_change_the_fragment_version(monkeypatch):
+    version = report_fragments._fragment_version()
+    assert version == report_fragments.FRAGMENT_VERSION
+
+    renamed = [("### 💵 Pricing", field) if field == "pricing_signals" else (heading, field)
+               for heading, field in report_fragments.INTELLIGENCE_SECTIONS]
+    monkeypatch.setattr(report_fragments, "INTELLIGENCE_SECTIONS", renamed)
+    assert report_fragments._fragment_version() != version
+
+    monkeypatch.undo()
+    monkeypatch.setattr(report_fragments, "render_fragment", lambda synthesis, diff: {})
+    assert report_fragments._fragment_version() != version
+
+
+def test_fragments_of_another_version_are_not_reused(vendor, monkeypatch):
+    synthesis = _synthesis(vendor)
+    digest = fragment_hash(synthesis, None)
+    assert get_fragments([synthesis], {}) == [render_fragment(synthesis, None)]
+
+    monkeypatch.setattr(report_fragments, "FRAGMENT_VERSION", "older")
+    assert fragment_hash(synthesis, None) != digest
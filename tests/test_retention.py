@@ -0,0 +1,53 @@
+from datetime import datetime
+
+from db.database import get_connection, save_diff_log, save_report
+from db.retention import run_retention, select_expired_reports
+
+POLICY = {"keep_all_days": 7, "keep_weekly_days": 30, "keep_monthly_days": 365, "local_only_days": 7}
+NOW = datetime(2026, 6, 30, 12)
+
+
+def _report(vendor, created_at, gdrive_link=""):
+    report_id = save_report(f"{vendor} pricing", [vendor], "Pricing notes.", gdrive_link=gdrive_link)
+    conn = get_connection()
+    conn.execute("UPDATE reports SET created_at=? WHERE id=?", (created_at, report_id))
+    conn.commit()
+    conn.close()
+    return report_id
+
+
+def test_reports_thin_out_with_age(vendor):
+    fresh = _report(vendor, "2026-06-29 09:00:00")
+    week_newest = _report(vendor, "2026-06-17 09:00:00")
+    week_older = _report(vendor, "2026-06-16 09:00:00")            # same ISO week
+    month_newest = _report(vendor, "2026-03-10 09:00:00")
+    month_older = _report(vendor, "2026-03-05 09:00:00")
+    too_old = _report(vendor, "2024-01-01 09:00:00")
+    local_stale = _report(vendor, "2026-06-20 09:00:00", "__local_only__")
+    local_recent = _report(vendor, "2026-06-28 09:00:00", "__local_only__")
+    ours = {fresh, week_newest, week_older, month_newest, month_older, too_old, local_stale, local_recent}
+
+    conn = get_connection()
+    expired = set(select_expired_reports(conn, now=NOW, **POLICY)) & ours
+    conn.close()
+
+    assert expired == {week_older, month_older, too_old, local_stale}
+
+
+def test_latest_snapshot_survives_a_created_at_tie(vendor):
+    for word in ("quokka", "wombat", "numbat"):
+        save_diff_log(None, vendor, f"Snapshot {word}", "delta")   # orphans: no report
+    conn = get_connection()
+    ids = [r["id"] for r in conn.execute("SELECT id FROM diff_log WHERE vendor_name=? ORDER BY id", (vendor,))]
+    conn.execute("UPDATE diff_log SET created_at='2026-06-01 09:00:00' WHERE id=?", (ids[0],))
+    conn.execute("UPDATE diff_log SET created_at='2026-06-02 09:00:00' WHERE id IN (?, ?)", (ids[1], ids[2]))  # a tie
+    conn.commit()
+    conn.close()
+
+    run_retention()
+
+    conn = get_connection()
+    kept = [r["id"] for r in conn.execute("SELECT id FROM diff_log WHERE vendor_name=?", (vendor,))]
+    conn.execute("INSERT INTO diff_log_fts(diff_log_fts) VALUES ('integrity-check')")   # raises if out of sync
+    conn.close()
+    assert kept == [ids[2]]
@@ -0,0 +1,21 @@
+from agent.tools import scraper_tool
+from agent.tools.politeness import HostUnavailable
+from db.database import save_raw_source
+
+
+def test_open_circuit_serves_the_last_fetched_copy(vendor, monkeypatch):
+    url = f"https://{vendor.lower().replace(' ', '-')}.example/pricing"
+    save_raw_source("fetch-run", vendor, "website", url, "[Beta] Usage-based pricing, first tier free.")
+
+    def unavailable(get, url, headers):
+        raise HostUnavailable("pricing.example", 5, "timeout")
+    monkeypatch.setattr(scraper_tool, "polite_get", unavailable)
+
+    # Every later run stores the cached copy again, as web_scraper and source_replay do
+    for i in range(8):
+        page = scraper_tool.scrape_page(url)
+        assert page["placeholder"]
+        save_raw_source(f"outage-run-{i}", vendor, "website", url, page["text"], placeholder=True)
+
+    assert page["text"].endswith("]\n[Beta] Usage-based pricing, first tier free.")
+    assert page["text"].count("Cached copy") == 1
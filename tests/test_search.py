@@ -0,0 +1,32 @@
+import sqlite3
+
+from config.settings import DB_PATH
+from db.database import save_diff_log, save_report, search_reports, search_vendor_snapshots
+
+
+def test_local_only_reports_stay_out_of_search(vendor):
+    published = save_report("zebrafish pricing", [vendor], "Published zebrafish notes.")
+    local = save_report("zebrafish pricing", [vendor], "Local zebrafish notes.", gdrive_link="__local_only__")
+    save_diff_log(published, vendor, "Zebrafish tier launched.", "new tier")
+    save_diff_log(local, vendor, "Zebrafish tier dropped.", "dropped tier")
+
+    assert {r["id"] for r in search_reports("zebrafish", include_local_only=False)} == {published}
+    snapshots = search_vendor_snapshots("zebrafish", vendor_name=vendor, order="newest", include_local_only=False)
+    assert [s["report_id"] for s in snapshots] == [published]
+    assert {r["id"] for r in search_reports("zebrafish")} == {published, local}
+
+
+def test_plain_sqlite_clients_can_write_indexed_tables(vendor):
+    report_id = save_report("axolotl roadmap", [vendor], "Axolotl roadmap details.")
+    save_diff_log(report_id, vendor, "Axolotl SDK shipped.", "sdk")
+
+    # No ci_decompress registered, as in the sqlite3 CLI or a DB browser
+    conn = sqlite3.connect(DB_PATH)
+    conn.execute(
+        "INSERT INTO reports (run_date, research_query, vendors_covered, report_markdown) VALUES ('', 'q', '[]', 'x')"
+    )
+    conn.execute("DELETE FROM diff_log WHERE report_id=?", (report_id,))
+    conn.commit()
+    conn.close()
+
+    assert [r["id"] for r in search_reports("axolotl")] == [report_id]
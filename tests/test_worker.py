@@ -0,0 +1,42 @@
+import threading
+
+from db.database import claim_next_job, enqueue_job, finish_job, get_jobs, heartbeat_job
+
+
+def _claim_together(worker_ids, lease_seconds=60):
+    """claim_next_job from each worker at the same moment, on its own thread and connection."""
+    start = threading.Barrier(len(worker_ids))
+    claims = {}
+
+    def claim(worker_id):
+        start.wait()
+        claims[worker_id] = claim_next_job(worker_id, lease_seconds, max_running=100)
+
+    threads = [threading.Thread(target=claim, args=(w,)) for w in worker_ids]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return claims
+
+
+def test_two_workers_never_claim_the_same_job(vendor):
+    job_id = enqueue_job("Pricing", [vendor], priority=1000)
+
+    claims = _claim_together(["worker-a", "worker-b"])
+
+    winners = [w for w, job in claims.items() if job and job["id"] == job_id]
+    assert len(winners) == 1
+    [job] = [j for j in get_jobs(limit=100) if j["id"] == job_id]
+    assert job["lease_owner"] == winners[0] and job["attempts"] == 1
+    finish_job(job_id, "completed", worker_id=winners[0])
+
+
+def test_expired_lease_moves_to_the_next_worker(vendor):
+    job_id = enqueue_job("Pricing", [vendor], priority=1000)
+    assert claim_next_job("worker-a", 0, max_running=100)["id"] == job_id   # lease lapses at once
+
+    assert claim_next_job("worker-b", 60, max_running=100)["id"] == job_id
+    assert not heartbeat_job(job_id, "worker-a", 60)
+    assert not finish_job(job_id, "completed", worker_id="worker-a")
+    assert finish_job(job_id, "completed", worker_id="worker-b")
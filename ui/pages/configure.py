@@ -1,9 +1,24 @@
 import streamlit as st
 from db.database import (
     get_all_competitors, add_competitor,
-    update_competitor, delete_competitor
+    update_competitor, delete_competitor, set_refresh_interval
 )
-from agent.tools.gdrive_tool import list_scrapbook_vendors
+
+# Scheduled refresh cadence (python -m agent.scheduler) → refresh_interval_hours
+REFRESH_CADENCES = {
+    "Manual only": None,
+    "Daily": 24,
+    "Every 3 days": 72,
+    "Weekly": 168,
+    "Every 2 weeks": 336,
+}
+
+
+def _cadence_label(hours):
+    for label, value in REFRESH_CADENCES.items():
+        if value == hours:
+            return label
+    return f"Every {hours}h"
 
 
 def render():
@@ -26,6 +41,10 @@ def render():
                 blog = st.text_input("Blog URL", placeholder="https://salesforce.com/blog")
                 changelog = st.text_input("Changelog / Release Notes URL", placeholder="https://salesforce.com/releases")
                 youtube = st.text_input("YouTube Channel", placeholder="@SalesforceYT or channel ID")
+            cadence = st.selectbox(
+                "Scheduled refresh", list(REFRESH_CADENCES),
+                help="How often the scheduler re-evaluates this vendor. Runs are skipped when its pages haven't changed.",
+            )
 
             st.caption("💡 Docs and Changelog URLs significantly improve technical depth of the analysis.")
 
@@ -35,7 +54,8 @@ def render():
                     st.error("Vendor name is required.")
                 else:
                     success = add_competitor(
-                        name.strip(), website, blog, docs, changelog, youtube
+                        name.strip(), website, blog, docs, changelog, youtube,
+                        refresh_interval_hours=REFRESH_CADENCES[cadence],
                     )
                     if success:
                         # Feature 4: "Saved" indicator on click
@@ -68,6 +88,7 @@ def render():
     )
 
     try:
+        from agent.tools.gdrive_tool import list_scrapbook_vendors
         scrapbook_vendors = [v.lower() for v in list_scrapbook_vendors()]
     except Exception:
         scrapbook_vendors = []
@@ -84,6 +105,8 @@ def render():
             badges.append("📄 Scrapbook")
         if has_docs:
             badges.append("📚 Docs")
+        if comp.get("refresh_interval_hours"):
+            badges.append(f"🔁 {_cadence_label(comp['refresh_interval_hours'])}")
         badge_str = "  ·  " + "  ".join(badges) if badges else ""
 
         with st.expander(f"🏢  {comp['vendor_name']}{badge_str}", expanded=False):
@@ -98,6 +121,20 @@ def render():
                     new_changelog = st.text_input("Changelog URL", value=comp.get("changelog_url") or "")
                     new_youtube = st.text_input("YouTube Channel", value=comp.get("youtube_channel") or "")
 
+                cadence_options = list(REFRESH_CADENCES)
+                current_cadence = _cadence_label(comp.get("refresh_interval_hours"))
+                if current_cadence not in cadence_options:
+                    cadence_options.append(current_cadence)
+                new_cadence = st.selectbox(
+                    "Scheduled refresh", cadence_options, index=cadence_options.index(current_cadence),
+                    key=f"cadence_{comp['id']}",
+                )
+                if comp.get("refresh_interval_hours"):
+                    st.caption(
+                        f"Last refreshed: {comp.get('last_refreshed_at') or 'never'}  ·  "
+                        f"Next due: {comp.get('next_refresh_at') or 'now'} (UTC)"
+                    )
+
                 col_save, col_delete = st.columns([3, 1])
                 with col_save:
                     if st.form_submit_button("💾  Save Changes", type="primary"):
@@ -105,6 +142,9 @@ def render():
                             comp["id"], new_name, new_website, new_blog,
                             new_docs, new_changelog, new_youtube
                         )
+                        set_refresh_interval(
+                            comp["id"], REFRESH_CADENCES.get(new_cadence, comp.get("refresh_interval_hours"))
+                        )
                         # Feature 4: Saved indicator on edit save too
                         st.markdown("""
                             <div style='display:inline-flex;align-items:center;gap:6px;
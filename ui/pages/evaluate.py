@@ -1,7 +1,24 @@
-import time
+import html
 import streamlit as st
-from db.database import get_all_competitors
-from mailer.emailer import send_report_email
+from agent.deadline import STOP_LABELS, partial_notes
+from agent.tracing import load_trace
+from agent.tools.email_tool import send_report_email
+from agent.worker import submit_run
+from config.settings import RUN_DEADLINE_SECONDS
+from db.database import (
+    get_all_competitors, get_incomplete_runs, get_run, get_run_events, get_run_result, get_job_by_run_id,
+    get_run_previews, get_run_usage_totals, request_cancel,
+)
+
+PROGRESS_POLL_SECONDS = 1.0   # also caps how often streamed LLM text is redrawn
+STREAM_TAIL_CHARS = 600       # of each vendor's in-flight output
+WATERFALL_MAX_SPANS = 400
+
+# Waterfall bar colour per span name
+SPAN_COLORS = {
+    "run": "#94a3b8", "node": "#1a56db", "vendor": "#7c3aed", "llm": "#d97706",
+    "http.scrape": "#15803d", "youtube.transcript": "#dc2626", "youtube.search": "#dc2626",
+}
 
 
 # ── Custom CSS — Warm Neutral light theme overrides ───────────────────────────
@@ -134,6 +151,24 @@ def render():
                 unsafe_allow_html=True
             )
 
+    col_profile, col_deadline = st.columns([2, 3])
+    with col_profile:
+        profile = st.checkbox(
+            "🔬  Profile this run",
+            value=False,
+            help="Profiles each pipeline step (CPU hotspots and memory allocations). "
+                 "Slows the run down a little; results appear under History → Profiled Runs.",
+        )
+    with col_deadline:
+        deadline_minutes = st.number_input(
+            "⏱️  Deadline (minutes, 0 = none)",
+            min_value=0,
+            value=RUN_DEADLINE_SECONDS // 60,
+            step=5,
+            help="As the deadline nears the run skips YouTube, sends scrapbook images at low detail and "
+                 "shortens sources; at the deadline it stops and writes a partial report.",
+        )
+
     st.markdown("<br>", unsafe_allow_html=True)
 
     # ── Run Button ─────────────────────────────────────────────────────────────
@@ -148,134 +183,226 @@ def render():
         if not research_query.strip():
             st.warning("Please enter a research focus before running.")
             return
-        _run_with_progress(selected_vendors, research_query, save_to_drive)
+        _follow_run(submit_run(selected_vendors, research_query, save_to_drive, profile=profile,
+                               deadline_seconds=int(deadline_minutes * 60)))
+
+    active_run_id = st.session_state.get("active_run_id") or st.query_params.get("run")
+    if active_run_id:
+        _render_active_run(active_run_id)
+
+    # ── Resume Incomplete Runs ─────────────────────────────────────────────────
+    incomplete = get_incomplete_runs(limit=5)
+    if incomplete and not run_button:
+        with st.expander(f"↻  Incomplete runs ({len(incomplete)})", expanded=False):
+            for run in incomplete:
+                col_info, col_resume = st.columns([4, 1])
+                with col_info:
+                    error = f" — {run['error'][:80]}" if run.get("error") else ""
+                    st.markdown(
+                        f"<p style='font-size:13px;color:#475569;margin:6px 0 0 0'>"
+                        f"<b>{run['status'].title()}</b> · {run['updated_at']} · "
+                        f"{(run['research_query'] or '')[:60]}</p>"
+                        f"<p style='font-size:12px;color:#94a3b8;margin:0'>"
+                        f"{', '.join(run['vendors'])}{error}</p>",
+                        unsafe_allow_html=True
+                    )
+                with col_resume:
+                    if st.button("↻ Resume run", key=f"resume_{run['run_id']}", use_container_width=True):
+                        _follow_run(submit_run(
+                            run["vendors"], run["research_query"], bool(run["save_to_drive"]),
+                            resume_run_id=run["run_id"],
+                        ))
 
     # ── Display Results ────────────────────────────────────────────────────────
     if "agent_result" in st.session_state:
         _render_results(st.session_state["agent_result"])
 
 
-def _run_with_progress(selected_vendors, research_query, save_to_drive):
-    from agent.graph import stream_agent, PIPELINE_STEPS, STEP_LABELS
+def _follow_run(run_id):
+    """Track a submitted run in this session and in the URL, so a reload reconnects to it."""
+    st.session_state["active_run_id"] = run_id
+    st.session_state.pop("agent_result", None)
+    st.session_state.pop("agent_result_run_id", None)
+    st.query_params["run"] = run_id
+    st.rerun()
+
+
+def _run_outcome(run_id):
+    """
+    "completed", "stopped" (failed / interrupted, nothing queued to continue it),
+    "cancelled" (stopped before a worker picked it up) or "pending".
+    """
+    run = get_run(run_id)
+    if run and run["status"] == "completed":
+        return run, "completed"
+    job = get_job_by_run_id(run_id)
+    if job and job["status"] in ("queued", "running"):
+        return run, "pending"
+    if job and job["status"] == "cancelled" and not run:
+        return run, "cancelled"
+    if run and run["status"] in ("failed", "interrupted"):
+        return run, "stopped"
+    return run, "pending"
+
+
+def _render_active_run(run_id):
+    """Show the followed run: its results once completed, else live progress."""
+    if st.session_state.get("agent_result_run_id") == run_id:
+        return
 
-    total_steps = len(PIPELINE_STEPS)
+    run, outcome = _run_outcome(run_id)
+    if outcome == "completed":
+        result = get_run_result(run_id)
+        if result:
+            st.session_state["agent_result"] = result
+            st.session_state["agent_result_run_id"] = run_id
+        else:
+            st.error("Agent completed but returned no result.")
+        return
+    if outcome == "cancelled":
+        st.info("Evaluation cancelled before it started.")
+        return
+    if outcome == "stopped":
+        st.error(
+            f"Evaluation {run['status']}: {run.get('error') or 'stopped before finishing'} — "
+            "completed steps were saved; resume it from **Incomplete runs**."
+        )
+        return
 
-    # ── UI placeholders ────────────────────────────────────────────────────────
-    # Progress bar + percentage on same row
-    prog_col, pct_col = st.columns([11, 1])
-    with prog_col:
-        progress_bar = st.progress(0)
-    with pct_col:
-        pct_text = st.empty()
+    _render_run_progress(run_id)
 
-    status_text  = st.empty()
-    live_preview = st.empty()   # streams partial synthesis as it arrives
 
-    pct_text.markdown(
-        "<p style='font-family:JetBrains Mono,monospace;font-size:13px;"
-        "font-weight:600;color:#94a3b8;text-align:right;margin-top:6px'>0%</p>",
-        unsafe_allow_html=True
-    )
+@st.fragment(run_every=PROGRESS_POLL_SECONDS)
+def _render_run_progress(run_id):
+    """Polls run_events while the run executes on a background worker."""
+    from agent.graph import PIPELINE_STEPS, STEP_LABELS
 
-    try:
-        analysis_start = time.time()
-        result = None
-        completed = 0
-
-        for node_name, partial_state in stream_agent(
-            selected_vendors, research_query, save_to_drive=save_to_drive
-        ):
-            if node_name == "__end__":
-                result = partial_state
-                break
-
-            # Advance real progress
-            if node_name in PIPELINE_STEPS:
-                completed = PIPELINE_STEPS.index(node_name) + 1
-            pct = int((completed / total_steps) * 100)
-            progress_bar.progress(completed / total_steps)
-            pct_text.markdown(
-                f"<p style='font-family:JetBrains Mono,monospace;font-size:13px;"
-                f"font-weight:700;color:#1a56db;text-align:right;margin-top:6px'>{pct}%</p>",
-                unsafe_allow_html=True
-            )
+    run, outcome = _run_outcome(run_id)
+    if outcome != "pending":
+        st.rerun(scope="app")   # finished or failed — let the page render the outcome
 
-            icon, label = STEP_LABELS.get(node_name, ("⚙️", node_name))
+    events = get_run_events(run_id)
+    completed = max((PIPELINE_STEPS.index(e["node"]) + 1 for e in events if e["node"] in PIPELINE_STEPS), default=0)
+    pct = int((completed / len(PIPELINE_STEPS)) * 100)
 
-            # Show what just completed
-            status_text.markdown(
-                f"<p style='color:#64748b;font-size:13px;font-weight:500'>"
-                f"<span style='color:#15803d'>✓</span>&nbsp; <b>{icon} {label}</b> — done</p>",
-                unsafe_allow_html=True
-            )
+    # Progress bar + percentage on same row
+    prog_col, pct_col = st.columns([11, 1])
+    with prog_col:
+        st.progress(completed / len(PIPELINE_STEPS))
+    with pct_col:
+        st.markdown(
+            f"<p style='font-family:JetBrains Mono,monospace;font-size:13px;"
+            f"font-weight:700;color:{'#1a56db' if completed else '#94a3b8'};text-align:right;margin-top:6px'>{pct}%</p>",
+            unsafe_allow_html=True
+        )
 
-            # ── Live preview: stream synthesis results as they arrive ──────────
-            syntheses = partial_state.get("syntheses", [])
-            if syntheses and node_name == "synthesizer":
-                preview_lines = []
-                for s in syntheses:
-                    vendor = s.get("vendor_name", "")
-                    launches = (s.get("recent_launches") or "")[:300]
-                    if launches:
-                        preview_lines.append(
-                            f"<div style='margin-bottom:12px'>"
-                            f"<span style='font-size:11px;font-weight:700;letter-spacing:0.06em;"
-                            f"text-transform:uppercase;color:#1a56db'>{vendor}</span>"
-                            f"<p style='font-size:13px;color:#475569;margin:4px 0 0 0;"
-                            f"line-height:1.6'>{launches}…</p>"
-                            f"</div>"
-                        )
-                if preview_lines:
-                    live_preview.markdown(
-                        "<div style='background:#ffffff;border:1px solid #e8e4dd;border-radius:10px;"
-                        "padding:16px 20px;margin-top:8px'>"
-                        "<p style='font-size:11px;font-weight:700;letter-spacing:0.07em;"
-                        "text-transform:uppercase;color:#94a3b8;margin:0 0 12px 0'>"
-                        "⚡ Live Preview — Synthesis in progress</p>"
-                        + "".join(preview_lines) + "</div>",
-                        unsafe_allow_html=True
-                    )
+    _render_stop_button(run_id, run)
 
-        # ── Done ──────────────────────────────────────────────────────────────
-        analysis_duration = round(time.time() - analysis_start, 1)
+    if not run or run["status"] != "running":
+        st.markdown(
+            "<p style='color:#64748b;font-size:13px;font-weight:500'>"
+            "⏳&nbsp; Queued — waiting for a free worker</p>",
+            unsafe_allow_html=True
+        )
+        return
 
-        progress_bar.progress(1.0)
-        pct_text.markdown(
-            "<p style='font-family:JetBrains Mono,monospace;font-size:13px;"
-            "font-weight:700;color:#15803d;text-align:right;margin-top:6px'>100%</p>",
+    if events:
+        # Show what just completed
+        icon, label = STEP_LABELS.get(events[-1]["node"], ("⚙️", events[-1]["node"]))
+        st.markdown(
+            f"<p style='color:#64748b;font-size:13px;font-weight:500'>"
+            f"<span style='color:#15803d'>✓</span>&nbsp; <b>{icon} {label}</b> — done</p>",
+            unsafe_allow_html=True
+        )
+    else:
+        st.markdown(
+            "<p style='color:#64748b;font-size:13px;font-weight:500'>⚙️&nbsp; Starting…</p>",
             unsafe_allow_html=True
         )
-        status_text.markdown(
-            "<p style='color:#15803d;font-size:13px;font-weight:700'>"
-            "✓&nbsp; Intelligence evaluation complete</p>",
+
+    # ── Live preview: synthesis results as they arrive ─────────────────────────
+    preview_lines = []
+    for event in events:
+        for item in event["data"].get("preview", []):
+            if item.get("recent_launches"):
+                preview_lines.append(
+                    f"<div style='margin-bottom:12px'>"
+                    f"<span style='font-size:11px;font-weight:700;letter-spacing:0.06em;"
+                    f"text-transform:uppercase;color:#1a56db'>{item['vendor_name']}</span>"
+                    f"<p style='font-size:13px;color:#475569;margin:4px 0 0 0;"
+                    f"line-height:1.6'>{item['recent_launches']}…</p>"
+                    f"</div>"
+                )
+    if preview_lines:
+        st.markdown(
+            "<div style='background:#ffffff;border:1px solid #e8e4dd;border-radius:10px;"
+            "padding:16px 20px;margin-top:8px'>"
+            "<p style='font-size:11px;font-weight:700;letter-spacing:0.07em;"
+            "text-transform:uppercase;color:#94a3b8;margin:0 0 12px 0'>"
+            "⚡ Live Preview — Synthesis in progress</p>"
+            + "".join(preview_lines) + "</div>",
             unsafe_allow_html=True
         )
-        time.sleep(0.8)
+    _render_streaming(run_id, {e["node"] for e in events})
+    st.caption("Runs in the background — you can leave or reload this page and come back to it.")
 
-        # Clear progress UI
-        progress_bar.empty()
-        pct_text.empty()
-        status_text.empty()
-        live_preview.empty()
 
-        if result:
-            result["analysis_duration_seconds"] = analysis_duration
-            result["save_to_drive"] = save_to_drive
-            st.session_state["agent_result"] = result
-        else:
-            st.error("Agent completed but returned no result.")
+def _render_stop_button(run_id, run):
+    """Stop the run: outstanding calls are abandoned and a partial report is written from what completed."""
+    if run and run.get("cancel_requested"):
+        st.markdown(
+            "<p style='color:#b45309;font-size:13px;font-weight:500'>"
+            "⏹&nbsp; Stopping — writing a partial report from what has completed…</p>",
+            unsafe_allow_html=True
+        )
+    elif st.button("⏹  Stop run", key=f"stop_{run_id}"):
+        request_cancel(run_id)
+        st.rerun(scope="app")
 
-    except Exception as e:
-        progress_bar.empty()
-        pct_text.empty()
-        status_text.empty()
-        live_preview.empty()
-        st.error(f"Evaluation failed: {str(e)}")
+
+def _render_streaming(run_id, finished_nodes):
+    """Per-vendor LLM output streamed so far by the node that is still running."""
+    from agent.graph import STEP_LABELS
+
+    previews = [p for p in get_run_previews(run_id) if p["node"] not in finished_nodes and p["text"]]
+    if not previews:
+        return
+
+    icon, label = STEP_LABELS.get(previews[0]["node"], ("⚙️", previews[0]["node"]))
+    cards = []
+    for preview in previews:
+        text = preview["text"]
+        tail = ("…" if len(text) > STREAM_TAIL_CHARS else "") + text[-STREAM_TAIL_CHARS:]
+        cards.append(
+            f"<div style='margin-bottom:12px'>"
+            f"<span style='font-size:11px;font-weight:700;letter-spacing:0.06em;"
+            f"text-transform:uppercase;color:#1a56db'>{html.escape(preview['vendor_name'] or 'General')}</span>"
+            f"<p style='font-size:13px;color:#475569;margin:4px 0 0 0;line-height:1.6;"
+            f"white-space:pre-wrap'>{html.escape(tail)}▍</p>"
+            f"</div>"
+        )
+    st.markdown(
+        "<div style='background:#ffffff;border:1px solid #e8e4dd;border-radius:10px;"
+        "padding:16px 20px;margin-top:8px'>"
+        "<p style='font-size:11px;font-weight:700;letter-spacing:0.07em;"
+        "text-transform:uppercase;color:#94a3b8;margin:0 0 12px 0'>"
+        f"✍️ Writing now — {icon} {label}</p>"
+        + "".join(cards) + "</div>",
+        unsafe_allow_html=True
+    )
 
 
 def _render_results(result: dict):
     st.divider()
 
+    partial = result.get("partial_vendors") or []
+    if partial:
+        reason = STOP_LABELS.get(result.get("stopped"), "run deadline near")
+        st.warning(
+            f"⏱️ Partial report ({reason}) — "
+            + " · ".join(f"**{vendor_name}**: {notes}" for vendor_name, notes in partial_notes(partial).items())
+        )
+
     # ── Timing Display ─────────────────────────────────────────────────────────
     analysis_secs = result.get("analysis_duration_seconds", 0)
     drive_secs = result.get("drive_duration_seconds", 0)
@@ -326,6 +453,20 @@ def _render_results(result: dict):
                     <div class='timing-sub'>{vendor_count} vendor(s) analyzed</div>
                 </div>""", unsafe_allow_html=True)
 
+    usage = get_run_usage_totals(result["run_id"]) if result.get("run_id") else None
+    if usage and usage["calls"]:
+        st.caption(
+            f"💰 ${usage['cost_usd']:.4f} · {usage['input_tokens']:,} input tokens "
+            f"({usage['cached_tokens']:,} cached, ~{usage['image_tokens']:,} image) · "
+            f"{usage['output_tokens']:,} output tokens · {usage['calls']} LLM call(s)"
+        )
+
+    # ── Trace Waterfall ─────────────────────────────────────────────────────
+    spans = load_trace(result["run_id"]) if result.get("run_id") else []
+    if spans:
+        with st.expander("⏱️ Where the time went", expanded=False):
+            _render_waterfall(spans)
+
     # ── Warnings ────────────────────────────────────────────────────────────
     if result.get("errors"):
         with st.expander("⚠️ Run Warnings", expanded=False):
@@ -400,6 +541,67 @@ def _render_results(result: dict):
         _render_email_modal(result)
 
 
+def _span_label(s: dict) -> str:
+    attrs = s["attributes"]
+    if s["name"] == "node":
+        return attrs.get("node", "node")
+    if s["name"] == "vendor":
+        return attrs.get("vendor", "vendor") + (" (cached)" if attrs.get("cache_hit") else "")
+    detail = attrs.get("url") or attrs.get("video_id") or attrs.get("doc_id") or attrs.get("object_id") \
+        or attrs.get("filename") or attrs.get("channel_handle") or attrs.get("vendor") or ""
+    if s["name"] == "llm" and attrs.get("output_tokens") is not None:
+        detail += f" · {attrs.get('input_tokens', 0):,}→{attrs['output_tokens']:,} tok"
+    return f"{s['name']} {detail}".strip()
+
+
+def _render_waterfall(spans: list[dict]):
+    """Nested spans of the run as horizontal bars on a shared timeline."""
+    t0 = min(s["start_time_unix_nano"] for s in spans)
+    total = max(max(s["end_time_unix_nano"] for s in spans) - t0, 1)
+
+    # Time per span kind, slowest first
+    by_name = {}
+    for s in spans:
+        if s["name"] != "run":
+            count, ns = by_name.get(s["name"], (0, 0))
+            by_name[s["name"]] = (count + 1, ns + s["end_time_unix_nano"] - s["start_time_unix_nano"])
+    st.caption(" · ".join(
+        f"**{name}** {ns / 1e9:.1f}s ({count}×)"
+        for name, (count, ns) in sorted(by_name.items(), key=lambda kv: -kv[1][1])
+    ))
+
+    parents = {s["span_id"]: s["parent_span_id"] for s in spans}
+
+    def depth(span_id):
+        d = 0
+        while parents.get(span_id):
+            span_id, d = parents[span_id], d + 1
+        return d
+
+    ordered = sorted(spans, key=lambda s: s["start_time_unix_nano"])
+    rows = []
+    for s in ordered[:WATERFALL_MAX_SPANS]:
+        start = (s["start_time_unix_nano"] - t0) / total * 100
+        width = max((s["end_time_unix_nano"] - s["start_time_unix_nano"]) / total * 100, 0.3)
+        failed = s["status"]["code"] == "ERROR"
+        color = "#dc2626" if failed else SPAN_COLORS.get(s["name"], "#0891b2")
+        title = html.escape(s["status"]["message"] or _span_label(s), quote=True)
+        rows.append(
+            f"<div style='display:flex;align-items:center;font-size:11px;line-height:18px' title='{title}'>"
+            f"<div style='width:38%;padding-left:{depth(s['span_id']) * 10}px;white-space:nowrap;"
+            f"overflow:hidden;text-overflow:ellipsis;color:#475569'>{html.escape(_span_label(s))}</div>"
+            f"<div style='width:52%;position:relative;height:10px'>"
+            f"<div style='position:absolute;left:{start:.2f}%;width:{width:.2f}%;height:10px;"
+            f"border-radius:2px;background:{color}'></div></div>"
+            f"<div style='width:10%;text-align:right;font-family:JetBrains Mono,monospace;color:#64748b'>"
+            f"{(s['end_time_unix_nano'] - s['start_time_unix_nano']) / 1e9:.2f}s</div>"
+            f"</div>"
+        )
+    st.markdown("<div>" + "".join(rows) + "</div>", unsafe_allow_html=True)
+    if len(ordered) > WATERFALL_MAX_SPANS:
+        st.caption(f"Showing the first {WATERFALL_MAX_SPANS} of {len(ordered)} spans.")
+
+
 def _render_email_modal(result: dict):
     st.markdown("---")
     with st.form("email_form"):
@@ -1,6 +1,15 @@
 import streamlit as st
 import json
-from db.database import get_all_reports, get_report_by_id
+from datetime import datetime, timedelta, timezone
+from db.database import (
+    get_report_history, get_report_by_id, count_reports,
+    search_reports, search_vendor_snapshots,
+    get_usage_by_vendor, get_usage_daily, get_usage_sources,
+    get_profiled_runs, get_run_profiles,
+)
+
+PAGE_SIZES = [10, 25, 50, 100]
+SPEND_PERIODS = {7: "Last 7 days", 30: "Last 30 days", 90: "Last 90 days", 365: "Last year"}
 
 
 def _is_valid_drive_link(link: str) -> bool:
@@ -16,6 +25,152 @@ def _is_valid_drive_link(link: str) -> bool:
     return True
 
 
+def _render_search_results(query: str):
+    col_order, col_vendor = st.columns([1, 1])
+    with col_order:
+        order = st.radio(
+            "Order",
+            ["rank", "oldest", "newest"],
+            format_func={"rank": "Best match", "oldest": "Oldest first", "newest": "Newest first"}.get,
+            horizontal=True,
+            label_visibility="collapsed",
+        )
+    with col_vendor:
+        vendor_filter = st.text_input("Vendor", placeholder="Filter snapshots by vendor (optional)",
+                                      label_visibility="collapsed")
+
+    report_hits = search_reports(query, limit=20, order=order, include_local_only=False)
+    vendor_hits = search_vendor_snapshots(query, vendor_name=vendor_filter.strip() or None,
+                                          limit=20, order=order)
+
+    tab_reports, tab_vendors = st.tabs([
+        f"📄 Reports ({len(report_hits)})",
+        f"🏢 Vendor Snapshots ({len(vendor_hits)})",
+    ])
+    with tab_reports:
+        if not report_hits:
+            st.caption("No matching reports.")
+        for hit in report_hits:
+            st.markdown(
+                f"**📅 {hit['run_date']}** · {(hit['research_query'] or '')[:65]}  \n{hit['snippet']}"
+            )
+            if st.button("📄 View Report", key=f"search_view_{hit['id']}"):
+                st.session_state["viewing_report_id"] = hit["id"]
+    with tab_vendors:
+        if not vendor_hits:
+            st.caption("No matching vendor snapshots.")
+        for hit in vendor_hits:
+            st.markdown(f"**🏢 {hit['vendor_name']}** · {hit['created_at']}  \n{hit['snippet']}")
+            if hit.get("report_id") and st.button("📄 View Report", key=f"search_snap_{hit['id']}"):
+                st.session_state["viewing_report_id"] = hit["report_id"]
+
+
+def _render_spend():
+    """LLM tokens and cost per vendor over time, from run_usage."""
+    days = st.selectbox("Period", list(SPEND_PERIODS), index=1, format_func=SPEND_PERIODS.get,
+                        key="spend_period", label_visibility="collapsed")
+    since = (datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
+
+    usage = get_usage_by_vendor(since)
+    if not usage:
+        st.caption("No LLM calls recorded in this period.")
+        return
+
+    by_vendor = {}
+    for row in usage:
+        v = by_vendor.setdefault(row["vendor_name"], {
+            "Vendor": row["vendor_name"], "Runs": 0, "Calls": 0, "Input tokens": 0,
+            "Cached": 0, "Image tokens": 0, "Output tokens": 0, "Cost ($)": 0.0,
+        })
+        v["Runs"] = max(v["Runs"], row["runs"])
+        v["Calls"] += row["calls"]
+        v["Input tokens"] += row["input_tokens"] or 0
+        v["Cached"] += row["cached_tokens"] or 0
+        v["Image tokens"] += row["image_tokens"] or 0
+        v["Output tokens"] += row["output_tokens"] or 0
+        v["Cost ($)"] += row["cost_usd"] or 0
+    vendors = sorted(by_vendor.values(), key=lambda v: -v["Cost ($)"])
+    for v in vendors:
+        v["Cost / run ($)"] = round(v["Cost ($)"] / v["Runs"], 4) if v["Runs"] else 0
+        v["Cost ($)"] = round(v["Cost ($)"], 4)
+
+    total_cost = sum(v["Cost ($)"] for v in vendors)
+    total_input = sum(v["Input tokens"] for v in vendors)
+    total_cached = sum(v["Cached"] for v in vendors)
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Spend", f"${total_cost:,.2f}")
+    c2.metric("Tokens", f"{total_input + sum(v['Output tokens'] for v in vendors):,}")
+    c3.metric("Cached input", f"{total_cached / total_input:.0%}" if total_input else "—")
+
+    st.bar_chart(get_usage_daily(since), x="day", y="cost_usd", color="vendor_name",
+                 x_label="", y_label="Cost ($)")
+    st.dataframe(vendors, hide_index=True, use_container_width=True)
+
+    node_rows = [
+        {"Vendor": row["vendor_name"], "Node": row["node"], "Calls": row["calls"],
+         "Tokens": (row["input_tokens"] or 0) + (row["output_tokens"] or 0),
+         "Cost ($)": round(row["cost_usd"] or 0, 4)}
+        for row in usage
+    ]
+    source_tokens = {}
+    for row in get_usage_sources(since):
+        # Attribute each synthesis call's input tokens to its sources by prompt share
+        chars = sum(row["sources"].values()) or 1
+        for kind, n in row["sources"].items():
+            source_tokens[kind] = source_tokens.get(kind, 0) + (row["input_tokens"] or 0) * n / chars
+
+    col_nodes, col_sources = st.columns([3, 2])
+    with col_nodes:
+        st.caption("By vendor and node")
+        st.dataframe(node_rows, hide_index=True, use_container_width=True)
+    with col_sources:
+        st.caption("Synthesis input tokens by source (estimated from prompt share)")
+        st.dataframe(
+            [{"Source": kind, "Tokens": int(n)} for kind, n in sorted(source_tokens.items(), key=lambda kv: -kv[1])],
+            hide_index=True, use_container_width=True,
+        )
+
+
+def _render_profiles():
+    """Hotspots of recently profiled runs, from run_profiles (see agent/profiling.py)."""
+    runs = get_profiled_runs()
+    if not runs:
+        st.caption("No profiled runs yet. Tick **Profile this run** on the Evaluate page, "
+                   "or set PROFILING_ENABLED=true.")
+        return
+
+    labels = {
+        r["run_id"]: f"{r['profiled_at']}  ·  {(r['research_query'] or '')[:50]}  ·  "
+                     f"{len(r['vendors'])} vendor(s)  ·  {r['seconds'] or 0:.1f}s profiled"
+        for r in runs
+    }
+    run_id = st.selectbox("Run", list(labels), format_func=labels.get, key="profile_run",
+                          label_visibility="collapsed")
+    profiles = get_run_profiles(run_id)
+
+    st.dataframe(
+        [{"Node": p["node"], "Seconds": p["seconds"], "Helper threads": p.get("threads", 0),
+          "Peak memory (KiB)": p["peak_kib"]} for p in profiles],
+        hide_index=True, use_container_width=True,
+    )
+    for p in profiles:
+        st.markdown(f"**{p['node']}** · {p['seconds']}s · `{p['files']['profile']}`")
+        col_cpu, col_mem = st.columns([3, 2])
+        with col_cpu:
+            st.caption("Functions by own time, summed over the node's threads")
+            if p.get("node_profiled") is False:
+                st.caption("⚠️ Another profiler was active — only this node's helper threads were profiled")
+            if p.get("unprofiled_threads"):
+                st.caption(f"⚠️ {p['unprofiled_threads']} helper thread(s) could not be profiled — see the trace")
+            st.dataframe(p["hotspots"], hide_index=True, use_container_width=True)
+        with col_mem:
+            st.caption("Allocation sites")
+            st.dataframe(p["allocations"], hide_index=True, use_container_width=True)
+        if p.get("tools"):
+            st.caption("Tool calls")
+            st.dataframe(p["tools"], hide_index=True, use_container_width=True)
+
+
 def render():
     st.markdown("## Report History")
     st.markdown(
@@ -24,16 +179,57 @@ def render():
         unsafe_allow_html=True
     )
 
-    reports = get_all_reports()
+    # ── Full-text Search ───────────────────────────────────────────────────────
+    search_query = st.text_input(
+        "Search reports",
+        placeholder="Search all reports and vendor snapshots — e.g. SOC2, usage-based pricing, agents*",
+        label_visibility="collapsed",
+    )
+    if search_query.strip():
+        _render_search_results(search_query.strip())
+        st.divider()
 
-    # Filter out local-only reports (not published to Drive / history)
-    published = [r for r in reports if r.get("gdrive_link") != "__local_only__"
-                 or r.get("report_markdown")]
+    # ── LLM Spend ──────────────────────────────────────────────────────────────
+    with st.expander("💰 LLM Spend", expanded=False):
+        _render_spend()
 
-    if not published:
+    # ── Profiled Runs ──────────────────────────────────────────────────────────
+    with st.expander("🔬 Profiled Runs", expanded=False):
+        _render_profiles()
+
+    # ── Pagination state ───────────────────────────────────────────────────────
+    # Keyset cursors: history_cursors[i] is the (created_at, id) the i-th page starts after
+    if "history_cursors" not in st.session_state:
+        st.session_state["history_cursors"] = [None]
+
+    col_count, col_size = st.columns([4, 1])
+    with col_size:
+        page_size = st.selectbox(
+            "Per page",
+            PAGE_SIZES,
+            index=PAGE_SIZES.index(25),
+            key="history_page_size",
+            on_change=lambda: st.session_state.update(history_cursors=[None]),
+        )
+
+    cursors = st.session_state["history_cursors"]
+    published, next_cursor = get_report_history(
+        page_size=page_size,
+        after=cursors[-1],
+        include_local_only=False,
+    )
+
+    if not published and len(cursors) == 1:
         st.info("No archived reports yet. Run an evaluation with **Publish & Archive Report** enabled.")
         return
 
+    with col_count:
+        st.markdown(
+            f"<p style='color:#64748b;font-size:13px;font-weight:600;letter-spacing:0.04em;"
+            f"text-transform:uppercase;margin-top:34px'>Page {len(cursors)} · {count_reports(include_local_only=False)} reports</p>",
+            unsafe_allow_html=True
+        )
+
     # ── Report List ────────────────────────────────────────────────────────────
     for report in published:
         vendors = json.loads(report.get("vendors_covered") or "[]")
@@ -94,6 +290,17 @@ def render():
                     ):
                         st.session_state["viewing_report_id"] = report["id"]
 
+    # ── Page Navigation ────────────────────────────────────────────────────────
+    nav_prev, _, nav_next = st.columns([1, 3, 1])
+    with nav_prev:
+        if st.button("← Newer", disabled=len(cursors) == 1, use_container_width=True):
+            cursors.pop()
+            st.rerun()
+    with nav_next:
+        if st.button("Older →", disabled=next_cursor is None, use_container_width=True):
+            cursors.append(next_cursor)
+            st.rerun()
+
     # ── Inline Report Viewer ───────────────────────────────────────────────────
     if "viewing_report_id" in st.session_state:
         report_id = st.session_state["viewing_report_id"]